@@ -0,0 +1,123 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from core.metrics import peak_rss_mb
+
+from .corpus import SCALES, generate
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def run_case(name: str, root: str, repeat: int) -> dict:
+    from .cases import CASES
+
+    with open(os.path.join(root, ".corpus.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    best = None
+    for _ in range(repeat):
+        run, items = CASES[name](root, meta)
+        t0 = time.perf_counter()
+        run()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return {"seconds": best, "items": items, "per_s": items / best if best else 0.0, "peak_rss_mb": peak_rss_mb()}
+
+
+def _child(name: str, root: str, repeat: int) -> dict:
+    # every case runs in a fresh interpreter so peak RSS is its own
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, "-m", "bench", "--case", name, "--root", root, "--repeat", str(repeat)]
+    out = subprocess.run(cmd, cwd=here, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"exit {out.returncode}"}
+    return json.loads(out.stdout)
+
+
+def _load_baseline(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main(argv=None) -> int:
+    from .cases import CASES
+
+    p = argparse.ArgumentParser(prog="python -m bench", description="Замеры производительности на синтетических maFile")
+    p.add_argument("--scale", default="1k", help="через запятую: " + ", ".join(SCALES))
+    p.add_argument("--cases", default=",".join(CASES), help="через запятую: " + ", ".join(CASES))
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--repeat", type=int, default=3, help="лучший из N прогонов")
+    p.add_argument("--root", help="папка для корпуса (по умолчанию во временной папке)")
+    p.add_argument("--baseline", default=BASELINE)
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--max-regression", type=float, default=0.2, help="допустимое падение скорости, доля")
+    p.add_argument("--json", action="store_true")
+    p.add_argument("--case", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.root, args.repeat)))
+        return 0
+
+    names = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in names if c not in CASES]
+    if unknown:
+        p.error(f"неизвестные замеры: {', '.join(unknown)}")
+    scales = [s.strip() for s in args.scale.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        p.error(f"неизвестный масштаб: {', '.join(unknown)}")
+
+    baseline = _load_baseline(args.baseline)
+    results: dict[str, dict] = {}
+    regressions = []
+    for scale in scales:
+        base = args.root or os.path.join(tempfile.gettempdir(), "MaFileManager", "bench")
+        root = os.path.join(base, f"{scale}-{args.seed}")
+        os.makedirs(root, exist_ok=True)
+        if not args.json:
+            print(f"[{scale}] корпус: {root}", file=sys.stderr)
+        generate(root, SCALES[scale], args.seed)
+        results[scale] = {}
+        for name in names:
+            r = _child(name, root, args.repeat)
+            ref = baseline.get(scale, {}).get(name)
+            if ref and "per_s" in r and ref.get("per_s"):
+                r["vs_baseline"] = r["per_s"] / ref["per_s"]
+                if r["vs_baseline"] < 1 - args.max_regression:
+                    regressions.append(f"{scale}/{name}")
+            results[scale][name] = r
+            if not args.json:
+                print(_format_row(scale, name, r))
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, ensure_ascii=False, indent=2))
+    elif regressions:
+        print(f"Замедление больше {args.max_regression:.0%}: {', '.join(regressions)}")
+
+    if args.save_baseline:
+        for scale, cases in results.items():
+            baseline.setdefault(scale, {}).update({k: v for k, v in cases.items() if "error" not in v})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+    return 1 if regressions or any("error" in r for c in results.values() for r in c.values()) else 0
+
+
+def _format_row(scale: str, name: str, r: dict) -> str:
+    if "error" in r:
+        return f"{scale:>5} {name:<16} ОШИБКА: {r['error']}"
+    rss = f"{r['peak_rss_mb']:.0f} МБ" if r.get("peak_rss_mb") is not None else "—"
+    vs = f"  x{r['vs_baseline']:.2f} к базе" if "vs_baseline" in r else ""
+    return f"{scale:>5} {name:<16} {r['seconds']:8.3f} с  {r['per_s']:10.0f}/с  RSS {rss}{vs}"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
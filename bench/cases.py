@@ -0,0 +1,93 @@
+from __future__ import annotations
+import os
+import json
+import shutil
+from typing import Callable
+
+from core.asf import AsfConverter
+from core.fs import iter_mafiles, list_mafiles, read_mafile
+from core.matching import LoginIndex
+from core.processor import OUTPUT_DIRS, MaFileProcessor
+
+
+def _quiet_log(msg: str, level: str = "info"):
+    pass
+
+
+def _quiet_progress(value: int, text: str):
+    pass
+
+
+def _clean(*paths: str):
+    for p in paths:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+# Each case gets (corpus root, corpus meta) and returns (run, items): `run` is
+# the timed callable, everything before it is untimed setup.
+Case = Callable[[str, dict], tuple[Callable[[], None], int]]
+
+
+def _mode(mode: int) -> Case:
+    def case(root: str, meta: dict):
+        folder = os.path.join(root, meta["mafiles"])
+        files = list_mafiles(folder)
+        _clean(*(os.path.join(folder, d) for d in OUTPUT_DIRS))
+        proc = MaFileProcessor(_quiet_log, _quiet_progress)
+        return (lambda: proc.process_modes(folder, files, [mode])), len(files)
+    return case
+
+
+def list_case(root: str, meta: dict):
+    folder = os.path.join(root, meta["mafiles"])
+    return (lambda: list_mafiles(folder)), meta["n"]
+
+
+def parse_logpass_case(root: str, meta: dict):
+    conv = AsfConverter(_quiet_log, _quiet_progress)
+    paths = [os.path.join(root, name) for name in meta["logpass"].values()]
+
+    def run():
+        for p in paths:
+            conv._parse_logpass(p)
+    lines = 0
+    for p in paths:
+        with open(p, "rb") as f:
+            lines += sum(1 for _ in f)
+    return run, lines
+
+
+def match_case(root: str, meta: dict):
+    conv = AsfConverter(_quiet_log, _quiet_progress)
+    logpass = conv._parse_logpass(os.path.join(root, meta["logpass"]["utf-8"]))
+    items = []
+    for e in iter_mafiles(os.path.join(root, meta["mafiles"])):
+        sid = json.loads(read_mafile(e.path))["Session"]["SteamID"]
+        items.append((str(sid), e.name))
+
+    def run():
+        index = LoginIndex(logpass)
+        for sid, fn in items:
+            login, _ = conv._find_best_match(sid, fn, index)
+            if login:
+                index.remove(login)
+    return run, len(items)
+
+
+def convert_case(root: str, meta: dict):
+    paths = [e.path for e in iter_mafiles(os.path.join(root, meta["mafiles"]))]
+    out = os.path.join(root, "ASFmaFiles")
+    _clean(out)
+    conv = AsfConverter(_quiet_log, _quiet_progress)
+    return (lambda: conv.convert(paths, os.path.join(root, meta["logpass"]["cp1251"]), out)), len(paths)
+
+
+CASES: dict[str, Case] = {
+    "list_mafiles": list_case,
+    "process_mode1": _mode(1),
+    "process_mode2": _mode(2),
+    "process_mode3": _mode(3),
+    "parse_logpass": parse_logpass_case,
+    "find_best_match": match_case,
+    "convert": convert_case,
+}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import os
+import json
+import base64
+import random
+import shutil
+import string
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+ENCODINGS = ["utf-8", "utf-8-sig", "cp1251", "utf-16"]
+DELIMS = [":", ":", ":", ";", "|", ",", " ", "\t"]
+MARKER = ".corpus.json"
+
+
+def _b64(rng: random.Random, n: int) -> str:
+    return base64.b64encode(bytes(rng.getrandbits(8) for _ in range(n))).decode()
+
+
+def _account(rng: random.Random, i: int) -> str:
+    stem = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+    return f"{stem}{i}"
+
+
+def _filename(rng: random.Random, i: int, acc: str, sid: int) -> str:
+    ext = rng.choice([".maFile", ".maFile", ".mafile", ".maFiles", ".MAFILE"])
+    pattern = rng.randrange(5)
+    if pattern == 0:
+        return f"{sid}{ext}"
+    if pattern == 1:
+        return f"{acc}{ext}"
+    if pattern == 2:
+        return f"{acc}_{sid}{ext}"
+    if pattern == 3:
+        return f"{i:06d}-{acc}{ext}"
+    return f"{acc}.{sid}{ext}"
+
+
+def mafile_doc(rng: random.Random, acc: str, sid: int) -> dict:
+    return {
+        "shared_secret": _b64(rng, 20),
+        "serial_number": str(rng.getrandbits(63)),
+        "revocation_code": f"R{rng.randint(10000, 99999)}",
+        "uri": f"otpauth://totp/Steam:{acc}?secret={_b64(rng, 20)}&issuer=Steam",
+        "server_time": 1_700_000_000 + rng.randint(0, 10_000_000),
+        "account_name": acc,
+        "token_gid": "%016x" % rng.getrandbits(64),
+        "identity_secret": _b64(rng, 20),
+        "secret_1": _b64(rng, 20),
+        "status": 1,
+        "device_id": "android:%08x-%04x-%04x-%04x-%012x" % (
+            rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(48)
+        ),
+        "fully_enrolled": True,
+        "Session": {
+            "SessionID": "%024x" % rng.getrandbits(96),
+            "SteamLogin": f"{sid}%7C%7C{_b64(rng, 48)}",
+            "SteamLoginSecure": f"{sid}%7C%7C{_b64(rng, 48)}",
+            "WebCookie": _b64(rng, 20),
+            "OAuthToken": "%032x" % rng.getrandbits(128),
+            "SteamID": sid,
+        },
+    }
+
+
+def generate(root: str, n: int, seed: int = 1234) -> dict:
+    # Deterministic for a given (n, seed). Returns the metadata also stored in MARKER.
+    marker = os.path.join(root, MARKER)
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("n") == n and meta.get("seed") == seed:
+            return meta
+
+    # a corpus of another size or seed is replaced, not added to; the marker
+    # goes first so an interrupted run is never taken for a finished one
+    ma_dir = os.path.join(root, "mafiles")
+    if os.path.exists(marker):
+        os.remove(marker)
+    shutil.rmtree(ma_dir, ignore_errors=True)
+    for enc in ENCODINGS:
+        path = os.path.join(root, f"logpass-{enc}.txt")
+        if os.path.exists(path):
+            os.remove(path)
+
+    rng = random.Random(seed)
+    os.makedirs(ma_dir)
+    accounts: list[tuple[str, int]] = []
+    names: set[str] = set()
+    for i in range(n):
+        acc = _account(rng, i)
+        sid = 76561190000000000 + rng.randint(0, 9_999_999_999)
+        fn = _filename(rng, i, acc, sid)
+        while fn.lower() in names:
+            fn = f"{i}_{fn}"
+        names.add(fn.lower())
+        with open(os.path.join(ma_dir, fn), "w", encoding="utf-8") as f:
+            json.dump(mafile_doc(rng, acc, sid), f, indent=rng.choice([None, 2, 4]))
+        accounts.append((acc, sid))
+
+    logpass = {}
+    for enc in ENCODINGS:
+        path = os.path.join(root, f"logpass-{enc}.txt")
+        lines = []
+        # 90% of the accounts are present, in a shuffled order, plus a few junk lines
+        picked = rng.sample(accounts, int(n * 0.9))
+        for acc, _ in picked:
+            pwd = "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(12))
+            if enc != "utf-8" and rng.random() < 0.05:
+                pwd += "пароль"
+            lines.append(f"{acc}{rng.choice(DELIMS)}{pwd}")
+        for _ in range(max(1, n // 100)):
+            lines.append(rng.choice(["", "   ", "broken-line-without-delimiter", ":nologin"]))
+        with open(path, "w", encoding=enc, newline="") as f:
+            f.write(rng.choice(["\n", "\r\n"]).join(lines))
+        logpass[enc] = os.path.basename(path)
+
+    meta = {"n": n, "seed": seed, "mafiles": "mafiles", "logpass": logpass}
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
@@ -1,79 +1,224 @@
 from __future__ import annotations
 import os
-import json
-from typing import Callable
-from .fs import remove_mafile_extension
+from functools import partial
+from typing import Callable, Iterable, Iterator
+from .fs import close_archives, read_mafile, remove_mafile_extension, split_archive_path, stat_mafile
+from .matching import LoginIndex
+from .parallel import Stage, pipeline
+from .cancel import NEVER, CancelToken, Cancelled
+from .journal import Journal, journal_path
+from .logpass import parse_logpass
+from .progress import as_reporter
+from .metrics import NULL_METRICS, Metrics, NullMetrics
+from .codec import DEFAULT_CODEC, JsonCodec
+from .sinks import NO_SYNC, ArchiveSink, Durability, FolderSink, open_sink
+from .catalog import Catalog, path_key
+from .manifest import content_hash
+from .metadata import STATUS_INVALID, describe
 
 LogCb = Callable[[str, str], None]
 ProgressCb = Callable[[int, str], None]
 
+
+def _read_json(path: str, codec: JsonCodec = DEFAULT_CODEC) -> dict:
+    # plain path or "<archive>.zip::<member>"
+    return codec.loads(read_mafile(path))
+
+
+def _stat_path(path: str) -> tuple[int, int]:
+    # (size, mtime_ns) of a plain path or "<archive>.zip::<member>"
+    parts = split_archive_path(path)
+    if parts:
+        return stat_mafile(*parts)
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _basename(path: str) -> str:
+    # file name of a plain path or of a zip member, without the "<archive>.zip::"
+    # prefix, so a zip gives the same names and matches as the extracted folder
+    parts = split_archive_path(path)
+    return parts[1].rsplit("/", 1)[-1] if parts else os.path.basename(path)
+
+
+def _safe_name(steam_id) -> str:
+    return str(steam_id).replace(":", "_").replace("/", "_").replace("\\", "_")
+
+
 class AsfConverter:
-    def __init__(self, log: LogCb, progress: ProgressCb):
-        self.log = log
-        self.progress = progress
+    def __init__(
+        self,
+        log: LogCb,
+        progress: ProgressCb,
+        streaming: bool = False,
+        archive: str | None = None,
+        compress_level: int = 6,
+        metrics: Metrics | NullMetrics = NULL_METRICS,
+        json_backend: str = "auto",
+        compact_json: bool = False,
+        verify_json: bool = False,
+        workers: int = 1,
+        cancel: CancelToken = NEVER,
+        resume: bool = True,
+        durability: Durability = NO_SYNC,
+        catalog: Catalog | None = None,
+    ):
+        self.metrics = metrics
+        self.log = metrics.timed("ui", log)
+        self.progress = as_reporter(metrics.timed("ui", progress))
+        # streaming: keep only (path, filename, steam_id) per maFile and re-read
+        # the document at write time, so peak memory does not grow with the batch
+        self.streaming = streaming
+        self.archive = archive
+        self.compress_level = compress_level
+        self.codec = JsonCodec(json_backend, compact_json, verify_json)
+        # threads per write-phase stage; with more than one, accounts whose
+        # names collide may be written in either order
+        self.workers = workers
+        self.cancel = cancel
+        # folder outputs keep a journal of written accounts and their logins
+        self.resume = resume
+        self.durability = durability
+        # a file the catalog already knows (with an account_name) is matched
+        # without reading it; it is loaded only when its account is written
+        self.catalog = catalog
+
+    def _cached_item(self, p: str, fn: str) -> tuple[dict | None, tuple | None]:
+        # -> (item from the catalog, (key, size, mtime_ns) to catalogue the file under)
+        try:
+            size, mtime_ns = _stat_path(p)
+        except (OSError, KeyError):
+            return None, None
+        key = path_key(p)
+        rec = self.catalog.get(key, size, mtime_ns)
+        if rec is None or not rec[2]:
+            # without an account_name the SteamID fallback needs the document
+            return None, (key, size, mtime_ns) if rec is None else None
+        return {"path": p, "filename": fn, "steam_id": rec[2]}, None
 
     def _parse_logpass(self, path: str) -> dict[str, str]:
-        encs = ["utf-8", "cp1251", "latin-1", "iso-8859-1", "utf-16", "cp866"]
-        for enc in encs:
+        try:
+            out, rejects = parse_logpass(path)
+        except Exception as e:
+            self.log(f"Не удалось прочитать файл с логинами: {e}", "error")
+            return {}
+        if rejects:
+            shown = ", ".join(f"{n} ({why})" for n, why in rejects[:10]) + (" …" if len(rejects) > 10 else "")
+            self.log(f"Пропущено строк в файле с логинами: {len(rejects)} — {shown}", "warning")
+        return out
+
+    def _find_best_match(self, steam_id: str, filename: str, index: LoginIndex):
+        return index.match(steam_id, filename)
+
+    # The write phase is a pipeline (parallel.pipeline): load the document
+    # (streaming mode re-reads it) -> render the maFile -> write it with its
+    # config; files left to the fallback arrive already rendered. Each stage takes and returns a job dict; a failure is recorded
+    # in job["error"] and the later stages pass the job through.
+    def _load_account(self, job: dict) -> dict:
+        item = job["item"]
+        job["t0"] = self.metrics.clock() if self.metrics.enabled else 0.0
+        try:
+            if "ma_text" in item:
+                # rendered while matching (see _convert)
+                job["ma_text"] = item["ma_text"]
+            elif "data" in item:
+                job["data"] = item["data"]
+            else:
+                with self.metrics.stage("read"):
+                    job["data"] = _read_json(item["path"], self.codec)
+        except Exception as e:
+            job["error"] = e
+        return job
+
+    def _render_account(self, job: dict) -> dict:
+        if job["error"] is None and "ma_text" not in job:
             try:
-                out: dict[str, str] = {}
-                with open(path, "r", encoding=enc) as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        for delim in [":", ";", ",", "|", " ", "\t"]:
-                            if delim in line:
-                                login, pwd = line.split(delim, 1)
-                                login, pwd = login.strip(), pwd.strip()
-                                if login and pwd:
-                                    out[login] = pwd
-                                break
-                if out:
-                    return out
-            except Exception:
-                continue
-        return {}
-
-    def _find_best_match(self, steam_id: str, filename: str, logpass: dict[str, str]):
-        fn = remove_mafile_extension(filename).strip()
-        sid = str(steam_id).strip()
-        variants = {sid, fn}
-
-        if sid.startswith("7656119"):
-            variants.update([sid[7:], sid[3:], sid[-8:], sid[-10:], sid[-12:]])
-
-        for sep in ["_", "-", ".", " ", "__", "--", ".."]:
-            if sep in fn:
-                parts = [p for p in fn.split(sep) if p]
-                variants.update(parts)
-                if parts:
-                    variants.add(parts[0])
-                    variants.add(parts[-1])
-
-        for v in variants:
-            if v in logpass:
-                return v, logpass[v]
-
-        sid_l = sid.lower()
-        fn_l = fn.lower()
-        for login, pwd in logpass.items():
-            lc = login.strip().lower()
-            if lc in sid_l or sid_l in lc or lc in fn_l or fn_l in lc:
-                return login, pwd
-
-        return None, None
+                with self.metrics.stage("render"):
+                    job["ma_text"] = self.codec.dumps(job.pop("data"), indent=2)
+            except Exception as e:
+                job["error"] = e
+        return job
+
+    def _store_account(self, sink: FolderSink | ArchiveSink, job: dict) -> dict:
+        # needs job["login"] and job["pwd"]
+        if job["error"] is not None:
+            return job
+        m = self.metrics
+        item = job["item"]
+        safe = _safe_name(item["steam_id"])
+        ma_text = job.pop("ma_text")
+        cfg = {"Enabled": True, "OnlineStatus": 7, "RemoteCommunication": 0, "SteamLogin": job["login"], "SteamPassword": job["pwd"]}
+        try:
+            with m.stage("render"):
+                cfg_text = self.codec.dumps(cfg, indent=4)
+            with m.stage("write"):
+                sink.write(f"{safe}.maFile", ma_text)
+                sink.write(f"{safe}.json", cfg_text)
+        except Exception as e:
+            job["error"] = e
+            return job
+        if m.enabled:
+            m.count_bytes(written=len(ma_text.encode("utf-8")) + len(cfg_text.encode("utf-8")))
+            m.file_done(item.get("elapsed", 0.0) + m.clock() - job["t0"])
+        return job
+
+    def _prepare_accounts(self, jobs: Iterable[dict]) -> Iterator[dict]:
+        # jobs: {"item", ...}; yields them back in order with the maFile text
+        # rendered, or "error" set
+        stages = [Stage(self._load_account, self.workers), Stage(self._render_account, self.workers)]
+        return pipeline(({**job, "error": None} for job in jobs), stages)
+
+    def _write_accounts(self, sink: FolderSink | ArchiveSink, jobs: Iterable[dict]) -> Iterator[dict]:
+        # jobs: {"item", "login", "pwd", ...}; yields them back in order with "error" set or None
+        stages = [
+            Stage(self._load_account, self.workers),
+            Stage(self._render_account, self.workers),
+            Stage(partial(self._store_account, sink), self.workers),
+        ]
+        return pipeline(({**job, "error": None} for job in jobs), stages)
 
     def convert(self, mafiles_paths: list[str], logpass_path: str, output_folder: str | None):
         out_dir = output_folder or "ASFmaFiles"
-        os.makedirs(out_dir, exist_ok=True)
-
-        logpass = self._parse_logpass(logpass_path)
+        with self.metrics.stage("parse_logpass"):
+            logpass = self._parse_logpass(logpass_path)
         if not logpass:
             raise ValueError("В файле не найдено корректных записей login:password")
 
         self.log(f"Загружено {len(logpass)} записей из файла с логинами", "info")
-        available = dict(logpass)
+        sink = open_sink(out_dir, self.archive, self.compress_level, self.durability)
+        journal = None
+        if not self.archive:
+            st = os.stat(logpass_path)
+            job = {"logpass": os.path.abspath(logpass_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            journal = Journal(journal_path(out_dir), job, self.resume)
+        try:
+            res = self._convert(mafiles_paths, logpass, sink, journal)
+        except BaseException:
+            sink.abort()
+            if journal is not None:
+                journal.close()
+            raise
+        else:
+            with self.metrics.stage("close"):
+                sink.close()
+            if journal is not None:
+                journal.discard()
+            return res
+        finally:
+            if self.catalog is not None:
+                self.catalog.flush()
+            close_archives()
+            self.metrics.report(self.log)
+
+    def _check_cancel(self):
+        if self.cancel.cancelled:
+            self.log("Остановлено. Повторный запуск продолжит с места остановки.", "warning")
+            raise Cancelled("Остановлено пользователем")
+
+    def _convert(self, mafiles_paths: list[str], logpass: dict[str, str], sink: FolderSink | ArchiveSink, journal: Journal | None):
+        m = self.metrics
+        with m.stage("index"):
+            available = LoginIndex(logpass)
 
         total = len(mafiles_paths)
         ok = 0
@@ -81,67 +226,126 @@ class AsfConverter:
 
         ma_data = []
         for p in mafiles_paths:
-            fn = os.path.basename(p)
+            self._check_cancel()
+            fn = _basename(p)
+            t0 = m.clock() if m.enabled else 0.0
+            learn = None
+            if self.catalog is not None:
+                with m.stage("catalog"):
+                    item, learn = self._cached_item(p, fn)
+                if item is not None:
+                    ma_data.append(item)
+                    continue
+            raw = None
             try:
-                with open(p, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                with m.stage("read"):
+                    raw = read_mafile(p)
+                with m.stage("decode"):
+                    data = self.codec.loads(raw)
+                if learn is not None:
+                    key, size, mtime_ns = learn
+                    self.catalog.put(key, (size, mtime_ns, *describe(data), content_hash(raw)))
+                    learn = None
                 steam_id = data.get("account_name") or data.get("Session", {}).get("SteamID") or remove_mafile_extension(fn)
-                ma_data.append({"path": p, "filename": fn, "steam_id": steam_id, "data": data})
+                item = {"path": p, "filename": fn, "steam_id": steam_id}
+                if not self.streaming:
+                    item["data"] = data
+                if m.enabled:
+                    m.count_bytes(read=len(raw))
+                    item["elapsed"] = m.clock() - t0
+                ma_data.append(item)
             except Exception as e:
+                if learn is not None and raw is not None:
+                    key, size, mtime_ns = learn
+                    self.catalog.put(key, (size, mtime_ns, "", "", False, STATUS_INVALID, str(e), content_hash(raw)))
                 failed.append((fn, f"Ошибка чтения: {e}"))
                 self.log(f"[ОШИБКА ЧТЕНИЯ] {fn} - {e}", "error")
 
-        remaining = []
-        for i, item in enumerate(ma_data, 1):
-            fn = item["filename"]
-            sid = item["steam_id"]
-            login, pwd = self._find_best_match(sid, fn, available)
-            if login and pwd:
-                try:
-                    safe = str(sid).replace(":", "_").replace("/", "_").replace("\\", "_")
-                    with open(os.path.join(out_dir, f"{safe}.maFile"), "w", encoding="utf-8") as f:
-                        json.dump(item["data"], f, indent=2, ensure_ascii=False)
-                    cfg = {"Enabled": True, "OnlineStatus": 7, "RemoteCommunication": 0, "SteamLogin": login, "SteamPassword": pwd}
-                    with open(os.path.join(out_dir, f"{safe}.json"), "w", encoding="utf-8") as f:
-                        json.dump(cfg, f, indent=4, ensure_ascii=False)
-
-                    ok += 1
-                    self.log(f"[УСПЕХ] {fn} -> Логин: {login}", "success")
-                    available.pop(login, None)
-                except Exception as e:
-                    failed.append((fn, f"Ошибка обработки: {e}"))
-                    self.log(f"[ОШИБКА ОБРАБОТКИ] {fn} - {e}", "error")
-            else:
-                remaining.append(item)
+        resumed = 0
+        if journal is not None and len(journal):
+            # accounts written before the interruption keep their logins
+            left = []
+            for item in ma_data:
+                rec = journal.get(os.path.abspath(item["path"]))
+                # the .json is written last, so it being there means both are
+                written = rec is not None and os.path.exists(os.path.join(sink.path, f"{_safe_name(item['steam_id'])}.json"))
+                if written and rec["login"] in available:
+                    available.remove(rec["login"])
+                    resumed += 1
+                else:
+                    left.append(item)
+            if resumed:
+                ok += resumed
+                ma_data = left
+                self.log(f"Продолжение прерванного запуска: {resumed} аккаунтов уже записаны", "info")
+
+        def done(job: dict):
+            if journal is not None:
+                journal.record(os.path.abspath(job["item"]["path"]), login=job["login"])
 
-            self.progress(int(i * 60 / max(1, total)), f"Матчинг {i}/{total}")
+        remaining = []
+        # Documents are read and rendered ahead on the pipeline threads, but a
+        # login is matched and the account written here, one file at a time:
+        # a login is taken only once its account is written, so a failed write
+        # leaves it to the next files, as in a plain sequential loop.
+        results = self._prepare_accounts({"item": item, "i": i} for i, item in enumerate(ma_data, resumed + 1))
+        try:
+            for job in results:
+                item = job["item"]
+                fn = item["filename"]
+                with m.stage("match"):
+                    login, pwd = self._find_best_match(item["steam_id"], fn, available)
+                if login and pwd:
+                    job["login"], job["pwd"] = login, pwd
+                    self._store_account(sink, job)
+                    if job["error"] is None:
+                        available.remove(login)
+                        ok += 1
+                        done(job)
+                        self.log(f"[УСПЕХ] {fn} -> Логин: {login}", "success")
+                    else:
+                        failed.append((fn, f"Ошибка обработки: {job['error']}"))
+                        self.log(f"[ОШИБКА ОБРАБОТКИ] {fn} - {job['error']}", "error")
+                else:
+                    # it may still get one of the logins left at the end: keep
+                    # the text rendered for it so the fallback does not read it
+                    # again, unless more files than logins are already waiting
+                    if job["error"] is None and len(remaining) < len(available):
+                        item = {**item, "ma_text": job["ma_text"]}
+                    remaining.append(item)
+                self.progress.update(job["i"], total, f"Матчинг {job['i']}/{total}", 0, 60)
+                self._check_cancel()
+        finally:
+            results.close()
+        self.progress.update(resumed + len(ma_data), total, f"Матчинг {resumed + len(ma_data)}/{total}", 0, 60)
 
         if remaining and available:
             self.log(f"Осталось {len(remaining)} файлов и {len(available)} логинов", "info")
             self.log("Назначаем оставшиеся логины по порядку...", "info")
-            avail_list = list(available.items())
-            for j, item in enumerate(remaining, 1):
-                fn = item["filename"]
-                sid = item["steam_id"]
-                if j - 1 < len(avail_list):
-                    login, pwd = avail_list[j - 1]
-                    try:
-                        safe = str(sid).replace(":", "_").replace("/", "_").replace("\\", "_")
-                        with open(os.path.join(out_dir, f"{safe}.maFile"), "w", encoding="utf-8") as f:
-                            json.dump(item["data"], f, indent=2, ensure_ascii=False)
-                        cfg = {"Enabled": True, "OnlineStatus": 7, "RemoteCommunication": 0, "SteamLogin": login, "SteamPassword": pwd}
-                        with open(os.path.join(out_dir, f"{safe}.json"), "w", encoding="utf-8") as f:
-                            json.dump(cfg, f, indent=4, ensure_ascii=False)
+            avail_list = available.remaining()
+            n = len(remaining)
+            jobs = ({"item": item, "login": lp[0], "pwd": lp[1], "i": j} for j, (item, lp) in enumerate(zip(remaining, avail_list), 1))
+            results = self._write_accounts(sink, jobs)
+            try:
+                for job in results:
+                    fn = job["item"]["filename"]
+                    if job["error"] is None:
                         ok += 1
-                        self.log(f"[УСПЕХ-АВТО] {fn} -> Логин: {login}", "success")
-                    except Exception as e:
-                        failed.append((fn, f"Ошибка авто-обработки: {e}"))
-                        self.log(f"[ОШИБКА АВТО-ОБРАБОТКИ] {fn} - {e}", "error")
-                else:
-                    failed.append((fn, "Не хватает логинов"))
-                    self.log(f"[НЕ ХВАТАЕТ ЛОГИНОВ] {fn}", "warning")
-                self.progress(60 + int(j * 40 / max(1, len(remaining))), f"Запись {j}/{len(remaining)}")
+                        done(job)
+                        self.log(f"[УСПЕХ-АВТО] {fn} -> Логин: {job['login']}", "success")
+                    else:
+                        failed.append((fn, f"Ошибка авто-обработки: {job['error']}"))
+                        self.log(f"[ОШИБКА АВТО-ОБРАБОТКИ] {fn} - {job['error']}", "error")
+                    self.progress.update(job["i"], n, f"Запись {job['i']}/{n}", 60, 40)
+                    self._check_cancel()
+            finally:
+                results.close()
+            for j, item in enumerate(remaining[len(avail_list):], len(avail_list) + 1):
+                fn = item["filename"]
+                failed.append((fn, "Не хватает логинов"))
+                self.log(f"[НЕ ХВАТАЕТ ЛОГИНОВ] {fn}", "warning")
+                self.progress.update(j, n, f"Запись {j}/{n}", 60, 40)
 
         self.progress(100, "Готово!")
         self.log(f"Конвертация завершена. Успешно: {ok}/{total}", "success")
-        return {"success": ok, "failed": failed, "output_folder": out_dir}
+        return {"success": ok, "failed": failed, "output_folder": sink.path}
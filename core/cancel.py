@@ -0,0 +1,27 @@
+from __future__ import annotations
+import threading
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    # Set from any thread (UI button, SIGINT); jobs poll it between files and
+    # stop cleanly: outputs closed, manifests and the journal saved.
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        # sleep that a cancel() cuts short; True once cancelled
+        return self._event.wait(timeout)
+
+
+NEVER = CancelToken()
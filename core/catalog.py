@@ -0,0 +1,250 @@
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+from typing import Callable
+
+from .fs import ARCHIVE_SEP, app_dir, is_archive, split_archive_path
+
+CATALOG_VERSION = 1
+
+# (size, mtime_ns, account_name, SteamID, has shared_secret, status, error, sha256 | None)
+Record = tuple[int, int, str, str, bool, str, str, str | None]
+LogCb = Callable[[str, str], None]
+
+_SCHEMA = """
+DROP TABLE IF EXISTS files;
+DROP TABLE IF EXISTS counts;
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    account_name TEXT NOT NULL,
+    steam_id TEXT NOT NULL,
+    has_secret INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT NOT NULL,
+    sha256 TEXT
+) WITHOUT ROWID;
+CREATE INDEX files_account ON files(account_name COLLATE NOCASE);
+CREATE INDEX files_steam_id ON files(steam_id);
+-- rows per status, so totals do not scan the table; kept up to date by
+-- each write batch (per-row triggers would double the cost of an insert)
+CREATE TABLE counts (status TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    size = excluded.size, mtime_ns = excluded.mtime_ns, account_name = excluded.account_name,
+    steam_id = excluded.steam_id, has_secret = excluded.has_secret, status = excluded.status,
+    error = excluded.error, sha256 = excluded.sha256
+"""
+
+_ADD_COUNT = "INSERT INTO counts VALUES (?, ?) ON CONFLICT(status) DO UPDATE SET n = n + excluded.n"
+
+# bound parameters per IN (...) lookup
+_CHUNK = 500
+
+_COLUMNS = "size, mtime_ns, account_name, steam_id, has_secret, status, error, sha256"
+
+
+def default_catalog_path() -> str:
+    # next to the logs: the catalog holds account names and SteamIDs
+    return os.path.join(app_dir(), "catalog.sqlite3")
+
+
+def entry_key(source: str, name: str) -> str:
+    # absolute path of a maFile, or "<archive>.zip::<member>"
+    if is_archive(source):
+        return f"{os.path.abspath(source)}{ARCHIVE_SEP}{name}"
+    return os.path.join(os.path.abspath(source), name)
+
+
+def path_key(path: str) -> str:
+    # same key for a plain path or "<archive>.zip::<member>"
+    parts = split_archive_path(path)
+    return entry_key(*parts) if parts else os.path.abspath(path)
+
+
+def _range(source: str) -> tuple[str, str]:
+    # [lo, hi) of the keys of every file under a folder or archive
+    lo = entry_key(source, "")
+    return lo, lo[:-1] + chr(ord(lo[-1]) + 1)
+
+
+def _record(row) -> Record:
+    size, mtime_ns, acc, sid, secret, status, error, digest = row
+    return size, mtime_ns, acc, sid, bool(secret), status, error, digest
+
+
+class Catalog:
+    # What parsing a maFile told us, kept across runs in SQLite and keyed by
+    # path; a record only counts while the file's size and mtime still match.
+    # It is a cache: a damaged or outdated database is rebuilt, and a failing
+    # query reads as a miss instead of failing the job. One connection shared
+    # by threads under a lock; writes are buffered and committed in batches.
+    def __init__(self, path: str | None = None, flush_every: int = 1024):
+        self.path = path or default_catalog_path()
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending: dict[str, Record] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        try:
+            self._db = self._connect()
+        except sqlite3.OperationalError:
+            # locked or cannot be opened: not damage, leave the file alone
+            raise
+        except sqlite3.DatabaseError:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path + suffix)
+                except OSError:
+                    pass
+            self._db = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+                db.executescript(f"BEGIN; {_SCHEMA} PRAGMA user_version={CATALOG_VERSION}; COMMIT;")
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    def get(self, key: str, size: int, mtime_ns: int) -> Record | None:
+        with self._lock:
+            rec = self._pending.get(key)
+            if rec is None:
+                try:
+                    row = self._db.execute(f"SELECT {_COLUMNS} FROM files WHERE path = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    return None
+                rec = _record(row) if row else None
+        if rec is None or rec[0] != size or rec[1] != mtime_ns:
+            return None
+        return rec
+
+    def folder(self, source: str) -> dict[str, Record]:
+        # name -> record for everything catalogued under a folder or archive;
+        # callers still compare size and mtime
+        self.flush()
+        lo, hi = _range(source)
+        with self._lock:
+            try:
+                rows = self._db.execute(f"SELECT path, {_COLUMNS} FROM files WHERE path >= ? AND path < ?", (lo, hi)).fetchall()
+            except sqlite3.Error:
+                return {}
+        return {row[0][len(lo):]: _record(row[1:]) for row in rows}
+
+    def put(self, key: str, rec: Record):
+        with self._lock:
+            self._pending[key] = rec
+            full = len(self._pending) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            rows = [(key, *rec) for key, rec in self._pending.items()]
+            self._pending.clear()
+            try:
+                self._db.execute("BEGIN")
+                delta = self._replaced([row[0] for row in rows])
+                for row in rows:
+                    delta[row[6]] = delta.get(row[6], 0) + 1
+                self._db.executemany(_UPSERT, rows)
+                self._db.executemany(_ADD_COUNT, delta.items())
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                # another process held the lock too long: the rows are parsed again next time
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+
+    def _replaced(self, keys: list[str]) -> dict[str, int]:
+        # -{status: rows} for the keys already stored, which a write replaces
+        delta: dict[str, int] = {}
+        for i in range(0, len(keys), _CHUNK):
+            chunk = keys[i:i + _CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for status, n in self._db.execute(f"SELECT status, count(*) FROM files WHERE path IN ({marks}) GROUP BY status", chunk):
+                delta[status] = delta.get(status, 0) - n
+        return delta
+
+    def find(self, value: str, source: str | None = None) -> list[tuple[str, Record]]:
+        # files whose SteamID or account_name (any case) is exactly `value`;
+        # with `source`, only those under it, keyed by name relative to it
+        self.flush()
+        sql = f"SELECT path, {_COLUMNS} FROM files WHERE (steam_id = ? OR account_name = ? COLLATE NOCASE)"
+        args: tuple = (value, value)
+        lo = ""
+        if source is not None:
+            lo, hi = _range(source)
+            sql += " AND path >= ? AND path < ?"
+            args += (lo, hi)
+        with self._lock:
+            try:
+                rows = self._db.execute(sql + " ORDER BY path", args).fetchall()
+            except sqlite3.Error:
+                return []
+        return [(row[0][len(lo):], _record(row[1:])) for row in rows]
+
+    def counts(self, source: str | None = None) -> dict[str, int]:
+        # {status: files}; totals for the whole catalog are kept, not counted
+        self.flush()
+        with self._lock:
+            try:
+                if source is None:
+                    rows = self._db.execute("SELECT status, n FROM counts WHERE n > 0").fetchall()
+                else:
+                    rows = self._db.execute(
+                        "SELECT status, count(*) FROM files WHERE path >= ? AND path < ? GROUP BY status", _range(source)
+                    ).fetchall()
+            except sqlite3.Error:
+                return {}
+        return dict(rows)
+
+    def forget(self, source: str, keep: set[str], recursive: bool = True) -> int:
+        # drop records of files under `source` that are not in `keep`; without
+        # `recursive` only its direct entries are considered
+        stale = [
+            (name, rec[5]) for name, rec in self.folder(source).items()
+            if name not in keep and (recursive or not any(sep in name for sep in ("/", os.sep)))
+        ]
+        if not stale:
+            return 0
+        delta: dict[str, int] = {}
+        for _, status in stale:
+            delta[status] = delta.get(status, 0) - 1
+        with self._lock:
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany("DELETE FROM files WHERE path = ?", [(entry_key(source, n),) for n, _ in stale])
+                self._db.executemany(_ADD_COUNT, delta.items())
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                return 0
+        return len(stale)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+def open_catalog(path: str | None = None, log: LogCb | None = None) -> Catalog | None:
+    # the catalog only saves work: if it cannot be opened (even after a
+    # rebuild), the job says so and runs without it
+    try:
+        return Catalog(path)
+    except (sqlite3.Error, OSError) as e:
+        if log:
+            log(f"Каталог метаданных недоступен, работа без него: {e}", "warning")
+        return None
@@ -0,0 +1,321 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import signal
+import argparse
+
+from .fs import is_archive, iter_mafiles
+from .parallel import EXECUTORS, default_workers
+from .processor import OUTPUT_DIRS, MaFileProcessor
+from .materialize import STRATEGIES
+from .sinks import ARCHIVE_FORMATS, DURABILITY, Durability
+from .codec import BACKENDS
+from .asf import AsfConverter
+from .watch import WATCH_BACKENDS, FolderWatcher, process_forever
+from .metrics import NULL_METRICS, Metrics
+from .cancel import CancelToken, Cancelled
+from .catalog import Catalog, open_catalog
+from .metadata import read_metadata
+from .dedupe import KEEP_POLICIES, find_duplicates, log_report, save_report
+
+PREFIX = {"success": "✓", "error": "✗", "warning": "!", "info": "i"}
+
+
+class Reporter:
+    def __init__(self, as_json: bool, stream=None):
+        self.as_json = as_json
+        self.stream = stream or sys.stdout
+        self.show_progress = not as_json and sys.stderr.isatty()
+
+    def _emit(self, obj: dict):
+        self.stream.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def log(self, msg: str, level: str = "info"):
+        if self.as_json:
+            self._emit({"event": "log", "level": level, "message": msg})
+        else:
+            if self.show_progress:
+                sys.stderr.write("\r\033[K")
+            self.stream.write(f"[{PREFIX.get(level, 'i')}] {msg}\n")
+            self.stream.flush()
+
+    def progress(self, value: int, text: str):
+        if self.as_json:
+            self._emit({"event": "progress", "percent": value, "text": text})
+        elif self.show_progress:
+            sys.stderr.write(f"\r\033[K{value:3d}% {text}")
+            sys.stderr.flush()
+
+    def done(self, result):
+        if self.as_json:
+            self._emit({"event": "done", "result": result})
+        elif self.show_progress:
+            sys.stderr.write("\r\033[K")
+
+    def fail(self, err: str):
+        if self.as_json:
+            self._emit({"event": "failed", "error": err})
+        else:
+            sys.stderr.write(f"[✗] {err}\n")
+
+
+def _expand_mafiles(paths: list[str], recursive: bool = False) -> list[str]:
+    out: list[str] = []
+    for p in paths:
+        if os.path.isdir(p) or is_archive(p):
+            out.extend(sorted(e.path for e in iter_mafiles(p, recursive)))
+        else:
+            out.append(p)
+    return out
+
+
+def _add_archive_args(p: argparse.ArgumentParser):
+    p.add_argument("--archive", choices=ARCHIVE_FORMATS, default=None, help="писать результат в архив вместо папки")
+    p.add_argument("--level", type=int, default=6, choices=range(10), metavar="0-9", help="уровень сжатия архива")
+
+
+def _add_codec_args(p: argparse.ArgumentParser):
+    p.add_argument("--json-backend", choices=BACKENDS, default="auto", help="модуль JSON (auto: orjson, если установлен)")
+    p.add_argument("--compact", action="store_true", help="писать JSON без отступов")
+    p.add_argument("--verify-json", action="store_true", help="проверять, что записанный JSON читается в тот же документ")
+
+
+def _add_durability_args(p: argparse.ArgumentParser):
+    p.add_argument("--durability", choices=DURABILITY, default="none", help="сброс на диск: none, batch (группами), always (каждый файл)")
+    p.add_argument("--sync-every", type=int, default=256, metavar="N", help="batch: сбрасывать каждые N файлов")
+    p.add_argument("--sync-interval", type=float, default=2.0, metavar="SEC", help="batch: и не реже чем раз в SEC секунд")
+
+
+def _add_resume_args(p: argparse.ArgumentParser):
+    p.add_argument("--no-resume", dest="resume", action="store_false", help="не продолжать прерванный запуск, начать заново")
+
+
+def _add_catalog_args(p: argparse.ArgumentParser):
+    p.add_argument("--catalog", metavar="PATH", default=None, help="каталог метаданных maFile (по умолчанию catalog.sqlite3 в папке данных пользователя)")
+    p.add_argument("--no-catalog", dest="use_catalog", action="store_false", help="не использовать каталог, разбирать каждый файл заново")
+
+
+def _add_processing_args(p: argparse.ArgumentParser):
+    p.add_argument("folder", help="папка или .zip архив с maFiles")
+    p.add_argument("-r", "--recursive", action="store_true", help="искать maFiles в подпапках")
+    p.add_argument("-w", "--workers", type=int, default=default_workers())
+    p.add_argument("--executor", choices=EXECUTORS, default="thread")
+    p.add_argument("--io-workers", type=int, default=None, help="потоки чтения и записи (по умолчанию как --workers)")
+    p.add_argument("--incremental", action="store_true", help="обрабатывать только новые и изменённые файлы")
+    p.add_argument("--link", choices=STRATEGIES, default="copy", help="способ записи файлов режима 1")
+    p.add_argument("--dedupe", choices=KEEP_POLICIES, default=None, help="обрабатывать один файл на аккаунт: first, newest или complete")
+    _add_archive_args(p)
+    _add_codec_args(p)
+    _add_durability_args(p)
+    _add_resume_args(p)
+    _add_catalog_args(p)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m core", description="MaFile Manager без графического интерфейса")
+    parser.add_argument("--json", action="store_true", help="лог и прогресс в формате JSON lines")
+    parser.add_argument("--metrics", metavar="REPORT.json", default=None, help="замеры по стадиям: сводка в лог и JSON-отчёт")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for n, helptext in [
+        (1, "переименовать по account_name (fullmafiles)"),
+        (2, "урезать для FSM (shortmaffsmpanel)"),
+        (3, "урезать для DM (shortmafdmpanel)"),
+    ]:
+        _add_processing_args(sub.add_parser(f"mode{n}", help=helptext))
+
+    p = sub.add_parser("multi", help="несколько режимов за один проход")
+    _add_processing_args(p)
+    p.add_argument("-m", "--modes", default="1,2,3", help="список режимов через запятую, например 2,3")
+
+    p = sub.add_parser("watch", help="следить за папкой и обрабатывать новые файлы")
+    _add_processing_args(p)
+    p.add_argument("-m", "--modes", default="1", help="список режимов через запятую, например 2,3")
+    p.add_argument("--debounce", type=float, default=1.0, metavar="SEC", help="ждать затишья SEC секунд перед обработкой")
+    p.add_argument("--poll-interval", type=float, default=2.0, metavar="SEC", help="период опроса, если inotify недоступен")
+    p.add_argument("--watch-backend", choices=WATCH_BACKENDS, default="auto")
+
+    p = sub.add_parser("asf", help="конвертация в формат ASF")
+    p.add_argument("mafiles", nargs="+", help="maFile файлы, папки или .zip архивы с ними")
+    p.add_argument("-l", "--logpass", required=True, help="файл login:password")
+    p.add_argument("-o", "--output", default=None, help="папка для сохранения")
+    p.add_argument("-r", "--recursive", action="store_true", help="искать maFiles в подпапках")
+    p.add_argument("--streaming", action="store_true", help="не держать все maFiles в памяти")
+    p.add_argument("-w", "--workers", type=int, default=1, help="потоки на каждую стадию записи")
+    _add_archive_args(p)
+    _add_codec_args(p)
+    _add_durability_args(p)
+    _add_resume_args(p)
+    _add_catalog_args(p)
+
+    p = sub.add_parser("dedupe", help="отчёт о дубликатах (одинаковое содержимое, account_name или SteamID)")
+    p.add_argument("folder", help="папка или .zip архив с maFiles")
+    p.add_argument("-r", "--recursive", action="store_true", help="искать maFiles в подпапках")
+    p.add_argument("--keep", choices=KEEP_POLICIES, default="first", help="какой файл группы считать основным")
+    p.add_argument("--report", metavar="REPORT.json", default=None, help="сохранить полный отчёт в JSON")
+    _add_catalog_args(p)
+
+    p = sub.add_parser("catalog", help="каталог метаданных: обновить, найти файл, посчитать")
+    p.add_argument("action", choices=("scan", "find", "stats"))
+    p.add_argument("target", nargs="?", help="scan, stats: папка или .zip; find: SteamID или account_name")
+    p.add_argument("-r", "--recursive", action="store_true", help="scan: включая подпапки")
+    p.add_argument("--in", dest="within", metavar="FOLDER", default=None, help="find: искать только в этой папке")
+    p.add_argument("--catalog", metavar="PATH", default=None, help="файл каталога (по умолчанию catalog.sqlite3 в папке данных пользователя)")
+    return parser
+
+
+def run_catalog(args: argparse.Namespace, rep: Reporter, cancel: CancelToken):
+    catalog = Catalog(args.catalog)
+    try:
+        if args.action == "find":
+            if not args.target:
+                raise ValueError("Укажите SteamID или account_name")
+            found = catalog.find(args.target, args.within)
+            for path, rec in found:
+                rep.log(f"{path} • {rec[2]} • {rec[3]} • {rec[5]}", "success")
+            if not found:
+                rep.log("Ничего не найдено", "warning")
+            return [{"path": path, "account_name": rec[2], "steam_id": rec[3], "status": rec[5]} for path, rec in found]
+        if args.action == "stats":
+            counts = catalog.counts(args.target)
+            shown = ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())) or "пусто"
+            rep.log(f"Файлов в каталоге: {sum(counts.values())} ({shown})", "info")
+            return counts
+        if not args.target or (not os.path.isdir(args.target) and not is_archive(args.target)):
+            raise ValueError("Папка не существует!")
+        names = []
+        for i, e in enumerate(iter_mafiles(args.target, args.recursive, exclude=OUTPUT_DIRS), 1):
+            read_metadata(args.target, e.name, catalog=catalog)
+            names.append(e.name)
+            if i % 512 == 0 and cancel.cancelled:
+                raise Cancelled("Остановлено пользователем")
+        removed = catalog.forget(args.target, set(names), args.recursive)
+        rep.log(f"Каталог обновлён: {len(names)} файлов, удалено записей: {removed}", "success")
+        return {"files": len(names), "removed": removed, "counts": catalog.counts(args.target)}
+    finally:
+        catalog.close()
+
+
+def run(args: argparse.Namespace, rep: Reporter, cancel: CancelToken):
+    if args.command == "catalog":
+        return run_catalog(args, rep, cancel)
+    catalog = open_catalog(args.catalog, rep.log) if args.use_catalog else None
+    try:
+        if args.command == "dedupe":
+            return run_dedupe(args, rep, cancel, catalog)
+        return _run(args, rep, cancel, catalog)
+    finally:
+        if catalog is not None:
+            catalog.close()
+
+
+def run_dedupe(args: argparse.Namespace, rep: Reporter, cancel: CancelToken, catalog: Catalog | None):
+    if not os.path.isdir(args.folder) and not is_archive(args.folder):
+        raise ValueError("Папка не существует!")
+    files = list(iter_mafiles(args.folder, args.recursive, exclude=OUTPUT_DIRS))
+    report = find_duplicates(args.folder, files, args.keep, catalog=catalog, cancel=cancel)
+    # the JSON report carries every group; the console gets them all too
+    log_report(report, rep.log, limit=10 if args.json else len(report["groups"]))
+    if not report["groups"]:
+        rep.log(f"Дубликатов нет: {report['files']} файлов", "success")
+    if args.report:
+        save_report(args.report, report)
+        rep.log(f"Отчёт сохранён: {args.report}", "info")
+    return report
+
+
+def _run(args: argparse.Namespace, rep: Reporter, cancel: CancelToken, catalog: Catalog | None):
+    metrics = Metrics(args.command, args.metrics) if args.metrics else NULL_METRICS
+    durability = Durability(args.durability, args.sync_every, args.sync_interval)
+    if args.command == "asf":
+        with metrics.stage("list"):
+            files = _expand_mafiles(args.mafiles, args.recursive)
+        if not files:
+            raise ValueError("Не найдено maFile файлов")
+        conv = AsfConverter(
+            log=rep.log,
+            progress=rep.progress,
+            streaming=args.streaming,
+            archive=args.archive,
+            compress_level=args.level,
+            metrics=metrics,
+            json_backend=args.json_backend,
+            compact_json=args.compact,
+            verify_json=args.verify_json,
+            workers=args.workers,
+            cancel=cancel,
+            resume=args.resume,
+            durability=durability,
+            catalog=catalog,
+        )
+        res = conv.convert(files, args.logpass, args.output)
+        return {"success": res["success"], "failed": [list(f) for f in res["failed"]], "output_folder": res["output_folder"]}
+
+    folder = args.folder
+    if not os.path.isdir(folder) and not is_archive(folder):
+        raise ValueError("Папка не существует!")
+    if args.command == "watch":
+        # a per-batch report would only repeat itself; the watcher logs its own counters
+        metrics = NULL_METRICS
+    else:
+        with metrics.stage("list"):
+            files = list(iter_mafiles(folder, args.recursive, exclude=OUTPUT_DIRS))
+        if not files:
+            raise ValueError("В папке нет maFile файлов.")
+        rep.log(f"Начата обработка: {len(files)} файлов", "info")
+    proc = MaFileProcessor(
+        log=rep.log,
+        progress=rep.progress,
+        workers=args.workers,
+        executor=args.executor,
+        incremental=args.incremental or args.command == "watch",
+        link=args.link,
+        archive=args.archive,
+        compress_level=args.level,
+        metrics=metrics,
+        json_backend=args.json_backend,
+        compact_json=args.compact,
+        verify_json=args.verify_json,
+        io_workers=args.io_workers,
+        cancel=cancel,
+        resume=args.resume,
+        durability=durability,
+        catalog=catalog,
+        dedupe=args.dedupe,
+    )
+    if args.command == "watch":
+        watcher = FolderWatcher(folder, args.recursive, args.debounce, args.poll_interval, cancel, args.watch_backend)
+        return process_forever(proc, watcher, [int(m) for m in args.modes.split(",") if m.strip()])
+    if args.command == "multi":
+        modes = [int(m) for m in args.modes.split(",") if m.strip()]
+        out_dirs = proc.process_modes(folder, files, modes)
+        return {"output_folders": {str(m): d for m, d in out_dirs.items()}, "total": len(files)}
+    out_dir = getattr(proc, f"process_{args.command}")(folder, files)
+    return {"output_folder": out_dir, "total": len(files)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    rep = Reporter(args.json)
+    cancel = CancelToken()
+
+    def on_sigint(signum, frame):
+        # first Ctrl+C stops after the current file, a second one kills
+        cancel.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    prev = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        res = run(args, rep, cancel)
+    except Cancelled as e:
+        rep.fail(str(e))
+        return 130
+    except Exception as e:
+        rep.fail(str(e))
+        return 1
+    finally:
+        signal.signal(signal.SIGINT, prev)
+    rep.done(res)
+    return 0
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "stdlib")
+
+
+class _Constant(float):
+    # NaN / Infinity from a stdlib-decoded document; orjson would write these as
+    # null, but refuses float subclasses, so such documents are encoded by stdlib
+    pass
+
+
+def _reindent(text: bytes, indent: int) -> bytes:
+    # orjson only indents by 2. String values cannot hold a raw newline, so
+    # every "\n" + spaces is indentation; widen it one nesting level per pass
+    # (after pass k-1 a line at depth >= k starts with 2k + (indent-2)(k-1) spaces)
+    extra = b" " * (indent - 2)
+    k = 1
+    while True:
+        pat = b"\n" + b" " * (indent * k - indent + 2)
+        if pat not in text:
+            return text
+        text = text.replace(pat, pat + extra)
+        k += 1
+
+
+def _same(a: Any, b: Any) -> bool:
+    # == with NaN equal to itself
+    return a == b or json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+
+class JsonCodec:
+    # One place for every maFile decode/encode. The fast backend handles what
+    # it can reproduce byte-for-byte (indent 2, or 4 via re-indent, or compact)
+    # and anything it rejects (NaN, ints beyond 64 bits, lone surrogates, a BOM)
+    # falls through to stdlib, so results and error messages match stdlib.
+    # Floats in exponent form may be spelled differently (1e16 vs 1e+16) but
+    # decode to the same value.
+    # `compact` drops indentation from every output; `verify` re-decodes each
+    # output with stdlib and raises if it is not the same document.
+    def __init__(self, backend: str = "auto", compact: bool = False, verify: bool = False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный JSON-модуль: {backend}")
+        if backend == "orjson" and orjson is None:
+            raise ValueError("orjson не установлен (pip install orjson)")
+        self.backend = "orjson" if backend != "stdlib" and orjson is not None else "stdlib"
+        self.compact = compact
+        self.verify = verify
+
+    def loads(self, raw: bytes) -> Any:
+        if self.backend == "orjson":
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(raw.decode("utf-8"), parse_constant=_Constant)
+
+    def dumps(self, obj: Any, indent: int | None = 2) -> str:
+        if self.compact:
+            indent = None
+        text = self._dumps(obj, indent)
+        if self.verify and not _same(json.loads(text), obj):
+            raise ValueError("JSON после сериализации не совпадает с исходным документом")
+        return text
+
+    def _dumps(self, obj: Any, indent: int | None) -> str:
+        if self.backend == "orjson" and indent in (None, 2, 4):
+            try:
+                out = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+            else:
+                if indent == 4:
+                    out = _reindent(out, 4)
+                return out.decode("utf-8")
+        if indent is None:
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        return json.dumps(obj, indent=indent, ensure_ascii=False)
+
+
+DEFAULT_CODEC = JsonCodec()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+from typing import TYPE_CHECKING
+
+from .fs import MaFileRef, is_archive, read_mafile, ref_name, ref_stat
+from .codec import DEFAULT_CODEC, JsonCodec
+from .cancel import NEVER, CancelToken, Cancelled
+from .metadata import STATUS_INCOMPLETE, STATUS_OK, read_metadata
+
+if TYPE_CHECKING:
+    from .catalog import Catalog
+
+# which copy of an account survives: first in name order, newest mtime, or
+# the most complete one (then the larger, then the newer). "first" and
+# "newest" choose among the most complete copies only, so an incomplete
+# copy never wins over a complete one
+KEEP_POLICIES = ("first", "newest", "complete")
+# written next to the output folders when processing with a keep policy
+DUPLICATES_REPORT = "duplicates.json"
+# bytes hashed before deciding whether a same-size pair needs a full hash
+PARTIAL_BYTES = 1024
+
+_RANK = {STATUS_OK: 2, STATUS_INCOMPLETE: 1}
+
+# {"policy", "files", "groups": [{"account_name", "steam_id", "reasons", "keep", "drop",
+#  "files": [{"name", "size", "mtime_ns", "status", "sha256"}]}], "dropped": [name, ...]}
+Report = dict
+
+
+def _head(folder: str, name: str, n: int) -> bytes:
+    if is_archive(folder):
+        return read_mafile(folder, name)[:n]
+    with open(os.path.join(folder, name), "rb") as f:
+        return f.read(n)
+
+
+def _content_hashes(folder: str, sizes: dict[str, int], known: dict[str, str], cancel: CancelToken) -> dict[str, str]:
+    # sha256 of every file that has a byte-identical twin candidate: files
+    # with a unique size are never read, the rest are told apart by their
+    # first PARTIAL_BYTES and only hashed in full when those match too
+    by_size: dict[int, list[str]] = {}
+    for name, size in sizes.items():
+        by_size.setdefault(size, []).append(name)
+    out: dict[str, str] = {}
+    for size, names in by_size.items():
+        if len(names) < 2:
+            continue
+        if cancel.cancelled:
+            raise Cancelled("Остановлено пользователем")
+        by_head: dict[str, list[str]] = {}
+        for name in names:
+            if name in known:
+                by_head.setdefault(known[name], []).append(name)
+                continue
+            try:
+                head = _head(folder, name, PARTIAL_BYTES)
+            except (OSError, KeyError):
+                continue
+            digest = hashlib.sha256(head).hexdigest()
+            if size <= PARTIAL_BYTES:
+                known[name] = digest
+            by_head.setdefault(digest, []).append(name)
+        for group in by_head.values():
+            if len(group) < 2:
+                continue
+            for name in group:
+                if name not in known:
+                    try:
+                        known[name] = hashlib.sha256(read_mafile(folder, name)).hexdigest()
+                    except (OSError, KeyError):
+                        continue
+                out[name] = known[name]
+    return out
+
+
+class _Groups:
+    # union-find over file names
+    def __init__(self):
+        self.parent: dict[str, str] = {}
+
+    def find(self, x: str) -> str:
+        root = x
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent.get(x, x)
+        return root
+
+    def union(self, a: str, b: str):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _keep_key(policy: str, f: dict) -> tuple:
+    # max() over the group in name order picks the copy to keep, so the
+    # earliest name wins ties
+    rank = _RANK.get(f["status"], 0)
+    if policy == "newest":
+        return rank, f["mtime_ns"]
+    if policy == "complete":
+        return rank, f["size"], f["mtime_ns"]
+    return (rank,)
+
+
+def find_duplicates(
+    folder: str,
+    files: list[MaFileRef],
+    policy: str = "first",
+    codec: JsonCodec = DEFAULT_CODEC,
+    catalog: Catalog | None = None,
+    cancel: CancelToken = NEVER,
+) -> Report:
+    # Groups copies of the same account: byte-identical files, and files
+    # sharing an account_name (any case: mode 1 writes {account_name}.maFile)
+    # or a SteamID. Each group keeps one file by `policy`; the rest go to
+    # report["dropped"]. Metadata comes from the catalog when it is current.
+    if policy not in KEEP_POLICIES:
+        raise ValueError(f"Неизвестное правило для дубликатов: {policy}")
+    info: dict[str, dict] = {}
+    by_acc: dict[str, str] = {}
+    by_sid: dict[str, str] = {}
+    groups = _Groups()
+    known: dict[str, str] = {}
+    records = {}
+    if catalog is not None:
+        from .catalog import entry_key
+
+        records = catalog.folder(folder)
+    for i, item in enumerate(files):
+        if i % 512 == 0 and cancel.cancelled:
+            raise Cancelled("Остановлено пользователем")
+        name = ref_name(item)
+        try:
+            size, mtime_ns = ref_stat(folder, item)
+        except (OSError, KeyError):
+            continue
+        rec = records.get(name)
+        if rec is not None and rec[:2] == (size, mtime_ns):
+            acc, sid, status = rec[2], rec[3], rec[5]
+            if rec[7]:
+                known[name] = rec[7]
+        else:
+            acc, sid, _, status, _ = read_metadata(folder, name, codec, catalog)
+            # the hash it just catalogued saves reading the file again below
+            rec = catalog.get(entry_key(folder, name), size, mtime_ns) if catalog is not None else None
+            if rec is not None and rec[7]:
+                known[name] = rec[7]
+        info[name] = {"name": name, "size": size, "mtime_ns": mtime_ns, "status": status, "account_name": acc, "steam_id": sid}
+        for key, index in ((acc.casefold(), by_acc), (sid, by_sid)):
+            if key:
+                if key in index:
+                    groups.union(index[key], name)
+                else:
+                    index[key] = name
+    digests = _content_hashes(folder, {n: f["size"] for n, f in info.items()}, known, cancel)
+    by_hash: dict[str, str] = {}
+    for name, digest in digests.items():
+        if digest in by_hash:
+            groups.union(by_hash[digest], name)
+        else:
+            by_hash[digest] = name
+
+    members: dict[str, list[str]] = {}
+    for name in groups.parent:
+        members.setdefault(groups.find(name), []).append(name)
+    for root in list(members):
+        members[root].append(root)
+    report: Report = {"policy": policy, "files": len(info), "groups": [], "dropped": []}
+    for names in members.values():
+        if len(names) < 2:
+            continue
+        names = sorted(set(names))
+        fs = [info[n] for n in names]
+        keep = max(fs, key=lambda f: _keep_key(policy, f))["name"]
+        reasons = []
+        if len({digests.get(n) for n in names} - {None}) < sum(1 for n in names if n in digests):
+            reasons.append("content")
+        for field in ("account_name", "steam_id"):
+            values = [f[field].casefold() for f in fs if f[field]]
+            if len(set(values)) < len(values):
+                reasons.append(field)
+        drop = [n for n in names if n != keep]
+        report["groups"].append({
+            "account_name": info[keep]["account_name"],
+            "steam_id": info[keep]["steam_id"],
+            "reasons": reasons,
+            "keep": keep,
+            "drop": drop,
+            "files": [{**{k: f[k] for k in ("name", "size", "mtime_ns", "status")}, "sha256": digests.get(f["name"])} for f in fs],
+        })
+        report["dropped"].extend(drop)
+    report["groups"].sort(key=lambda g: g["keep"])
+    report["dropped"].sort()
+    return report
+
+
+def save_report(path: str, report: Report):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def log_report(report: Report, log, limit: int = 10):
+    # one warning per group, at most `limit` of them
+    groups = report["groups"]
+    if not groups:
+        return
+    log(f"Найдено дубликатов: {len(report['dropped'])} файлов в {len(groups)} группах, "
+        f"оставлено по правилу «{report['policy']}»", "warning")
+    for g in groups[:limit]:
+        who = g["account_name"] or g["steam_id"] or "одинаковое содержимое"
+        log(f"{who}: оставлен {g['keep']}, пропущены: {', '.join(g['drop'])}", "warning")
+    if len(groups) > limit:
+        log(f"… и ещё {len(groups) - limit} групп", "warning")
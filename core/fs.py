@@ -1,22 +1,211 @@
 from __future__ import annotations
 import os
+import sys
+import time
+import threading
+from typing import TYPE_CHECKING, Callable, Collection, Iterator, Union
+
+if TYPE_CHECKING:
+    import zipfile
+
+MAFILE_EXTS = (".mafile", ".mafiles")
+# "<archive>.zip::<member>" addresses a maFile inside a zip without extracting it
+ARCHIVE_SEP = "::"
+
+
+class MaFileEntry:
+    # os.DirEntry-like record; `name` is relative to the scanned root
+    __slots__ = ("name", "path", "_entry", "_stat")
+
+    def __init__(self, name: str, entry: os.DirEntry):
+        self.name = name
+        self.path = entry.path
+        self._entry = entry
+        self._stat: os.stat_result | None = None
+
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            self._stat = self._entry.stat()
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        return self.stat().st_size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.stat().st_mtime_ns
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"<MaFileEntry {self.name!r}>"
+
+
+class ArchiveEntry:
+    # MaFileEntry counterpart for a zip member; `name` is the member name
+    __slots__ = ("name", "path", "size", "mtime_ns")
+
+    def __init__(self, archive: str, info: zipfile.ZipInfo):
+        self.name = info.filename
+        self.path = f"{archive}{ARCHIVE_SEP}{info.filename}"
+        self.size = info.file_size
+        self.mtime_ns = int(time.mktime(info.date_time + (0, 0, -1)) * 1_000_000_000)
+
+    def __repr__(self) -> str:
+        return f"<ArchiveEntry {self.path!r}>"
+
+
+AnyEntry = Union[MaFileEntry, ArchiveEntry]
+# plain relative names (list_mafiles) or scanned entries with cached stat (iter_mafiles);
+# the folder may also be a .zip, in which case names are member names
+MaFileRef = Union[str, AnyEntry]
+
+_zips = threading.local()
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(".zip") and os.path.isfile(path)
+
+
+def _zip(archive: str) -> zipfile.ZipFile:
+    # one handle per thread (ZipFile serializes reads on a shared handle) and per
+    # process: a forked worker must not share the parent's file offset
+    handles = getattr(_zips, "handles", None)
+    if handles is None or _zips.pid != os.getpid():
+        handles = _zips.handles = {}
+        _zips.pid = os.getpid()
+    zf = handles.get(archive)
+    if zf is None:
+        import zipfile  # first archive source; keeps it off the startup path
+
+        zf = handles[archive] = zipfile.ZipFile(archive)
+    return zf
+
+
+def close_archives():
+    if getattr(_zips, "pid", None) == os.getpid() and _zips.handles:
+        for zf in _zips.handles.values():
+            zf.close()
+    _zips.handles = None
+
+
+def split_archive_path(path: str) -> tuple[str, str] | None:
+    archive, sep, member = path.partition(ARCHIVE_SEP)
+    if sep and is_archive(archive):
+        return archive, member
+    return None
+
+
+def output_base(source: str) -> str:
+    # folder that receives fullmafiles/... for a source folder or archive
+    return os.path.splitext(source)[0] if is_archive(source) else source
+
+
+def read_mafile(source: str, name: str | None = None) -> bytes:
+    # read("folder", "x.maFile"), read("batch.zip", "x.maFile") or read("batch.zip::x.maFile")
+    if name is None:
+        parts = split_archive_path(source)
+        if parts is None:
+            with open(source, "rb") as f:
+                return f.read()
+        source, name = parts
+    if is_archive(source):
+        return _zip(source).read(name)
+    with open(os.path.join(source, name), "rb") as f:
+        return f.read()
+
+
+def stat_mafile(source: str, name: str) -> tuple[int, int]:
+    # -> (size, mtime_ns)
+    if is_archive(source):
+        e = ArchiveEntry(source, _zip(source).getinfo(name))
+        return e.size, e.mtime_ns
+    st = os.stat(os.path.join(source, name))
+    return st.st_size, st.st_mtime_ns
+
+
+def ref_name(item: MaFileRef) -> str:
+    return item if isinstance(item, str) else item.name
+
+
+def ref_stat(source: str, item: MaFileRef) -> tuple[int, int]:
+    # stat_mafile, from the scan cache when the item is an entry
+    return stat_mafile(source, item) if isinstance(item, str) else (item.size, item.mtime_ns)
+
+
+def is_mafile(name: str) -> bool:
+    return name.lower().endswith(MAFILE_EXTS)
+
+
+def _iter_archive(archive: str, recursive: bool) -> Iterator[ArchiveEntry]:
+    for info in _zip(archive).infolist():
+        if info.is_dir() or (not recursive and "/" in info.filename):
+            continue
+        if is_mafile(info.filename.rsplit("/", 1)[-1]):
+            yield ArchiveEntry(archive, info)
+
+
+def iter_mafiles(
+    folder: str,
+    recursive: bool = False,
+    exclude: Collection[str] = (),
+    on_dir: Callable[[str], None] | None = None,
+) -> Iterator[AnyEntry]:
+    # on_dir(path) runs before each directory is listed (listing cache stamps)
+    if folder and is_archive(folder):
+        yield from _iter_archive(folder, recursive)
+        return
+    if not folder or not os.path.isdir(folder):
+        return
+    stack = [("", folder)]
+    while stack:
+        prefix, path = stack.pop()
+        try:
+            if on_dir is not None:
+                on_dir(path)
+            it = os.scandir(path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        if is_mafile(entry.name):
+                            yield MaFileEntry(prefix + entry.name, entry)
+                    elif recursive and entry.is_dir(follow_symlinks=False) and entry.name not in exclude:
+                        stack.append((prefix + entry.name + os.sep, entry.path))
+                except OSError:
+                    continue
+
+
+def list_mafiles(folder: str, recursive: bool = False, exclude: Collection[str] = ()) -> list[str]:
+    return sorted(e.name for e in iter_mafiles(folder, recursive, exclude))
 
-def list_mafiles(folder: str) -> list[str]:
-    if not folder or not os.path.exists(folder):
-        return []
-    out: list[str] = []
-    for name in os.listdir(folder):
-        low = name.lower()
-        if low.endswith(".mafile") or low.endswith(".mafiles"):
-            out.append(name)
-    for name in os.listdir(folder):
-        if name.endswith(".maFile") or name.endswith(".maFiles"):
-            if name not in out:
-                out.append(name)
-    return sorted(out)
 
 def remove_mafile_extension(filename: str) -> str:
     for ext in [".mafile", ".mafiles", ".maFile", ".maFiles"]:
         if filename.lower().endswith(ext.lower()):
             return filename[: -len(ext)]
     return os.path.splitext(filename)[0]
+
+
+def app_dir(*parts: str) -> str:
+    # per-user data directory (logs, catalog), readable by the owner only:
+    # it holds account names. MAFILE_MANAGER_HOME overrides the location.
+    root = os.environ.get("MAFILE_MANAGER_HOME")
+    if not root:
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+        elif sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Application Support")
+        else:
+            base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        root = os.path.join(base, "MaFileManager")
+    path = os.path.join(root, *parts)
+    for d in (root, path):
+        os.makedirs(d, mode=0o700, exist_ok=True)
+        if sys.platform != "win32":
+            os.chmod(d, 0o700)
+    return path
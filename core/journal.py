@@ -0,0 +1,95 @@
+from __future__ import annotations
+import os
+import json
+import time
+
+JOURNAL_VERSION = 1
+
+
+def journal_path(out_dir: str) -> str:
+    out_dir = os.path.normpath(out_dir)
+    return os.path.join(os.path.dirname(out_dir), f".{os.path.basename(out_dir)}.journal.jsonl")
+
+
+class Journal:
+    # Append-only checkpoint of finished work, one JSON object per line after a
+    # {"version", "job"} header. A journal written for a different job (other
+    # modes, other logpass file, ...) is ignored and replaced. Lines are
+    # flushed as they are written and fsynced at most every `sync_interval`
+    # seconds; a torn last line after a crash is simply dropped on load.
+    def __init__(self, path: str, job: dict, resume: bool = True, sync_interval: float = 1.0):
+        self.path = path
+        self.job = job
+        self.sync_interval = sync_interval
+        self.done: dict[str, dict] = {}
+        self._f = None
+        self._last_sync = 0.0
+        if resume:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != JOURNAL_VERSION or header.get("job") != self.job:
+                    return
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break
+                    self.done[rec.pop("key")] = rec
+        except (OSError, ValueError, AttributeError):
+            self.done = {}
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.done
+
+    def get(self, key: str) -> dict | None:
+        return self.done.get(key)
+
+    def _open(self):
+        if self.done:
+            # resuming: keep what is there, drop a torn tail by rewriting it
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"version": JOURNAL_VERSION, "job": self.job}, ensure_ascii=False) + "\n")
+                for key, rec in self.done.items():
+                    f.write(json.dumps({"key": key, **rec}, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+            self._f = open(self.path, "a", encoding="utf-8")
+        else:
+            self._f = open(self.path, "w", encoding="utf-8")
+            self._f.write(json.dumps({"version": JOURNAL_VERSION, "job": self.job}, ensure_ascii=False) + "\n")
+
+    def record(self, key: str, **fields):
+        if self._f is None:
+            self._open()
+        self.done[key] = fields
+        self._f.write(json.dumps({"key": key, **fields}, ensure_ascii=False) + "\n")
+        self._f.flush()
+        now = time.monotonic()
+        if now - self._last_sync >= self.sync_interval:
+            os.fsync(self._f.fileno())
+            self._last_sync = now
+
+    def close(self):
+        # keep the file: the job was interrupted and can be resumed
+        if self._f is not None:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            self._f = None
+
+    def discard(self):
+        # the job finished; nothing to resume
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Collection
+
+from .fs import is_archive, iter_mafiles
+from .cancel import NEVER, CancelToken, Cancelled
+
+# {path: mtime_ns} of every directory listed (or of the archive itself)
+Stamp = dict[str, int]
+
+
+def stamp_valid(stamp: Stamp) -> bool:
+    try:
+        return all(os.stat(p).st_mtime_ns == m for p, m in stamp.items())
+    except OSError:
+        return False
+
+
+class ListingCache:
+    # Sorted maFile names per (folder, recursive, exclude). A directory's mtime
+    # changes whenever an entry is added, removed or renamed in it, so a
+    # listing stays valid while every directory it walked keeps its mtime;
+    # checking that is one stat per directory instead of a full scan.
+    # Edits to file contents do not matter here: only names are cached.
+    def __init__(self, check_every: int = 512):
+        self.check_every = check_every
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[Stamp, list[str]]] = {}
+
+    def _key(self, folder: str, recursive: bool, exclude: Collection[str]) -> tuple:
+        return os.path.abspath(folder), recursive, tuple(sorted(exclude))
+
+    def get(self, folder: str, recursive: bool = False, exclude: Collection[str] = ()) -> list[str] | None:
+        key = self._key(folder, recursive, exclude)
+        with self._lock:
+            hit = self._entries.get(key)
+        if hit is None or not stamp_valid(hit[0]):
+            return None
+        # callers get their own copy to hand to the processors
+        return list(hit[1])
+
+    def scan(self, folder: str, recursive: bool = False, exclude: Collection[str] = (), cancel: CancelToken = NEVER) -> list[str]:
+        # cached listing if still valid, otherwise a fresh scan that can be cancelled
+        cached = self.get(folder, recursive, exclude)
+        if cached is not None:
+            return cached
+        if not os.path.exists(folder):
+            raise FileNotFoundError(folder)
+        stamp: Stamp = {}
+
+        def on_dir(path: str):
+            if cancel.cancelled:
+                raise Cancelled("Сканирование отменено")
+            stamp[path] = os.stat(path).st_mtime_ns
+
+        if is_archive(folder):
+            on_dir(folder)
+        names = []
+        for i, e in enumerate(iter_mafiles(folder, recursive, exclude, on_dir), 1):
+            names.append(e.name)
+            if i % self.check_every == 0 and cancel.cancelled:
+                raise Cancelled("Сканирование отменено")
+        if cancel.cancelled:
+            raise Cancelled("Сканирование отменено")
+        names.sort()
+        with self._lock:
+            self._entries[self._key(folder, recursive, exclude)] = (stamp, names)
+        return list(names)
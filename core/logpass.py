@@ -0,0 +1,124 @@
+from __future__ import annotations
+import codecs
+from collections import Counter
+from itertools import repeat
+
+DELIMS = [":", ";", ",", "|", " ", "\t"]
+FALLBACK_ENCODINGS = ["utf-8", "cp1251", "latin-1"]
+SAMPLE_SIZE = 64 * 1024
+
+# (line number, reason)
+Reject = tuple[int, str]
+
+
+def detect_encoding(raw: bytes) -> tuple[str, int]:
+    # -> (encoding, BOM length)
+    if raw.startswith(codecs.BOM_UTF8):
+        return "utf-8", 3
+    if raw.startswith(codecs.BOM_UTF16_LE) or raw.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16", 0
+    sample = raw[:SAMPLE_SIZE]
+    if len(sample) >= 4 and sample.count(0) * 3 > len(sample):
+        # BOM-less UTF-16: ASCII text has every other byte zeroed
+        even = sample[0::2].count(0)
+        odd = sample[1::2].count(0)
+        return ("utf-16-be" if even > odd else "utf-16-le"), 0
+    return "", 0
+
+
+def decode(raw: bytes) -> str:
+    enc, skip = detect_encoding(raw)
+    if enc:
+        return raw[skip:].decode(enc)
+    for enc in FALLBACK_ENCODINGS:
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("latin-1")
+
+
+def _pick_delim(line: str) -> str:
+    for d in DELIMS:
+        if d in line:
+            return d
+    return ""
+
+
+def sniff_delimiter(lines: list[str], limit: int = 1000) -> str:
+    votes = Counter(_pick_delim(line) for line in lines[:limit] if line.strip())
+    votes.pop("", None)
+    return votes.most_common(1)[0][0] if votes else ""
+
+
+def split_lines(text: str) -> list[str]:
+    # same line boundaries as text-mode universal newlines
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.split("\n")
+
+
+def _parse_bulk(lines: list[str], delim: str) -> tuple[dict[str, str], list[Reject]] | None:
+    # every non-empty line splits on `delim`, so no per-line delimiter scan is needed
+    rows = list(filter(None, map(str.strip, lines)))
+    if not all(map(str.__contains__, rows, repeat(delim))):
+        return None
+    joined = "\n".join(rows)
+    if joined.count(delim) == len(rows):
+        # exactly one delimiter per row: split the whole block at C speed
+        cells = list(map(str.strip, joined.replace(delim, "\n").split("\n")))
+        if all(cells):
+            return dict(zip(cells[0::2], cells[1::2])), []
+
+    parts = [line.strip().partition(delim) for line in lines]
+    if any(head and not sep for head, sep, _ in parts):
+        return None
+    pairs = [(head.strip(), tail.strip()) for head, sep, tail in parts if sep]
+    out = {login: pwd for login, pwd in pairs if login and pwd}
+    rejects: list[Reject] = []
+    if len(out) < len(pairs) and not all(login and pwd for login, pwd in pairs):
+        rejects = [
+            (n, "пустой логин или пароль")
+            for n, (head, sep, tail) in enumerate(parts, 1)
+            if sep and not (head.strip() and tail.strip())
+        ]
+    return out, rejects
+
+
+def _parse_lines(lines: list[str]) -> tuple[dict[str, str], list[Reject]]:
+    out: dict[str, str] = {}
+    rejects: list[Reject] = []
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        d = _pick_delim(line)
+        if not d:
+            rejects.append((n, "нет разделителя"))
+            continue
+        login, _, pwd = line.partition(d)
+        login, pwd = login.strip(), pwd.strip()
+        if login and pwd:
+            out[login] = pwd
+        else:
+            rejects.append((n, "пустой логин или пароль"))
+    return out, rejects
+
+
+def parse_logpass_text(text: str) -> tuple[dict[str, str], list[Reject]]:
+    # A line splits on the first delimiter, in DELIMS priority, that it contains.
+    # When the sniffed delimiter is the only higher-priority one present in the
+    # whole text, that rule reduces to "split on the sniffed delimiter".
+    lines = split_lines(text)
+    dom = sniff_delimiter(lines)
+    if dom and not any(h in text for h in DELIMS[: DELIMS.index(dom)]):
+        res = _parse_bulk(lines, dom)
+        if res is not None:
+            return res
+    return _parse_lines(lines)
+
+
+def parse_logpass(path: str) -> tuple[dict[str, str], list[Reject]]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    return parse_logpass_text(decode(raw))
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(out_dir: str) -> str:
+    out_dir = os.path.normpath(out_dir)
+    return os.path.join(os.path.dirname(out_dir), f".{os.path.basename(out_dir)}.manifest.json")
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+class Manifest:
+    # input filename -> {"size", "mtime_ns", "sha256", "output"}, plus the
+    # outputs an input used to produce before it was renamed ("stale")
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.path = manifest_path(out_dir)
+        self.entries: dict[str, dict] = {}
+        self.stale: set[str] = set()
+        self.dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+            if doc.get("version") == MANIFEST_VERSION:
+                self.entries = doc.get("files", {})
+                self.stale = set(doc.get("stale", []))
+        except (OSError, ValueError):
+            pass
+
+    def get(self, fn: str) -> dict | None:
+        return self.entries.get(fn)
+
+    def output_exists(self, entry: dict) -> bool:
+        return os.path.exists(os.path.join(self.out_dir, entry["output"]))
+
+    def is_fresh(self, fn: str, size: int, mtime_ns: int) -> bool:
+        e = self.entries.get(fn)
+        return bool(e) and e["size"] == size and e["mtime_ns"] == mtime_ns and self.output_exists(e)
+
+    def update(self, fn: str, size: int, mtime_ns: int, sha256: str, output: str):
+        old = self.entries.get(fn)
+        if old and old["output"] != output:
+            # the input now produces another file (its account_name changed):
+            # the old output stays on disk with nothing producing it
+            self.stale.add(old["output"])
+        self.stale.discard(output)
+        self.entries[fn] = {"size": size, "mtime_ns": mtime_ns, "sha256": sha256, "output": output}
+        self.dirty = True
+
+    def orphans(self, present: set[str]) -> list[str]:
+        # outputs whose producing input is gone or now produces another file,
+        # and that no current input still produces
+        live = {e["output"] for fn, e in self.entries.items() if fn in present}
+        out: set[str] = set()
+        for name in sorted(self.stale):
+            if name not in live and os.path.exists(os.path.join(self.out_dir, name)):
+                out.add(name)
+            else:
+                self.stale.discard(name)
+                self.dirty = True
+        for fn in [fn for fn in self.entries if fn not in present]:
+            e = self.entries[fn]
+            if e["output"] in live:
+                del self.entries[fn]
+                self.dirty = True
+            elif self.output_exists(e):
+                out.add(e["output"])
+            else:
+                del self.entries[fn]
+                self.dirty = True
+        return sorted(out)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries, "stale": sorted(self.stale)}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self.dirty = False
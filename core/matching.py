@@ -0,0 +1,262 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+
+from .fs import remove_mafile_extension
+
+_SEPS = ["_", "-", ".", " ", "__", "--", ".."]
+_MAX_CHAR = "\U0010ffff"
+# characters compared per suffix-sorting pass
+_SORT_CHUNK = 16
+
+
+def match_variants(steam_id, filename: str) -> tuple[str, str, list[str]]:
+    fn = remove_mafile_extension(filename).strip()
+    sid = str(steam_id).strip()
+    variants = [sid, fn]
+
+    if sid.startswith("7656119"):
+        variants += [sid[7:], sid[3:], sid[-8:], sid[-10:], sid[-12:]]
+
+    for sep in _SEPS:
+        if sep in fn:
+            parts = [p for p in fn.split(sep) if p]
+            variants += parts
+
+    return sid, fn, list(dict.fromkeys(variants))
+
+
+class _Bucket:
+    # suffixes sharing a first character, sorted, and a min-tree of their
+    # alive login ids whose leaves start at index `leaves`
+    __slots__ = ("sa", "tree", "leaves")
+
+    def __init__(self, sa: array, tree: array, leaves: int):
+        self.sa = sa
+        self.tree = tree
+        self.leaves = leaves
+
+
+class LoginIndex:
+    # Built once per conversion. Logins keep the order of the source file: when
+    # several logins qualify, the earliest still-available one wins, exactly as
+    # the old linear scan over `available` did. Not thread-safe: match and
+    # remove from one thread.
+    def __init__(self, logpass: dict[str, str]):
+        self.logpass = logpass
+        self.logins = list(logpass)
+        self.alive = bytearray(b"\x01") * len(self.logins)
+        self.count = len(self.logins)
+        self.pos = {login: i for i, login in enumerate(self.logins)}
+        self.lower = [login.strip().lower() for login in self.logins]
+        self.by_lower: dict[str, list[int]] = {}
+        self.max_len = max(map(len, self.lower), default=0)
+        for i, lc in enumerate(self.lower):
+            self.by_lower.setdefault(lc, []).append(i)
+        self._first = 0
+        # substring index, built on the first substring query. Suffix c (of
+        # all logins' suffixes, numbered in order) is lower[_owner[c]][_offset[c]:];
+        # suffixes are bucketed by their first character and a bucket is only
+        # sorted (into a _Bucket) when a query starting with that character
+        # comes, so memory stays a few ints per suffix and no query waits for
+        # the whole index. _rank[c] is c's position in its sorted bucket.
+        self._owner = array("i")
+        self._offset = array("i")
+        self._start = array("i")
+        self._rank = array("i")
+        self._unsorted: dict[str, array] | None = None
+        self._sorted: dict[str, _Bucket] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, login: str) -> bool:
+        i = self.pos.get(login)
+        return i is not None and bool(self.alive[i])
+
+    def remove(self, login: str):
+        i = self.pos.get(login)
+        if i is not None and self.alive[i]:
+            self.alive[i] = 0
+            self.count -= 1
+            self._mark(i, len(self.logins))
+
+    def remaining(self) -> list[tuple[str, str]]:
+        return [(login, self.logpass[login]) for i, login in enumerate(self.logins) if self.alive[i]]
+
+    def _first_alive(self) -> int | None:
+        while self._first < len(self.logins) and not self.alive[self._first]:
+            self._first += 1
+        return self._first if self._first < len(self.logins) else None
+
+    def _refine(self, codes: list[int], depth: int) -> list[int]:
+        # suffixes sharing their first `depth` characters, in suffix order;
+        # compares _SORT_CHUNK characters per pass so no whole suffix of a
+        # long login is ever built
+        lower, owner, offset = self.lower, self._owner, self._offset
+        end = depth + _SORT_CHUNK
+        keys = {c: lower[owner[c]][offset[c] + depth:offset[c] + end] for c in codes}
+        codes.sort(key=keys.__getitem__)
+        return self._split_ties(codes, keys, end)
+
+    def _split_ties(self, codes: list[int], keys, depth: int) -> list[int]:
+        # sort further the runs whose _SORT_CHUNK-long keys tie
+        out: list[int] = []
+        a = 0
+        n = len(codes)
+        while a < n:
+            key = keys[codes[a]]
+            b = a + 1
+            if len(key) == _SORT_CHUNK:
+                while b < n and keys[codes[b]] == key:
+                    b += 1
+            if b - a > 1:
+                out += self._refine(codes[a:b], depth)
+            else:
+                out.append(codes[a])
+            a = b
+        return out
+
+    def _build_suffixes(self):
+        owner, offset, start = self._owner, self._offset, self._start
+        buckets: dict[str, array] = {}
+        c = 0
+        start.append(0)
+        for i, lc in enumerate(self.lower):
+            owner.extend(repeat(i, len(lc)))
+            offset.extend(range(len(lc)))
+            for ch in lc:
+                b = buckets.get(ch)
+                if b is None:
+                    b = buckets[ch] = array("i")
+                b.append(c)
+                c += 1
+            start.append(c)
+        self._rank = array("i", bytes(4 * c))
+        self._unsorted = buckets
+
+    def _bucket(self, ch: str) -> _Bucket | None:
+        # sorted suffixes starting with `ch`, sorting them on first use
+        b = self._sorted.get(ch)
+        if b is not None:
+            return b
+        if self._unsorted is None:
+            self._build_suffixes()
+        codes = self._unsorted.pop(ch, None)
+        if codes is None:
+            return None
+        lower, owner, offset = self.lower, self._owner, self._offset
+        keys = {c: lower[owner[c]][offset[c]:offset[c] + _SORT_CHUNK] for c in codes}
+        order = sorted(codes, key=keys.__getitem__)
+        # only equal _SORT_CHUNK-long keys need a closer look
+        full = [key for key in keys.values() if len(key) == _SORT_CHUNK]
+        if len(set(full)) < len(full):
+            order = self._split_ties(order, keys, _SORT_CHUNK)
+        del full
+        del keys
+        sa = array("i", order)
+        rank = self._rank
+        for r, c in enumerate(sa):
+            rank[c] = r
+        none = len(self.logins)
+        n = 1
+        while n < len(sa):
+            n *= 2
+        alive = self.alive
+        tree = array("i", [none]) * n
+        tree.extend(owner[c] if alive[owner[c]] else none for c in sa)
+        tree.extend(array("i", [none]) * (n - len(sa)))
+        leaves = n
+        while n > 1:
+            half = n // 2
+            tree[half:n] = array("i", map(min, tree[n:2 * n:2], tree[n + 1:2 * n:2]))
+            n = half
+        b = self._sorted[ch] = _Bucket(sa, tree, leaves)
+        return b
+
+    def _mark(self, i: int, value: int):
+        # set the tree leaves of login i's suffixes to `value` in the sorted buckets
+        if not self._sorted:
+            return
+        rank = self._rank
+        for c, ch in enumerate(self.lower[i], self._start[i]):
+            b = self._sorted.get(ch)
+            if b is None:
+                continue
+            tree = b.tree
+            j = b.leaves + rank[c]
+            tree[j] = value
+            j //= 2
+            while j:
+                tree[j] = min(tree[2 * j], tree[2 * j + 1])
+                j //= 2
+
+    def _containing(self, q: str) -> int | None:
+        # earliest alive login whose lowercase form contains q: the suffixes
+        # starting with q are one range of q[0]'s sorted bucket, and its
+        # min-tree gives the smallest alive id in that range in O(log n)
+        b = self._bucket(q[0])
+        if b is None:
+            return None
+        sa, owner, offset, lower = b.sa, self._owner, self._offset, self.lower
+
+        def suffix(j: int) -> str:
+            c = sa[j]
+            return lower[owner[c]][offset[c]:]
+
+        lo = bisect_left(range(len(sa)), q, key=suffix)
+        hi = bisect_right(range(len(sa)), q + _MAX_CHAR, lo, key=suffix)
+        tree = b.tree
+        best = len(self.logins)
+        lo += b.leaves
+        hi += b.leaves
+        while lo < hi:
+            if lo & 1:
+                best = min(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = min(best, tree[hi])
+            lo //= 2
+            hi //= 2
+        return best if best < len(self.logins) else None
+
+    def _contained_in(self, q: str) -> int | None:
+        # earliest alive login whose lowercase form is a substring of q
+        best = next((i for i in self.by_lower.get("", ()) if self.alive[i]), None)
+        n = len(q)
+        seen: set[str] = set()
+        for a in range(n):
+            for b in range(a + 1, min(n, a + self.max_len) + 1):
+                sub = q[a:b]
+                if sub in seen:
+                    continue
+                seen.add(sub)
+                for i in self.by_lower.get(sub, ()):
+                    if self.alive[i]:
+                        if best is None or i < best:
+                            best = i
+                        break
+        return best
+
+    def match(self, steam_id, filename: str) -> tuple[str | None, str | None]:
+        if not self.count:
+            return None, None
+        sid, fn, variants = match_variants(steam_id, filename)
+        for v in variants:
+            if v in self:
+                return v, self.logpass[v]
+
+        sid_l = sid.lower()
+        fn_l = fn.lower()
+        if not sid_l or not fn_l:
+            i = self._first_alive()
+        else:
+            found = [self._contained_in(sid_l), self._containing(sid_l), self._contained_in(fn_l), self._containing(fn_l)]
+            found = [i for i in found if i is not None]
+            i = min(found) if found else None
+        if i is None:
+            return None, None
+        login = self.logins[i]
+        return login, self.logpass[login]
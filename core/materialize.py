@@ -0,0 +1,84 @@
+from __future__ import annotations
+import os
+import sys
+import errno
+import shutil
+
+# strategies in fallback order: each one falls back to the ones after it
+STRATEGIES = ("hardlink", "reflink", "copy")
+
+_FICLONE = 0x40049409
+# (strategy, output dir) pairs that already failed with a "not supported here" error
+_unsupported: set[tuple[str, str]] = set()
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS, errno.EMLINK, errno.ENOTTY}
+
+
+def _tmp_name(dst: str) -> str:
+    return f"{dst}.{os.getpid()}.tmp"
+
+
+def _hardlink(src: str, dst: str):
+    tmp = _tmp_name(dst)
+    os.link(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _clone(fi, fo):
+    # FICLONE shares extents (btrfs, xfs); where it is not supported,
+    # copy_file_range copies inside the kernel (or server side, on NFS)
+    import fcntl
+
+    try:
+        fcntl.ioctl(fo.fileno(), _FICLONE, fi.fileno())
+        return
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS or not hasattr(os, "copy_file_range"):
+            raise
+    size = os.fstat(fi.fileno()).st_size
+    while size > 0:
+        n = os.copy_file_range(fi.fileno(), fo.fileno(), size)
+        if n == 0:
+            break
+        size -= n
+
+
+def _reflink(src: str, dst: str):
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOTSUP, "reflink не поддерживается")
+    tmp = _tmp_name(dst)
+    with open(src, "rb") as fi, open(tmp, "wb") as fo:
+        try:
+            _clone(fi, fo)
+        except BaseException:
+            fo.close()
+            os.remove(tmp)
+            raise
+    shutil.copystat(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _copy(src: str, dst: str):
+    shutil.copy2(src, dst)
+
+
+_IMPL = {"hardlink": _hardlink, "reflink": _reflink, "copy": _copy}
+
+
+def materialize(src: str, dst: str, strategy: str = "copy") -> str:
+    # Places `src` at `dst` using the cheapest available strategy starting from
+    # `strategy`; returns the one that worked.
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Неизвестный способ записи: {strategy}")
+    out_dir = os.path.dirname(os.path.abspath(dst))
+    for name in STRATEGIES[STRATEGIES.index(strategy):]:
+        if name != "copy" and (name, out_dir) in _unsupported:
+            continue
+        try:
+            _IMPL[name](src, dst)
+            return name
+        except OSError as e:
+            if name == "copy":
+                raise
+            if e.errno in _UNSUPPORTED_ERRNOS:
+                _unsupported.add((name, out_dir))
+    return "copy"
@@ -0,0 +1,69 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from .fs import read_mafile, stat_mafile
+from .codec import DEFAULT_CODEC, JsonCodec
+from .manifest import content_hash
+
+if TYPE_CHECKING:
+    from .catalog import Catalog
+
+STATUS_OK = "ok"
+# parsed, but missing a field every output mode needs
+STATUS_INCOMPLETE = "incomplete"
+STATUS_INVALID = "invalid"
+
+# (account_name, SteamID, size, status, error message)
+MaFileMeta = tuple[str, str, int, str, str]
+# (account_name, SteamID, has shared_secret, status, error message)
+Facts = tuple[str, str, bool, str, str]
+
+
+def describe(data) -> Facts:
+    # the catalogued fields of a decoded maFile
+    if not isinstance(data, dict):
+        return "", "", False, STATUS_INVALID, "не JSON-объект"
+    acc = data.get("account_name") or ""
+    session = data.get("Session")
+    sid = session.get("SteamID") if isinstance(session, dict) else None
+    sid = "" if sid is None else str(sid)
+    if not isinstance(acc, str):
+        acc = str(acc)
+    secret = bool(data.get("shared_secret"))
+    # the same fields mode 2/3 require
+    if not (acc and sid and secret):
+        return acc, sid, secret, STATUS_INCOMPLETE, "неполные данные"
+    return acc, sid, secret, STATUS_OK, ""
+
+
+def read_metadata(folder: str, name: str, codec: JsonCodec = DEFAULT_CODEC, catalog: Catalog | None = None) -> MaFileMeta:
+    # what the file browser shows for one maFile; never raises. With a
+    # catalog, unchanged files are answered from it and new ones added.
+    try:
+        size, mtime_ns = stat_mafile(folder, name)
+    except Exception as e:
+        return "", "", -1, STATUS_INVALID, str(e)
+    key = ""
+    if catalog is not None:
+        from .catalog import entry_key
+
+        key = entry_key(folder, name)
+        rec = catalog.get(key, size, mtime_ns)
+        if rec is not None:
+            return rec[2], rec[3], size, rec[5], rec[6]
+    digest = None
+    try:
+        raw = read_mafile(folder, name)
+    except Exception as e:
+        # unreadable now says nothing about later: not catalogued
+        return "", "", size, STATUS_INVALID, str(e)
+    try:
+        if catalog is not None:
+            digest = content_hash(raw)
+        facts = describe(codec.loads(raw))
+    except Exception as e:
+        facts = "", "", False, STATUS_INVALID, str(e)
+    if catalog is not None:
+        catalog.put(key, (size, mtime_ns, *facts, digest))
+    acc, sid, _, status, error = facts
+    return acc, sid, size, status, error
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
+# upper bounds of the per-file latency buckets, ms; the last bucket is open
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def peak_rss_mb() -> float | None:
+    # peak resident set of this process; None where it cannot be measured
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("Б", "КБ", "МБ"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "Б" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} ГБ"
+
+
+def _bucket(ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if ms < bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _bucket_label(i: int) -> str:
+    if i == len(LATENCY_BUCKETS_MS):
+        return f">={LATENCY_BUCKETS_MS[-1]}ms"
+    return f"<{LATENCY_BUCKETS_MS[i]}ms"
+
+
+class Metrics:
+    # Opt-in per-run counters: wall time per stage, per-file latency histogram,
+    # bytes read/written, peak RSS. Thread-safe; process-pool workers collect
+    # into their own Metrics and ship raw() back to be merge()d.
+    enabled = True
+
+    def __init__(self, name: str = "", report_path: str | None = None, clock: Callable[[], float] = time.perf_counter):
+        self.name = name
+        self.report_path = report_path
+        self.clock = clock
+        self.stages: dict[str, list] = {}  # stage -> [seconds, calls]
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self._lock = threading.Lock()
+        self._t0 = clock()
+        self._wall: float | None = None
+
+    def __getstate__(self) -> dict:
+        # per-file instances ride along with pipeline items into pool workers
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        with self._lock:
+            s = self.stages.get(stage)
+            if s is None:
+                self.stages[stage] = [seconds, calls]
+            else:
+                s[0] += seconds
+                s[1] += calls
+
+    @contextmanager
+    def stage(self, name: str):
+        t = self.clock()
+        try:
+            yield
+        finally:
+            self.add(name, self.clock() - t)
+
+    def timed(self, stage: str, fn: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            t = self.clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, self.clock() - t)
+        return wrapper
+
+    def count_bytes(self, read: int = 0, written: int = 0):
+        with self._lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+    def file_done(self, seconds: float):
+        with self._lock:
+            self.histogram[_bucket(seconds * 1000)] += 1
+            self.latency_sum += seconds
+            self.latency_max = max(self.latency_max, seconds)
+
+    def raw(self) -> dict:
+        return {
+            "stages": self.stages,
+            "read": self.bytes_read,
+            "written": self.bytes_written,
+            "histogram": self.histogram,
+            "latency_sum": self.latency_sum,
+            "latency_max": self.latency_max,
+        }
+
+    def merge(self, raw: dict):
+        for stage, (seconds, calls) in raw["stages"].items():
+            self.add(stage, seconds, calls)
+        with self._lock:
+            self.bytes_read += raw["read"]
+            self.bytes_written += raw["written"]
+            self.histogram = [a + b for a, b in zip(self.histogram, raw["histogram"])]
+            self.latency_sum += raw["latency_sum"]
+            self.latency_max = max(self.latency_max, raw["latency_max"])
+
+    def finish(self):
+        if self._wall is None:
+            self._wall = self.clock() - self._t0
+
+    def to_dict(self) -> dict:
+        wall = self._wall if self._wall is not None else self.clock() - self._t0
+        files = sum(self.histogram)
+        return {
+            "name": self.name,
+            "wall_seconds": wall,
+            "stages": {k: {"seconds": s, "calls": c} for k, (s, c) in self.stages.items()},
+            "files": files,
+            "files_per_second": files / wall if wall > 0 else 0.0,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "latency_ms": {
+                "mean": self.latency_sum * 1000 / files if files else 0.0,
+                "max": self.latency_max * 1000,
+                "histogram": {_bucket_label(i): n for i, n in enumerate(self.histogram)},
+            },
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def summary_lines(self) -> list[str]:
+        d = self.to_dict()
+        wall = d["wall_seconds"]
+        title = f"Замеры ({self.name})" if self.name else "Замеры"
+        lines = [f"{title}: {wall:.3f} с, {d['files']} файлов ({d['files_per_second']:.0f} файл/с)"]
+        # stages are summed over workers, so with a pool they can exceed wall time
+        for stage, s in sorted(d["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+            share = s["seconds"] * 100 / wall if wall > 0 else 0.0
+            lines.append(f"  {stage}: {s['seconds']:.3f} с ({share:.0f}%), вызовов {s['calls']}")
+        lat = d["latency_ms"]
+        if d["files"]:
+            hist = ", ".join(f"{k}: {n}" for k, n in lat["histogram"].items() if n)
+            lines.append(f"  на файл: среднее {lat['mean']:.2f} мс, макс {lat['max']:.2f} мс • {hist}")
+        lines.append(f"  прочитано {_format_bytes(d['bytes_read'])}, записано {_format_bytes(d['bytes_written'])}")
+        if d["peak_rss_mb"] is not None:
+            lines.append(f"  пик памяти: {d['peak_rss_mb']:.0f} МБ")
+        return lines
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def report(self, log: Callable[[str, str], None]):
+        # end of run: summary into the log, JSON next to it when a path was given
+        self.finish()
+        for line in self.summary_lines():
+            log(line, "info")
+        if self.report_path:
+            try:
+                self.save(self.report_path)
+                log(f"Отчёт о замерах: {self.report_path}", "info")
+            except OSError as e:
+                log(f"Не удалось сохранить отчёт о замерах: {e}", "warning")
+
+
+class NullMetrics:
+    # stand-in when instrumentation is off; every hook is a no-op
+    enabled = False
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        pass
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def timed(self, stage: str, fn: Callable) -> Callable:
+        return fn
+
+    def count_bytes(self, read: int = 0, written: int = 0):
+        pass
+
+    def file_done(self, seconds: float):
+        pass
+
+    def merge(self, raw: dict):
+        pass
+
+    def report(self, log: Callable[[str, str], None]):
+        pass
+
+
+NULL_METRICS = NullMetrics()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import os
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+EXECUTORS = ("thread", "process")
+
+
+def _process_pool():
+    # multiprocessing is only imported once a process pool is asked for
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor
+
+
+def default_workers() -> int:
+    return min(32, os.cpu_count() or 1)
+
+
+class Stage:
+    # One step of a pipeline: `fn` applied by `workers` threads, or dispatched
+    # to a process pool of that size when executor="process" (CPU-bound steps).
+    __slots__ = ("fn", "workers", "executor")
+
+    def __init__(self, fn: Callable, workers: int = 1, executor: str = "thread"):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Неизвестный тип пула: {executor}")
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.executor = executor
+
+
+_END = object()
+_POLL = 0.05
+
+
+def _map(fn: Callable, batch: list) -> list:
+    return [fn(x) for x in batch]
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for it in items:
+        batch.append(it)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def pipeline(items: Iterable, stages: list[Stage], window: int | None = None, batch: int = 16) -> Iterator:
+    # Yields stages[-1].fn(...stages[0].fn(item)) in input order. Stages run
+    # concurrently and hand items over in batches through bounded queues; at
+    # most `window` batches are between admission and delivery, so memory does
+    # not grow with the input even when one item stalls. An exception in any
+    # stage stops the pipeline and is re-raised here; closing the generator
+    # stops it too.
+    workers = sum(s.workers for s in stages)
+    window = max(len(stages) + 1, window or workers * 2)
+    queues = [queue.Queue(maxsize=max(2, s.workers * 2)) for s in stages]
+    stop = threading.Event()
+    slots = threading.Semaphore(window)
+    ready: dict[int, list] = {}
+    cond = threading.Condition()
+    state = {"error": None, "fed": None}
+    alive = [s.workers for s in stages]
+    pools = [_process_pool()(max_workers=s.workers) if s.executor == "process" else None for s in stages]
+
+    def fail(e: BaseException):
+        with cond:
+            if state["error"] is None:
+                state["error"] = e
+            cond.notify_all()
+        stop.set()
+
+    def put(q: queue.Queue, obj) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(obj, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def feed():
+        n = 0
+        try:
+            for n, chunk in enumerate(_batches(items, batch), 1):
+                while not slots.acquire(timeout=_POLL):
+                    if stop.is_set():
+                        return
+                if not put(queues[0], (n - 1, chunk)):
+                    return
+        except BaseException as e:
+            fail(e)
+            return
+        with cond:
+            state["fed"] = n
+            cond.notify_all()
+        for _ in range(stages[0].workers):
+            put(queues[0], _END)
+
+    def work(k: int):
+        stage, q_in, pool = stages[k], queues[k], pools[k]
+        last = k == len(stages) - 1
+        while not stop.is_set():
+            try:
+                job = q_in.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+            if job is _END:
+                break
+            idx, chunk = job
+            try:
+                chunk = pool.submit(_map, stage.fn, chunk).result() if pool else _map(stage.fn, chunk)
+            except BaseException as e:
+                fail(e)
+                return
+            if last:
+                with cond:
+                    ready[idx] = chunk
+                    cond.notify_all()
+            elif not put(queues[k + 1], (idx, chunk)):
+                return
+        with cond:
+            alive[k] -= 1
+            done = alive[k] == 0
+        if done and not last:
+            for _ in range(stages[k + 1].workers):
+                put(queues[k + 1], _END)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=work, args=(k,), daemon=True) for k, s in enumerate(stages) for _ in range(s.workers)]
+    for t in threads:
+        t.start()
+    try:
+        nxt = 0
+        while True:
+            with cond:
+                while nxt not in ready and state["error"] is None and state["fed"] != nxt:
+                    cond.wait()
+                if state["error"] is not None:
+                    raise state["error"]
+                if nxt not in ready:
+                    return
+                chunk = ready.pop(nxt)
+            slots.release()
+            nxt += 1
+            yield from chunk
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        for pool in pools:
+            if pool:
+                pool.shutdown(cancel_futures=True)
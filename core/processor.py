@@ -1,89 +1,518 @@
 from __future__ import annotations
 import os
-import json
-import shutil
-from typing import Callable
+from functools import partial
+from typing import Callable, Iterable
+
+from .parallel import Stage, pipeline
+from .manifest import Manifest, content_hash
+from .fs import MaFileRef, close_archives, is_archive, output_base, read_mafile, ref_name, ref_stat, stat_mafile
+from .progress import as_reporter
+from .metrics import NULL_METRICS, Metrics, NullMetrics
+from .codec import JsonCodec
+from .cancel import NEVER, CancelToken, Cancelled
+from .journal import Journal
+from .sinks import NO_SYNC, Durability, open_sink
+from .catalog import Catalog, Record, entry_key
+from .metadata import STATUS_INVALID, describe
+from .dedupe import DUPLICATES_REPORT, KEEP_POLICIES, find_duplicates, log_report, save_report
 
 LogCb = Callable[[str, str], None]
 ProgressCb = Callable[[int, str], None]
 
+# {"done": [mode, ...], "logs": [(message, level), ...], "status": {mode: "new" | "updated" | "skipped"},
+#  "outputs": {mode: output filename}, "stat": (size, mtime_ns, sha256) | None, "src": (size, mtime_ns) | None,
+#  "deferred": [(mode, output filename, payload), ...], "metrics": Metrics.raw() | None,
+#  "facts": metadata.Facts + (sha256,) to catalogue | None}
+FileResult = dict
+# (filename, ((mode, out_dir), ...), {mode: sha256 recorded in the manifest}, catalog record if still valid)
+FileTask = tuple[str, tuple[tuple[int, str], ...], dict[int, str], Record | None]
+
+
+def _render1(data: dict, codec: JsonCodec) -> tuple[str, str | None, str]:
+    acc = data.get("account_name", "")
+    if not acc:
+        return "", None, "нет account_name"
+    # None: the output is the source file itself
+    return f"{acc}.maFile", None, ""
+
+
+def _render2(data: dict, codec: JsonCodec) -> tuple[str, str | None, str]:
+    trimmed = {
+        "shared_secret": data.get("shared_secret", ""),
+        "account_name": data.get("account_name", ""),
+        "Session": {"SteamID": data.get("Session", {}).get("SteamID", "")},
+    }
+    acc = trimmed["account_name"]
+    if not (acc and trimmed["shared_secret"] and trimmed["Session"]["SteamID"]):
+        return "", None, "неполные данные"
+    return f"{acc}.maFile", codec.dumps(trimmed, indent=2), ""
+
+
+def _render3(data: dict, codec: JsonCodec) -> tuple[str, str | None, str]:
+    secret = data.get("shared_secret", "")
+    steamid = data.get("Session", {}).get("SteamID", "")
+    acc = data.get("account_name", "")
+    if not (secret and steamid and acc):
+        return "", None, "неполные данные"
+    trimmed = {"shared_secret": secret, "Session": {"SteamID": steamid}}
+    return f"{acc}.maFile", codec.dumps(trimmed, indent=4), ""
+
+
+TARGETS: dict[int, tuple[str, Callable[[dict, JsonCodec], tuple[str, str | None, str]]]] = {
+    1: ("fullmafiles", _render1),
+    2: ("shortmaffsmpanel", _render2),
+    3: ("shortmafdmpanel", _render3),
+}
+
+
+def _read_raw(folder: str, fn: str, archive: bool) -> tuple[bytes, tuple[int, int]]:
+    # -> (bytes, (size, mtime_ns))
+    if archive:
+        return read_mafile(folder, fn), stat_mafile(folder, fn)
+    with open(os.path.join(folder, fn), "rb") as f:
+        st = os.fstat(f.fileno())
+        return f.read(), (st.st_size, st.st_mtime_ns)
+
+
+# A file moves through three pipeline stages, carrying a context dict:
+# _read_file (I/O: read, hash, incremental skip) -> _transform_file (CPU: decode,
+# render) -> _write_file (I/O: write outputs). Failures are logged into the
+# result and empty ctx["targets"], so later stages just pass the file through.
+# The per-file Metrics travels in the context, across a process pool too.
+
+
+def _read_file(folder: str, hashing: bool, opts: dict, task: FileTask) -> dict:
+    fn, targets, known, hint = task
+    archive = is_archive(folder)
+    metrics = Metrics() if opts["timed"] else NULL_METRICS
+    res: FileResult = {"done": [], "logs": [], "status": {}, "outputs": {}, "stat": None, "src": None, "deferred": [],
+                       "metrics": None, "facts": None}
+    ctx = {"fn": fn, "known": known, "targets": targets, "raw": None, "acc": None, "writes": [], "res": res,
+           "metrics": metrics, "t0": metrics.clock() if metrics.enabled else 0.0, "catalog": opts["catalog"] and hint is None}
+    only1 = all(m == 1 for m, _ in targets)
+    # mode 1 alone only needs account_name: take it (and the hash) from the
+    # catalog without opening the file; an archive member is still read, mode 1
+    # writes its bytes
+    cached = hint is not None and only1 and not archive and bool(hint[2]) and (not hashing or hint[7] is not None)
+    try:
+        if cached:
+            st = hint[:2]
+            res["src"] = st
+            ctx["acc"] = hint[2]
+        else:
+            with metrics.stage("read"):
+                ctx["raw"], st = _read_raw(folder, fn, archive)
+            res["src"] = st
+            metrics.count_bytes(read=len(ctx["raw"]))
+        if hashing:
+            if cached:
+                digest = hint[7]
+            else:
+                with metrics.stage("hash"):
+                    digest = content_hash(ctx["raw"])
+            res["stat"] = (*st, digest)
+            pending = []
+            for mode, out_dir in targets:
+                if known.get(mode) == digest:
+                    res["done"].append(mode)
+                    res["status"][mode] = "skipped"
+                else:
+                    pending.append((mode, out_dir))
+            ctx["targets"] = tuple(pending)
+            if not pending:
+                ctx["raw"] = None
+                return ctx
+    except Exception as e:
+        res["logs"].append((f"{fn}: {e}", "error"))
+        ctx["targets"] = ()
+    return ctx
+
+
+def _transform_file(multi: bool, opts: dict, ctx: dict) -> dict:
+    fn, res, metrics, raw = ctx["fn"], ctx["res"], ctx["metrics"], ctx["raw"]
+    if not ctx["targets"]:
+        return ctx
+    # a full parse is catalogued, so later runs and the file browser can skip it
+    record = ctx["catalog"] and ctx["acc"] is None
+    digest = None
+    if record:
+        with metrics.stage("hash"):
+            digest = res["stat"][2] if res["stat"] else content_hash(raw)
+    try:
+        if ctx["acc"] is not None:
+            data = {"account_name": ctx["acc"]}
+        else:
+            with metrics.stage("decode"):
+                data = opts["codec"].loads(raw)
+    except Exception as e:
+        res["logs"].append((f"{fn}: {e}", "error"))
+        if record:
+            res["facts"] = ("", "", False, STATUS_INVALID, str(e), digest)
+        ctx["targets"] = ()
+        ctx["raw"] = None
+        return ctx
+    if record:
+        res["facts"] = (*describe(data), digest)
+
+    copies_source = False
+    for mode, _ in ctx["targets"]:
+        tag = f"[Режим {mode}] " if multi else ""
+        try:
+            with metrics.stage("render"):
+                out_name, payload, warn = TARGETS[mode][1](data, opts["codec"])
+        except Exception as e:
+            res["logs"].append((f"{fn}: {tag}{e}", "error"))
+            continue
+        if warn:
+            res["logs"].append((f"{fn}: {tag}{warn}", "warning"))
+            continue
+        ctx["writes"].append((mode, out_name, payload))
+        copies_source = copies_source or payload is None
+    if not copies_source:
+        # the source bytes are only needed to copy the file itself (mode 1)
+        ctx["raw"] = None
+    return ctx
+
+
+def _write_file(folder: str, multi: bool, opts: dict, ctx: dict) -> FileResult:
+    fn, res, metrics, raw = ctx["fn"], ctx["res"], ctx["metrics"], ctx["raw"]
+    archive = is_archive(folder)
+    path = os.path.join(folder, fn)
+    sinks = opts["sinks"]
+    for mode, out_name, payload in ctx["writes"]:
+        tag = f"[Режим {mode}] " if multi else ""
+        try:
+            sink = sinks[mode]
+            if sink is None:
+                # archive outputs are written by the coordinating thread, in order
+                if payload is None:
+                    payload = raw if raw is not None else _read_raw(folder, fn, archive)[0]
+                res["deferred"].append((mode, out_name, payload))
+                continue
+            with metrics.stage("write"):
+                if payload is None and archive:
+                    sink.write(out_name, raw)
+                elif payload is None:
+                    sink.copy_file(path, out_name, opts["link"])
+                else:
+                    sink.write(out_name, payload)
+            if metrics.enabled:
+                metrics.count_bytes(written=_payload_size(payload, raw, path))
+        except Exception as e:
+            res["logs"].append((f"{fn}: {tag}{e}", "error"))
+            continue
+        res["done"].append(mode)
+        res["status"][mode] = "updated" if mode in ctx["known"] else "new"
+        res["outputs"][mode] = out_name
+    if metrics.enabled:
+        metrics.file_done(metrics.clock() - ctx["t0"])
+        res["metrics"] = metrics.raw()
+    return res
+
+
+def _payload_size(payload: str | bytes | None, raw: bytes | None, path: str) -> int:
+    if payload is None:
+        return len(raw) if raw is not None else os.path.getsize(path)
+    return len(payload.encode("utf-8")) if isinstance(payload, str) else len(payload)
+
+
+OUTPUT_DIRS = tuple(name for name, _ in TARGETS.values())
+
+
 class MaFileProcessor:
-    def __init__(self, log: LogCb, progress: ProgressCb):
-        self.log = log
-        self.progress = progress
+    def __init__(
+        self,
+        log: LogCb,
+        progress: ProgressCb,
+        workers: int = 1,
+        executor: str = "thread",
+        incremental: bool = False,
+        link: str = "copy",
+        archive: str | None = None,
+        compress_level: int = 6,
+        metrics: Metrics | NullMetrics = NULL_METRICS,
+        json_backend: str = "auto",
+        compact_json: bool = False,
+        verify_json: bool = False,
+        io_workers: int | None = None,
+        cancel: CancelToken = NEVER,
+        resume: bool = True,
+        durability: Durability = NO_SYNC,
+        catalog: Catalog | None = None,
+        dedupe: str | None = None,
+    ):
+        # with metrics on, time spent inside the callbacks is the "ui" stage
+        self.metrics = metrics
+        self.log = metrics.timed("ui", log)
+        self.progress = as_reporter(metrics.timed("ui", progress))
+        self.workers = workers
+        # read and write stages; the transform stage uses `workers`
+        self.io_workers = io_workers or workers
+        self.executor = executor
+        self.incremental = incremental
+        self.link = link
+        self.archive = archive
+        self.compress_level = compress_level
+        self.codec = JsonCodec(json_backend, compact_json, verify_json)
+        self.cancel = cancel
+        # folder outputs keep a checkpoint journal; a rerun after a crash or
+        # "Стоп" skips the files it lists unless resume=False
+        self.resume = resume
+        self.durability = durability
+        # answers mode 1 (and incremental hashing) for unchanged files and
+        # learns every file this run parses
+        self.catalog = catalog
+        # keep policy for copies of the same account (dedupe.KEEP_POLICIES);
+        # None processes every file and the last one written wins
+        if dedupe is not None and dedupe not in KEEP_POLICIES:
+            raise ValueError(f"Неизвестное правило для дубликатов: {dedupe}")
+        self.dedupe = dedupe
 
-    def process_mode1(self, folder: str, files: list[str]) -> str:
-        out_dir = os.path.join(folder, "fullmafiles")
-        os.makedirs(out_dir, exist_ok=True)
-        total = len(files)
-        ok = 0
-        for i, fn in enumerate(files, 1):
-            path = os.path.join(folder, fn)
+    def _plan(self, folder: str, files: list[MaFileRef], targets, manifests: dict[int, Manifest]) -> list[FileTask]:
+        tasks: list[FileTask] = []
+        for item in files:
+            fn = ref_name(item)
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                acc = data.get("account_name", "")
-                if not acc:
-                    self.log(f"{fn}: нет account_name", "warning")
-                else:
-                    shutil.copy2(path, os.path.join(out_dir, f"{acc}.maFile"))
-                    ok += 1
-            except Exception as e:
-                self.log(f"{fn}: {e}", "error")
-            self.progress(int(i * 100 / max(1, total)), f"Файл {i}/{total}")
-        self.log(f"Режим 1: {ok}/{total} файлов", "success")
-        return out_dir
-
-    def process_mode2(self, folder: str, files: list[str]) -> str:
-        out_dir = os.path.join(folder, "shortmaffsmpanel")
-        os.makedirs(out_dir, exist_ok=True)
-        total = len(files)
-        ok = 0
-        for i, fn in enumerate(files, 1):
-            path = os.path.join(folder, fn)
+                size, mtime_ns = ref_stat(folder, item)
+            except (OSError, KeyError):
+                tasks.append((fn, targets, {}, None))
+                continue
+            need = tuple((m, d) for m, d in targets if not manifests[m].is_fresh(fn, size, mtime_ns))
+            if need:
+                known = {m: e["sha256"] for m, _ in need if (e := manifests[m].get(fn)) and manifests[m].output_exists(e)}
+                tasks.append((fn, need, known, None))
+        return tasks
+
+    def _hint(self, folder: str, files: list[MaFileRef], tasks: list[FileTask]) -> list[FileTask]:
+        # attach catalog records whose size and mtime still match the file
+        known = self.catalog.folder(folder)
+        if not known:
+            return tasks
+        items = {ref_name(item): item for item in files}
+        out = []
+        for fn, targets, digests, _ in tasks:
+            rec = known.get(fn)
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                trimmed = {
-                    "shared_secret": data.get("shared_secret", ""),
-                    "account_name": data.get("account_name", ""),
-                    "Session": {"SteamID": data.get("Session", {}).get("SteamID", "")},
-                }
-                acc = trimmed["account_name"]
-                if acc and trimmed["shared_secret"] and trimmed["Session"]["SteamID"]:
-                    with open(os.path.join(out_dir, f"{acc}.maFile"), "w", encoding="utf-8") as f:
-                        json.dump(trimmed, f, indent=2, ensure_ascii=False)
-                    ok += 1
-                else:
-                    self.log(f"{fn}: неполные данные", "warning")
-            except Exception as e:
-                self.log(f"{fn}: {e}", "error")
-            self.progress(int(i * 100 / max(1, total)), f"Файл {i}/{total}")
-        self.log(f"Режим 2: {ok}/{total} файлов", "success")
-        return out_dir
-
-    def process_mode3(self, folder: str, files: list[str]) -> str:
-        out_dir = os.path.join(folder, "shortmafdmpanel")
-        os.makedirs(out_dir, exist_ok=True)
-        total = len(files)
-        ok = 0
-        for i, fn in enumerate(files, 1):
-            path = os.path.join(folder, fn)
+                if rec is not None and rec[:2] != ref_stat(folder, items[fn]):
+                    rec = None
+            except (OSError, KeyError):
+                rec = None
+            out.append((fn, targets, digests, rec))
+        return out
+
+    def process_modes(self, folder: str, files: Iterable[MaFileRef], modes, delta: bool = False) -> dict[int, str]:
+        # delta: `files` is only what changed in the folder (watch mode), so
+        # outputs of files not listed are not reported as orphans
+        modes = sorted(set(modes))
+        if not modes or any(m not in TARGETS for m in modes):
+            raise ValueError(f"Неизвестный набор режимов: {modes}")
+        if self.archive and self.incremental:
+            raise ValueError("Инкрементальная обработка недоступна при записи в архив")
+        base = output_base(folder)
+        targets = tuple((m, os.path.join(base, TARGETS[m][0])) for m in modes)
+        sinks = {m: open_sink(d, self.archive, self.compress_level, self.durability) for m, d in targets}
+        journal = None
+        if not self.archive:
+            job = {"folder": os.path.abspath(folder), "modes": modes}
+            journal = Journal(os.path.join(base, ".mafile-manager.journal.jsonl"), job, self.resume)
+        try:
+            res = self._process(folder, files, modes, targets, sinks, journal, delta)
+        except BaseException:
+            for sink in sinks.values():
+                sink.abort()
+            raise
+        else:
+            with self.metrics.stage("close"):
+                for sink in sinks.values():
+                    sink.close()
+            return res
+        finally:
+            close_archives()
+            if self.catalog is not None:
+                self.catalog.flush()
+            self.metrics.report(self.log)
+
+    def _resume(self, folder: str, files: list[MaFileRef], tasks: list[FileTask], journal: Journal, counts, manifests, targets) -> list[FileTask]:
+        # drop the modes the journal already has for a file, as long as the
+        # source is unchanged and those outputs made it to disk (a batch sync
+        # may not have run); a task keeps whatever modes are still missing
+        items = {ref_name(item): item for item in files}
+        dirs = dict(targets)
+        keep = []
+        resumed = 0
+        for task in tasks:
+            fn, need, known, hint = task
+            rec = journal.get(fn)
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                secret = data.get("shared_secret", "")
-                steamid = data.get("Session", {}).get("SteamID", "")
-                acc = data.get("account_name", "")
-                if secret and steamid and acc:
-                    trimmed = {"shared_secret": secret, "Session": {"SteamID": steamid}}
-                    with open(os.path.join(out_dir, f"{acc}.maFile"), "w", encoding="utf-8") as f:
-                        json.dump(trimmed, f, indent=4, ensure_ascii=False)
-                    ok += 1
-                else:
-                    self.log(f"{fn}: неполные данные", "warning")
-            except Exception as e:
-                self.log(f"{fn}: {e}", "error")
-            self.progress(int(i * 100 / max(1, total)), f"Файл {i}/{total}")
-        self.log(f"Режим 3: {ok}/{total} файлов", "success")
-        return out_dir
+                if (
+                    rec is None
+                    or (rec["size"], rec["mtime_ns"]) != ref_stat(folder, items[fn])
+                    or not all(os.path.exists(os.path.join(dirs[int(m)], name)) for m, name in rec["outputs"].items() if name)
+                ):
+                    keep.append(task)
+                    continue
+            except (OSError, KeyError):
+                keep.append(task)
+                continue
+            done = set(rec["modes"]) & {m for m, _ in need}
+            for m in done:
+                counts[m]["skipped"] += 1
+                if m in manifests and rec.get("sha256") and rec["outputs"].get(str(m)):
+                    manifests[m].update(fn, rec["size"], rec["mtime_ns"], rec["sha256"], rec["outputs"][str(m)])
+            missing = tuple((m, d) for m, d in need if m not in done)
+            if missing:
+                keep.append((fn, missing, known, hint))
+            else:
+                resumed += 1
+        if resumed:
+            self.log(f"Продолжение прерванного запуска: {resumed} файлов уже обработано", "info")
+        return keep
+
+    def _drop_duplicates(self, folder: str, files: list[MaFileRef]) -> list[MaFileRef]:
+        with self.metrics.stage("dedupe"):
+            report = find_duplicates(folder, files, self.dedupe, self.codec, self.catalog, self.cancel)
+            path = os.path.join(output_base(folder), DUPLICATES_REPORT)
+            save_report(path, report)
+        if not report["dropped"]:
+            return files
+        log_report(report, self.log)
+        self.log(f"Отчёт о дубликатах: {path}", "info")
+        dropped = set(report["dropped"])
+        return [item for item in files if ref_name(item) not in dropped]
+
+    def _process(self, folder: str, files: Iterable[MaFileRef], modes: list[int], targets, sinks, journal: Journal | None, delta: bool) -> dict[int, str]:
+        try:
+            res = self._process_files(folder, files, modes, targets, sinks, journal, delta)
+        except BaseException:
+            if journal is not None:
+                journal.close()
+            raise
+        if journal is not None:
+            journal.discard()
+        return res
+
+    def _process_files(self, folder: str, files: Iterable[MaFileRef], modes: list[int], targets, sinks, journal: Journal | None, delta: bool) -> dict[int, str]:
+        if not isinstance(files, list):
+            with self.metrics.stage("list"):
+                files = list(files)
+        if self.dedupe:
+            files = self._drop_duplicates(folder, files)
+        total = len(files)
+        counts = {m: {"new": 0, "updated": 0, "skipped": 0} for m in modes}
+        per_file = {"new": 0, "updated": 0, "skipped": 0}
+        manifests: dict[int, Manifest] = {}
+        if self.incremental:
+            with self.metrics.stage("plan"):
+                manifests = {m: Manifest(d) for m, d in targets}
+                tasks = self._plan(folder, files, targets, manifests)
+            planned = {t[0]: {m for m, _ in t[1]} for t in tasks}
+            for item in files:
+                for m in modes:
+                    if m not in planned.get(ref_name(item), ()):
+                        counts[m]["skipped"] += 1
+        else:
+            tasks = [(ref_name(item), targets, {}, None) for item in files]
+        if journal is not None and len(journal):
+            tasks = self._resume(folder, files, tasks, journal, counts, manifests, targets)
+        if self.catalog is not None and tasks:
+            with self.metrics.stage("catalog"):
+                tasks = self._hint(folder, files, tasks)
+
+        def summary() -> str:
+            return f"новых {per_file['new']}, обновлено {per_file['updated']}, пропущено {per_file['skipped']}"
+
+        done_before = total - len(tasks)
+        per_file["skipped"] = done_before
+        if done_before:
+            self.progress(int(done_before * 100 / max(1, total)), f"Файл {done_before}/{total} • {summary()}")
+
+        worker_sinks = {m: (None if sink.archive else sink) for m, sink in sinks.items()}
+        opts = {"link": self.link, "sinks": worker_sinks, "timed": self.metrics.enabled, "codec": self.codec,
+                "catalog": self.catalog is not None}
+        multi = len(modes) > 1
+        stages = [
+            Stage(partial(_read_file, folder, self.incremental, opts), self.io_workers),
+            Stage(partial(_transform_file, multi, opts), self.workers, self.executor if self.workers > 1 else "thread"),
+            Stage(partial(_write_file, folder, multi, opts), self.io_workers),
+        ]
+        results = pipeline(tasks, stages)
+        stopped = False
+        try:
+            for i, (task, res) in enumerate(zip(tasks, results), done_before + 1):
+                fn = task[0]
+                if res["metrics"]:
+                    self.metrics.merge(res["metrics"])
+                for msg, level in res["logs"]:
+                    self.log(msg, level)
+                for m, out_name, payload in res["deferred"]:
+                    try:
+                        with self.metrics.stage("write"):
+                            sinks[m].write(out_name, payload)
+                        if self.metrics.enabled:
+                            self.metrics.count_bytes(written=len(payload.encode("utf-8")) if isinstance(payload, str) else len(payload))
+                    except Exception as e:
+                        tag = f"[Режим {m}] " if len(modes) > 1 else ""
+                        self.log(f"{fn}: {tag}{e}", "error")
+                        continue
+                    res["done"].append(m)
+                    res["status"][m] = "new"
+                    res["outputs"][m] = out_name
+                for m, status in res["status"].items():
+                    counts[m][status] += 1
+                for status in ("new", "updated", "skipped"):
+                    if status in res["status"].values():
+                        per_file[status] += 1
+                        break
+                if journal is not None and res["src"] is not None and res["done"]:
+                    # a file that failed (or vanished) is not recorded, so a resumed run retries it
+                    src = res["src"]
+                    digest = res["stat"][2] if res["stat"] else None
+                    outputs = {str(m): res["outputs"].get(m) for m in res["done"]}
+                    journal.record(fn, size=src[0], mtime_ns=src[1], modes=res["done"], sha256=digest, outputs=outputs)
+                if res["facts"] and res["src"]:
+                    self.catalog.put(entry_key(folder, fn), (*res["src"], *res["facts"]))
+                if manifests and res["stat"]:
+                    size, mtime_ns, digest = res["stat"]
+                    for m in res["done"]:
+                        out_name = res["outputs"].get(m) or manifests[m].get(fn)["output"]
+                        manifests[m].update(fn, size, mtime_ns, digest, out_name)
+                text = f"Файл {i}/{total}"
+                if self.incremental:
+                    text += f" • {summary()}"
+                self.progress.update(i, total, text)
+                if self.cancel.cancelled:
+                    stopped = True
+                    break
+        finally:
+            results.close()
+        self.progress.flush()
+        if stopped:
+            for manifest in manifests.values():
+                manifest.save()
+            self.log("Остановлено. Повторный запуск продолжит с места остановки.", "warning")
+            raise Cancelled("Остановлено пользователем")
+
+        present = {ref_name(item) for item in files}
+        for m, out_dir in targets:
+            ok = sum(counts[m].values())
+            line = f"Режим {m}: {ok}/{total} файлов"
+            if self.incremental:
+                c = counts[m]
+                line += f" (новых: {c['new']}, обновлено: {c['updated']}, пропущено: {c['skipped']})"
+                orphans = [] if delta else manifests[m].orphans(present)
+                if orphans:
+                    shown = ", ".join(orphans[:10]) + (" …" if len(orphans) > 10 else "")
+                    self.log(f"Режим {m}: {len(orphans)} выходных файлов без исходника: {shown}", "warning")
+                with self.metrics.stage("manifest"):
+                    manifests[m].save()
+            self.log(line, "success")
+        return {m: sinks[m].path for m in modes}
+
+    def process_mode1(self, folder: str, files: Iterable[MaFileRef]) -> str:
+        return self.process_modes(folder, files, (1,))[1]
+
+    def process_mode2(self, folder: str, files: Iterable[MaFileRef]) -> str:
+        return self.process_modes(folder, files, (2,))[2]
+
+    def process_mode3(self, folder: str, files: Iterable[MaFileRef]) -> str:
+        return self.process_modes(folder, files, (3,))[3]
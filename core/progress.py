@@ -0,0 +1,71 @@
+from __future__ import annotations
+import time
+from typing import Callable
+
+ProgressCb = Callable[[int, str], None]
+
+
+def format_eta(seconds: float) -> str:
+    s = int(seconds + 0.5)
+    h, rem = divmod(s, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+class ProgressReporter:
+    # Wraps a (percent, text) callback and drops updates that would repaint the
+    # same percentage within `min_interval` seconds. 100% is always delivered,
+    # and flush() delivers the last swallowed state.
+    def __init__(self, emit: ProgressCb, min_interval: float = 0.1, clock: Callable[[], float] = time.monotonic):
+        self.emit = emit
+        self.min_interval = min_interval
+        self.clock = clock
+        self._last_value: int | None = None
+        self._last_t = 0.0
+        self._pending: tuple[int, str] | None = None
+        self._phase: tuple[int, int] | None = None
+        self._phase_t0 = 0.0
+        self._phase_done0 = 0
+
+    def _due(self, value: int, now: float) -> bool:
+        return value >= 100 or value != self._last_value or now - self._last_t >= self.min_interval
+
+    def _send(self, value: int, text: str, now: float):
+        self._last_value = value
+        self._last_t = now
+        self._pending = None
+        self.emit(value, text)
+
+    def __call__(self, value: int, text: str):
+        now = self.clock()
+        if self._due(value, now):
+            self._send(value, text, now)
+        else:
+            self._pending = (value, text)
+
+    def update(self, done: int, total: int, text: str, start: int = 0, span: int = 100):
+        # `done` of `total` items in a phase mapped onto [start, start + span] percent
+        now = self.clock()
+        if self._phase != (start, total):
+            self._phase = (start, total)
+            self._phase_t0 = now
+            self._phase_done0 = done - 1
+        value = start + int(done * span / max(1, total))
+        if not self._due(value, now):
+            self._pending = (value, text)
+            return
+        elapsed = now - self._phase_t0
+        moved = done - self._phase_done0
+        if elapsed >= 0.5 and moved > 0:
+            rate = moved / elapsed
+            text = f"{text} • {rate:.0f} файл/с • осталось {format_eta((total - done) / rate)}"
+        self._send(value, text, now)
+
+    def flush(self):
+        if self._pending is not None:
+            value, text = self._pending
+            self._send(value, text, self.clock())
+
+
+def as_reporter(progress: ProgressCb) -> ProgressReporter:
+    return progress if isinstance(progress, ProgressReporter) else ProgressReporter(progress)
@@ -0,0 +1,244 @@
+from __future__ import annotations
+import io
+import os
+import time
+import tarfile
+import itertools
+import zipfile
+import threading
+
+from .materialize import materialize
+
+ARCHIVE_FORMATS = ("zip", "tar.gz")
+
+
+class Durability:
+    # When written outputs are forced to disk. Every file is written to a temp
+    # name and renamed into place, so a crash never leaves a truncated output;
+    # the policy only decides how much finished work a power loss can take:
+    #   none   - no fsync, the OS flushes when it likes
+    #   batch  - temp files are renamed in groups of `every` files or every
+    #            `interval` seconds: each is fsynced, renamed, then one
+    #            directory fsync for the whole group
+    #   always - fsync each file before its rename and the directory after
+    def __init__(self, policy: str = "none", every: int = 256, interval: float = 2.0):
+        if policy not in DURABILITY:
+            raise ValueError(f"Неизвестный режим записи на диск: {policy}")
+        self.policy = policy
+        self.every = max(1, every)
+        self.interval = interval
+
+
+DURABILITY = ("none", "batch", "always")
+NO_SYNC = Durability()
+# hidden temp names; leftovers from a crashed run are removed when the sink opens
+_TMP_PREFIX = ".~"
+_TMP_SUFFIX = ".tmp"
+
+
+def _fsync_path(path: str):
+    # Windows only flushes handles opened for writing
+    fd = os.open(path, os.O_RDWR if os.name == "nt" else os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: str):
+    # makes renames durable; directories cannot be opened on Windows
+    if os.name == "nt":
+        return
+    _fsync_path(path)
+
+
+class FolderSink:
+    # Plain output directory. Picklable, so process-pool workers write directly.
+    archive = False
+
+    def __init__(self, out_dir: str, durability: Durability = NO_SYNC):
+        self.path = out_dir
+        self.durability = durability
+        os.makedirs(out_dir, exist_ok=True)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, str]] = []  # (temp, final) awaiting a batch sync
+        self._last_sync = time.monotonic()
+        self._remove_stale()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for k in ("_lock", "_pending", "_ids"):
+            del state[k]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def _remove_stale(self):
+        with os.scandir(self.path) as it:
+            for e in it:
+                if e.name.startswith(_TMP_PREFIX) and e.name.endswith(_TMP_SUFFIX):
+                    try:
+                        os.remove(e.path)
+                    except OSError:
+                        pass
+
+    def _tmp(self, name: str) -> str:
+        return os.path.join(self.path, f"{_TMP_PREFIX}{name}.{os.getpid()}-{next(self._ids)}{_TMP_SUFFIX}")
+
+    def write(self, name: str, data: str | bytes):
+        tmp = self._tmp(name)
+        try:
+            if isinstance(data, str):
+                f = open(tmp, "w", encoding="utf-8")
+            else:
+                f = open(tmp, "wb")
+            with f:
+                f.write(data)
+                if self.durability.policy == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            self._discard(tmp)
+            raise
+        self._commit(tmp, name)
+
+    def copy_file(self, src: str, name: str, link: str = "copy"):
+        tmp = self._tmp(name)
+        try:
+            materialize(src, tmp, link)
+            if self.durability.policy == "always":
+                _fsync_path(tmp)
+        except BaseException:
+            self._discard(tmp)
+            raise
+        self._commit(tmp, name)
+
+    def _discard(self, tmp: str):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+    def _commit(self, tmp: str, name: str):
+        final = os.path.join(self.path, name)
+        policy = self.durability.policy
+        if policy == "none":
+            os.replace(tmp, final)
+        elif policy == "always":
+            os.replace(tmp, final)
+            _fsync_dir(self.path)
+        else:
+            with self._lock:
+                self._pending.append((tmp, final))
+                if len(self._pending) >= self.durability.every or time.monotonic() - self._last_sync >= self.durability.interval:
+                    self._sync()
+
+    def _sync(self):
+        # caller holds the lock; renames keep write order, so a name written
+        # twice ends up with the later document, as with in-place writes
+        pending, self._pending = self._pending, []
+        self._last_sync = time.monotonic()
+        for tmp, _ in pending:
+            _fsync_path(tmp)
+        for tmp, final in pending:
+            os.replace(tmp, final)
+        _fsync_dir(self.path)
+
+    def close(self):
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def abort(self):
+        # a cancelled or failed run: every file written so far is complete
+        # (and may be in the journal already), so it still goes in place
+        self.close()
+
+
+class ArchiveSink:
+    # Streams entries into a single .zip / .tar.gz next to where the output
+    # folder would be. Writes are serialized; a repeated entry name is refused
+    # (an archive cannot overwrite in place), so the first document wins.
+    # The archive is built under a temp name and renamed on close; abort()
+    # throws it away instead.
+    archive = True
+
+    def __init__(self, out_dir: str, fmt: str = "zip", level: int = 6, durability: Durability = NO_SYNC):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Неизвестный формат архива: {fmt}")
+        self.fmt = fmt
+        self.level = level
+        self.durability = durability
+        self.path = f"{os.path.normpath(out_dir)}.{fmt}"
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._tmp = os.path.join(parent, f"{_TMP_PREFIX}{os.path.basename(self.path)}.{os.getpid()}{_TMP_SUFFIX}")
+        self._names: set[str] = set()
+        self._lock = threading.Lock()
+        if fmt == "zip":
+            self._zip = zipfile.ZipFile(self._tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=level)
+        else:
+            self._tar = tarfile.open(self._tmp, "w:gz", compresslevel=level)
+
+    def write(self, name: str, data: str | bytes):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            if name in self._names:
+                raise FileExistsError(f"{name} уже есть в архиве")
+            self._names.add(name)
+            if self.fmt == "zip":
+                info = zipfile.ZipInfo(name, time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o600 << 16
+                self._zip.writestr(info, data, compresslevel=self.level)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                info.mode = 0o600
+                self._tar.addfile(info, io.BytesIO(data))
+
+    def copy_file(self, src: str, name: str, link: str = "copy"):
+        with open(src, "rb") as f:
+            self.write(name, f.read())
+
+    def close(self):
+        with self._lock:
+            if self.fmt == "zip":
+                self._zip.close()
+            else:
+                self._tar.close()
+            if self.durability.policy != "none":
+                _fsync_path(self._tmp)
+            os.replace(self._tmp, self.path)
+            if self.durability.policy != "none":
+                _fsync_dir(os.path.dirname(self.path) or ".")
+
+    def abort(self):
+        # a cancelled or failed run: drop the partial archive and keep the
+        # one a previous run left at self.path
+        with self._lock:
+            try:
+                if self.fmt == "zip":
+                    self._zip.close()
+                else:
+                    self._tar.close()
+            except Exception:
+                pass
+            try:
+                os.remove(self._tmp)
+            except OSError:
+                pass
+
+
+def open_sink(out_dir: str, archive: str | None = None, level: int = 6, durability: Durability = NO_SYNC) -> FolderSink | ArchiveSink:
+    if archive:
+        return ArchiveSink(out_dir, archive, level, durability)
+    return FolderSink(out_dir, durability)
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import os
+import sys
+import errno
+import select
+import struct
+from typing import Callable, Iterator
+
+from .fs import MaFileEntry, is_archive, is_mafile, iter_mafiles
+from .cancel import NEVER, CancelToken, Cancelled
+from .listing import Stamp, stamp_valid
+from .processor import OUTPUT_DIRS, MaFileProcessor
+
+WATCH_BACKENDS = ("auto", "inotify", "polling")
+
+# inotify(7)
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_Q_OVERFLOW = 0x4000
+_IN_ISDIR = 0x40000000
+_IN_MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct("iIII")
+# polls between full rescans when no directory mtime changed: a file
+# rewritten in place keeps its directory's mtime
+_FULL_SCAN_EVERY = 30
+
+Snapshot = dict[str, tuple[int, int]]
+
+
+def _libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class _Inotify:
+    # Directory watches through libc; only maFile names and new directories
+    # count as activity, so our own writes into the output folders (or the
+    # journal next to them) do not wake the watcher.
+    def __init__(self):
+        self._libc = _libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify недоступен")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self._get_errno(), "inotify_init1")
+
+    def _get_errno(self) -> int:
+        import ctypes
+        return ctypes.get_errno()
+
+    def add(self, path: str):
+        # adding an already watched directory is a no-op
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_MASK) < 0:
+            err = self._get_errno()
+            raise OSError(err, f"inotify_add_watch: {os.strerror(err)}", path)
+
+    def wait(self, timeout: float) -> bool:
+        # True if something relevant happened within `timeout`
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        relevant = False
+        pos = 0
+        while pos < len(buf):
+            _, mask, _, size = _EVENT.unpack_from(buf, pos)
+            name = buf[pos + _EVENT.size:pos + _EVENT.size + size].rstrip(b"\0").decode("utf-8", "surrogateescape")
+            pos += _EVENT.size + size
+            if mask & _IN_Q_OVERFLOW or (mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO)) or is_mafile(name):
+                relevant = True
+        return relevant
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    # Yields batches of maFiles to process: first everything in the folder
+    # (incremental processing skips what is already done), then only files
+    # that appeared or changed. A batch is emitted once the folder has been
+    # quiet for `debounce` seconds, so a burst of copies becomes one run.
+    # Uses inotify on Linux; elsewhere each poll stats only the watched
+    # directories and rescans when one of their mtimes moves (plus every
+    # _FULL_SCAN_EVERY polls, for in-place rewrites). Stops when `cancel` is set.
+    def __init__(
+        self,
+        folder: str,
+        recursive: bool = False,
+        debounce: float = 1.0,
+        poll_interval: float = 2.0,
+        cancel: CancelToken = NEVER,
+        backend: str = "auto",
+    ):
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"Неизвестный способ наблюдения: {backend}")
+        if is_archive(folder) or not os.path.isdir(folder):
+            raise ValueError("Наблюдать можно только за папкой")
+        self.folder = folder
+        self.recursive = recursive
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.cancel = cancel
+        self._inotify = None
+        self._stamp: Stamp = {}
+        if backend != "polling":
+            try:
+                self._inotify = _Inotify()
+            except OSError:
+                if backend == "inotify":
+                    raise
+        self.backend = "inotify" if self._inotify else "polling"
+
+    def _scan(self) -> dict[str, MaFileEntry]:
+        stamp: Stamp = {}
+
+        def on_dir(path: str):
+            stamp[path] = os.stat(path).st_mtime_ns
+
+        entries = {e.name: e for e in iter_mafiles(self.folder, self.recursive, OUTPUT_DIRS, on_dir)}
+        self._stamp = stamp
+        return entries
+
+    def _snapshot(self, entries: dict[str, MaFileEntry]) -> Snapshot:
+        out = {}
+        for name, e in entries.items():
+            try:
+                out[name] = (e.size, e.mtime_ns)
+            except OSError:
+                continue
+        return out
+
+    def _add_watches(self):
+        self._inotify.add(self.folder)
+        if not self.recursive:
+            return
+        for root, dirs, _ in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if d not in OUTPUT_DIRS]
+            for d in dirs:
+                try:
+                    self._inotify.add(os.path.join(root, d))
+                except OSError:
+                    continue
+
+    def _wait_inotify(self) -> bool:
+        # block until activity, then until `debounce` seconds pass without any
+        while not self._inotify.wait(0.5):
+            if self.cancel.cancelled:
+                return False
+        while self._inotify.wait(self.debounce):
+            if self.cancel.cancelled:
+                return False
+        self._add_watches()
+        return not self.cancel.cancelled
+
+    def _wait_polling(self, last: Snapshot) -> dict[str, MaFileEntry] | None:
+        # the settled listing, or None once cancelled; a change is settled
+        # once two scans in a row see the same sizes and mtimes (a copy in
+        # progress grows without touching its directory)
+        polls = 0
+        while True:
+            if self.cancel.wait(self.poll_interval):
+                return None
+            polls += 1
+            if polls < _FULL_SCAN_EVERY and stamp_valid(self._stamp):
+                continue
+            polls = 0
+            entries = self._scan()
+            cur = self._snapshot(entries)
+            if cur != last:
+                break
+        while True:
+            if self.cancel.wait(min(self.debounce, self.poll_interval)):
+                return None
+            entries = self._scan()
+            nxt = self._snapshot(entries)
+            if nxt == cur:
+                return entries
+            cur = nxt
+
+    def batches(self) -> Iterator[tuple[list[MaFileEntry], bool]]:
+        # (files, full): `full` only for the initial listing of the whole folder
+        try:
+            if self._inotify:
+                # watches go in before the first listing so nothing slips between
+                self._add_watches()
+            entries = self._scan()
+            seen = self._snapshot(entries)
+            yield sorted(entries.values(), key=lambda e: e.name), True
+            while True:
+                if self._inotify:
+                    if not self._wait_inotify():
+                        return
+                    entries = self._scan()
+                else:
+                    entries = self._wait_polling(seen)
+                    if entries is None:
+                        return
+                cur = self._snapshot(entries)
+                changed = sorted((entries[n] for n, sig in cur.items() if seen.get(n) != sig), key=lambda e: e.name)
+                seen = cur
+                if changed:
+                    yield changed, False
+        finally:
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+
+
+def process_forever(
+    proc: MaFileProcessor,
+    watcher: FolderWatcher,
+    modes: list[int],
+    on_batch: Callable[[int, int, bool], None] | None = None,
+) -> dict:
+    # Runs until the watcher's token is cancelled, also mid-batch (the journal
+    # resumes that batch next time). A batch that fails is logged; its files
+    # stay out of the manifest, so the initial pass of the next watch picks
+    # them up again. on_batch(batches, files, full) after every batch.
+    if not proc.incremental:
+        raise ValueError("Наблюдение работает только с инкрементальной обработкой")
+    stats = {"batches": 0, "files": 0}
+    proc.log(f"Наблюдение за папкой ({watcher.backend}): {watcher.folder}", "info")
+    try:
+        for files, full in watcher.batches():
+            if files:
+                if not full:
+                    proc.log(f"Новых или изменённых файлов: {len(files)}", "info")
+                try:
+                    proc.process_modes(watcher.folder, files, modes, delta=not full)
+                except (OSError, ValueError) as e:
+                    proc.log(f"Ошибка обработки: {e}", "error")
+                stats["batches"] += 1
+                stats["files"] += len(files)
+                if on_batch:
+                    on_batch(stats["batches"], stats["files"], full)
+            if full:
+                proc.log("Ожидание новых файлов…", "info")
+    except Cancelled:
+        pass
+    proc.log(f"Наблюдение остановлено: пакетов {stats['batches']}, файлов {stats['files']}", "info")
+    return stats
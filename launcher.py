@@ -1,17 +1,21 @@
 import sys
 import subprocess
+import importlib.util
 
 def ensure(pkg: str, import_name: str | None = None):
     name = import_name or pkg
+    # spec lookup only: importing PySide6 here just to test for it would
+    # double the cold start, main.py imports what it needs anyway
     try:
-        __import__(name)
-        return
-    except Exception:
+        if importlib.util.find_spec(name) is not None:
+            return
+    except (ImportError, ValueError):
         pass
 
     print(f"[BOOTSTRAP] Installing {pkg} ...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", "pip"])
     subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
+    importlib.invalidate_caches()
 
 def main():
     ensure("PySide6", "PySide6")
@@ -1,15 +1,25 @@
+import time
+
+# startup is measured from here to the first paint, shown on the Dev tab
+_T0 = time.perf_counter()
+
 import sys
+import multiprocessing
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
 APP_VERSION = "1.3.0"
 
 def main():
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setApplicationName("MaFile Manager")
     app.setApplicationVersion(APP_VERSION)
     win = MainWindow(version=APP_VERSION)
     win.show()
+    # a zero timer fires once the queued show/paint events are handled
+    QTimer.singleShot(0, lambda: win.set_startup_time(time.perf_counter() - _T0))
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import pytest
+
+from .util import Logs
+
+
+@pytest.fixture
+def logs() -> Logs:
+    return Logs()
+
+
+
+@pytest.fixture(autouse=True)
+def app_home(tmp_path_factory, monkeypatch) -> str:
+    # logs and the catalog go to a throwaway folder, not the user's
+    home = str(tmp_path_factory.mktemp("home"))
+    monkeypatch.setenv("MAFILE_MANAGER_HOME", home)
+    return home
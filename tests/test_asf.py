@@ -0,0 +1,130 @@
+from __future__ import annotations
+import os
+import json
+import random
+import zipfile
+
+import pytest
+
+from core.asf import AsfConverter
+from core.fs import close_archives, read_mafile
+from core.sinks import FolderSink
+
+from .util import read_tree, write_mafile
+from .test_matching import _linear
+
+
+def _logins(out: str) -> dict[str, str]:
+    # account -> login written into its ASF config
+    got = {}
+    for name in os.listdir(out):
+        if name.endswith(".json"):
+            with open(os.path.join(out, name), encoding="utf-8") as f:
+                got[name[:-5]] = json.load(f)["SteamLogin"]
+    return got
+
+
+def _sequential(accounts: list[str], logpass: dict[str, str], fail: set[str]) -> dict[str, str]:
+    # the original loop: match, write, and only then take the login
+    available = dict(logpass)
+    got, remaining = {}, []
+    for acc in accounts:
+        login = _linear(acc, f"{acc}.maFile", available)[0]
+        if login is None:
+            remaining.append(acc)
+        elif acc not in fail:
+            got[acc] = login
+            del available[login]
+    for acc, login in zip(remaining, list(available)):
+        if acc not in fail:
+            got[acc] = login
+    return got
+
+
+def _convert(tmp_path, accounts, logpass, fail=(), **kw):
+    src = tmp_path / "in"
+    paths = [write_mafile(src, f"{i:03d}.maFile", acc=acc) for i, acc in enumerate(accounts)]
+    lp = tmp_path / "logpass.txt"
+    lp.write_text("".join(f"{l}:{p}\n" for l, p in logpass.items()), encoding="utf-8")
+    out = str(tmp_path / "out")
+    conv = AsfConverter(lambda *a: None, lambda *a: None, **kw)
+    res = conv.convert(paths, str(lp), out)
+    return res, _logins(out)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_failed_write_leaves_login_to_later_files(tmp_path, monkeypatch, workers):
+    real = FolderSink.write
+
+    def write(self, name, data):
+        if name == "alpha1.maFile":
+            raise OSError("диск полон")
+        return real(self, name, data)
+
+    monkeypatch.setattr(FolderSink, "write", write)
+    accounts = ["alpha1", "zzz", "xalpha"]
+    logpass = {"alpha": "1", "q": "2"}
+    res, got = _convert(tmp_path, accounts, logpass, workers=workers)
+    assert got == {"xalpha": "alpha", "zzz": "q"}
+    assert got == _sequential(accounts, logpass, {"alpha1"})
+    assert [fn for fn, _ in res["failed"]] == ["000.maFile"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_matches_sequential_loop(tmp_path, streaming):
+    rng = random.Random(7)
+    words = ["".join(rng.choice("abcd") for _ in range(rng.randint(2, 6))) for _ in range(80)]
+    accounts = list(dict.fromkeys(words[:50]))
+    logpass = {w: "pw" for w in words[30:]}
+    res, got = _convert(tmp_path, accounts, logpass, streaming=streaming, workers=3)
+    assert got == _sequential(accounts, logpass, set())
+    assert res["success"] == len(got)
+
+
+def test_streaming_writes_the_same_files(tmp_path):
+    accounts = [f"acc{i}" for i in range(40)]
+    logpass = {f"acc{i}" if i % 3 else f"login{i}": f"pw{i}" for i in range(45)}
+    for streaming in (False, True):
+        _convert(tmp_path / str(streaming), accounts, logpass, streaming=streaming, workers=2)
+    plain = read_tree(tmp_path / "False" / "out")
+    assert plain and read_tree(tmp_path / "True" / "out") == plain
+
+
+def test_zip_members_convert_like_the_extracted_folder(tmp_path):
+    # names without account_name fall back to the file name, so the zip
+    # prefix must not leak into outputs, matches or logs
+    src = tmp_path / "in"
+    names = ["alice.maFile", "76561198000000002.maFile", "bob_x.maFile"]
+    paths = [write_mafile(src, name, {"Session": {}}) for name in names]
+    archive = str(tmp_path / "batch.zip")
+    with zipfile.ZipFile(archive, "w") as z:
+        for name, path in zip(names, paths):
+            z.write(path, name)
+    lp = tmp_path / "logpass.txt"
+    lp.write_text("alice:1\nbob:2\nq:3\n", encoding="utf-8")
+    outs, logs = {}, {}
+    try:
+        for kind, items in (("folder", paths), ("zip", [f"{archive}::{n}" for n in names])):
+            lines = []
+            conv = AsfConverter(lambda m, l: lines.append(m), lambda *a: None)
+            conv.convert(items, str(lp), str(tmp_path / kind))
+            outs[kind] = read_tree(tmp_path / kind)
+            logs[kind] = [m for m in lines if m.startswith("[")]
+    finally:
+        close_archives()
+    assert sorted(outs["zip"]) == ["76561198000000002.json", "76561198000000002.maFile", "alice.json", "alice.maFile",
+                                   "bob_x.json", "bob_x.maFile"]
+    assert outs["zip"] == outs["folder"]
+    assert logs["zip"] == logs["folder"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_fallback_reuses_documents_read_for_matching(tmp_path, monkeypatch, streaming):
+    reads = []
+    monkeypatch.setattr("core.asf.read_mafile", lambda path: reads.append(path) or read_mafile(path))
+    accounts = ["alpha", "zzz", "yyy"]
+    logpass = {"alpha": "1", "q": "2", "r": "3"}
+    res, got = _convert(tmp_path, accounts, logpass, streaming=streaming, workers=2)
+    assert got == _sequential(accounts, logpass, set()) == {"alpha": "alpha", "zzz": "q", "yyy": "r"}
+    # once to find the account name, and once more only when streaming
+    assert len(reads) == len(set(reads)) * (2 if streaming else 1) == (6 if streaming else 3)
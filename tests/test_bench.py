@@ -0,0 +1,34 @@
+from __future__ import annotations
+import os
+
+from bench.corpus import generate
+from core.fs import list_mafiles
+from core.logpass import parse_logpass
+
+from .util import read_tree
+
+
+def test_corpus_is_deterministic_and_parses(tmp_path):
+    a = generate(str(tmp_path / "a"), 50)
+    generate(str(tmp_path / "b"), 50)
+    tree = read_tree(tmp_path / "a")
+    assert tree == read_tree(tmp_path / "b")
+    assert len(list_mafiles(str(tmp_path / "a" / a["mafiles"]))) == 50
+    for name in a["logpass"].values():
+        logpass, _ = parse_logpass(str(tmp_path / "a" / name))
+        assert len(logpass) == 45
+
+
+def test_corpus_is_reused_only_for_the_same_parameters(tmp_path):
+    root = str(tmp_path / "corpus")
+    ma_dir = os.path.join(root, "mafiles")
+    generate(root, 20)
+    os.remove(os.path.join(ma_dir, list_mafiles(ma_dir)[0]))
+    assert generate(root, 20)["n"] == 20
+    assert len(list_mafiles(ma_dir)) == 19
+
+    # another size or seed replaces the corpus on disk, as if generated afresh
+    for n, seed in ((40, 1234), (20, 99)):
+        assert generate(root, n, seed) == generate(str(tmp_path / f"fresh{n}-{seed}"), n, seed)
+        assert len(list_mafiles(ma_dir)) == n
+        assert read_tree(root) == read_tree(tmp_path / f"fresh{n}-{seed}")
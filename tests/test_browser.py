@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+from PySide6 import QtCore
+
+from core.fs import list_mafiles
+from ui.browser import MaFileBrowser
+
+from .util import write_mafile
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_set_filter_reports_the_new_row_count(app, tmp_path):
+    for acc in ("alpha", "beta", "alps"):
+        write_mafile(tmp_path, f"{acc}.maFile", acc=acc)
+    browser = MaFileBrowser()
+    seen = []
+    browser.model.inspected.connect(lambda done, total: seen.append(total))
+    browser.set_folder(str(tmp_path), list_mafiles(str(tmp_path)))
+    try:
+        browser.model.set_filter("al", None)
+        assert browser.model.rowCount() == 2
+        assert seen == [3, 3]
+        assert browser.info.text().endswith("показано: 2")
+    finally:
+        browser.clear()
+        browser.deleteLater()
+        app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
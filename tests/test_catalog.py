@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import stat
+import sys
+
+from core.catalog import Catalog, default_catalog_path, open_catalog
+from core.cli import main
+
+from .util import write_mafile
+
+REC = (10, 20, "alpha", "76561198000000001", True, "ok", "", None)
+
+
+def test_default_path_is_in_the_private_app_dir(app_home):
+    path = default_catalog_path()
+    assert os.path.dirname(path) == app_home
+    if sys.platform != "win32":
+        assert stat.S_IMODE(os.stat(app_home).st_mode) == 0o700
+
+
+def test_round_trip_and_rebuild_of_a_damaged_file(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    catalog = Catalog(path)
+    catalog.put("/x/a.maFile", REC)
+    assert catalog.get("/x/a.maFile", 10, 20) == REC
+    assert catalog.get("/x/a.maFile", 11, 20) is None
+    catalog.close()
+
+    with open(path, "wb") as f:
+        f.write(b"not a database" * 100)
+    catalog = Catalog(path)
+    assert catalog.get("/x/a.maFile", 10, 20) is None
+    catalog.close()
+
+
+def test_unusable_catalog_is_logged_and_skipped(tmp_path, logs):
+    # a directory where the database file should be: sqlite cannot open it
+    path = tmp_path / "catalog.sqlite3"
+    path.mkdir()
+    assert open_catalog(str(path), logs) is None
+    assert logs.having("warning")
+
+
+def test_cli_runs_without_a_catalog_it_cannot_open(tmp_path, capsys):
+    src = tmp_path / "in"
+    write_mafile(src, "a.maFile", acc="alpha")
+    bad = tmp_path / "catalog.sqlite3"
+    bad.mkdir()
+    assert main(["mode1", str(src), "--catalog", str(bad)]) == 0
+    assert os.path.exists(src / "fullmafiles" / "alpha.maFile")
+    assert "Каталог метаданных недоступен" in capsys.readouterr().out
+
+
+def test_failed_reconnect_after_rebuild_is_reported(tmp_path, logs, monkeypatch):
+    path = str(tmp_path / "catalog.sqlite3")
+    with open(path, "wb") as f:
+        f.write(b"not a database" * 100)
+    # the damaged file cannot be removed, so the reconnect fails as well
+    monkeypatch.setattr(os, "remove", lambda p: None)
+    assert open_catalog(path, logs) is None
+    assert logs.having("warning")
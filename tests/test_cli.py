@@ -0,0 +1,35 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import subprocess
+
+from .util import write_mafile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, encoding="utf-8", timeout=60)
+
+
+def test_cli_never_imports_qt(tmp_path):
+    write_mafile(tmp_path, "a.maFile", acc="alpha")
+    code = (
+        "import sys; from core.cli import main; "
+        f"rc = main(['--json', 'mode1', {str(tmp_path)!r}]); "
+        "assert not [m for m in sys.modules if m.startswith('PySide6')], 'Qt imported'; "
+        "sys.exit(rc)"
+    )
+    res = _run("-c", code)
+    assert res.returncode == 0, res.stderr
+    events = [json.loads(line) for line in res.stdout.splitlines()]
+    assert events[-1]["event"] == "done"
+    assert os.path.exists(tmp_path / "fullmafiles" / "alpha.maFile")
+
+
+def test_exit_codes(tmp_path):
+    res = _run("-m", "core", "--json", "mode2", str(tmp_path / "missing"))
+    assert res.returncode == 1
+    assert json.loads(res.stdout.splitlines()[-1])["event"] == "failed"
+    assert _run("-m", "core", "--help").returncode == 0
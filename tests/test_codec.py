@@ -0,0 +1,41 @@
+from __future__ import annotations
+import json
+
+import pytest
+
+from core.codec import JsonCodec
+
+DOCS = [
+    {"account_name": "тест", "shared_secret": "c2VjcmV0", "Session": {"SteamID": 76561198000000000, "list": [1, [], {}]}},
+    {"big": 2**70, "neg": -2**63, "float": 0.1, "nested": {"a": {"b": {"c": [True, False, None]}}}},
+    {"quote": "\"\\/\n\t\u0001", "emoji": "😀", "empty": ""},
+    [],
+    {},
+]
+
+
+@pytest.mark.parametrize("indent", [None, 2, 4])
+@pytest.mark.parametrize("doc", DOCS)
+def test_orjson_output_matches_stdlib(doc, indent):
+    pytest.importorskip("orjson")
+    fast, std = JsonCodec("orjson"), JsonCodec("stdlib")
+    assert fast.dumps(doc, indent) == std.dumps(doc, indent)
+    raw = std.dumps(doc, indent).encode("utf-8")
+    assert fast.loads(raw) == std.loads(raw) == doc
+
+
+def test_stdlib_only_documents_fall_back():
+    pytest.importorskip("orjson")
+    fast, std = JsonCodec("orjson"), JsonCodec("stdlib")
+    raw = b'{"a": NaN, "b": Infinity, "s": "\\ud800"}'
+    doc = fast.loads(raw)
+    assert fast.dumps(doc) == std.dumps(std.loads(raw))
+    with pytest.raises(json.JSONDecodeError):
+        fast.loads(b"{broken")
+
+
+def test_compact_and_verify():
+    codec = JsonCodec("stdlib", compact=True, verify=True)
+    assert codec.dumps({"a": [1, 2]}, indent=4) == '{"a":[1,2]}'
+    with pytest.raises(ValueError):
+        JsonCodec("nope")
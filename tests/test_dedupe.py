@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from core.dedupe import find_duplicates
+from core.fs import list_mafiles
+
+from .util import write_mafile
+
+SID = "76561198000000001"
+
+
+def _groups(report) -> dict[str, tuple[list[str], list[str]]]:
+    return {g["keep"]: (sorted(g["drop"]), g["reasons"]) for g in report["groups"]}
+
+
+def test_groups_by_content_account_and_steam_id(tmp_path):
+    write_mafile(tmp_path, "blob1.maFile", "[1, 2, 3]")
+    write_mafile(tmp_path, "blob2.maFile", "[1, 2, 3]")
+    write_mafile(tmp_path, "acc1.maFile", acc="Alpha", sid="76561198000000011")
+    write_mafile(tmp_path, "acc2.maFile", acc="alpha", sid="76561198000000012")
+    write_mafile(tmp_path, "sid1.maFile", acc="beta", sid=SID)
+    write_mafile(tmp_path, "sid2.maFile", acc="gamma", sid=SID)
+    write_mafile(tmp_path, "solo.maFile", acc="solo", sid="76561198000000099")
+    folder = str(tmp_path)
+    report = find_duplicates(folder, list_mafiles(folder))
+    assert _groups(report) == {
+        "acc1.maFile": (["acc2.maFile"], ["account_name"]),
+        "blob1.maFile": (["blob2.maFile"], ["content"]),
+        "sid1.maFile": (["sid2.maFile"], ["steam_id"]),
+    }
+    assert report["dropped"] == ["acc2.maFile", "blob2.maFile", "sid2.maFile"]
+    assert report["files"] == 7
+
+
+@pytest.mark.parametrize("policy, keep", [("first", "b.maFile"), ("newest", "b.maFile"), ("complete", "c.maFile")])
+def test_policies_never_keep_an_incomplete_copy_over_a_complete_one(tmp_path, policy, keep):
+    # a: first by name and newest, but without shared_secret
+    # b: complete, newer than c; c: complete and the largest
+    write_mafile(tmp_path, "a.maFile", acc="alpha", secret="")
+    write_mafile(tmp_path, "b.maFile", acc="alpha")
+    write_mafile(tmp_path, "c.maFile", acc="alpha", note="x" * 100)
+    for i, name in enumerate(("c.maFile", "b.maFile", "a.maFile")):
+        os.utime(tmp_path / name, ns=(0, (1_700_000_000 + i) * 10**9))
+    folder = str(tmp_path)
+    report = find_duplicates(folder, list_mafiles(folder), policy)
+    [group] = report["groups"]
+    assert group["keep"] == keep
+    assert sorted(group["drop"] + [keep]) == ["a.maFile", "b.maFile", "c.maFile"]
+
+
+def test_first_and_newest_fall_back_to_incomplete_copies(tmp_path):
+    write_mafile(tmp_path, "a.maFile", acc="alpha", secret="")
+    write_mafile(tmp_path, "b.maFile", acc="alpha", secret="")
+    os.utime(tmp_path / "a.maFile", ns=(0, 1_700_000_000 * 10**9))
+    folder = str(tmp_path)
+    assert find_duplicates(folder, list_mafiles(folder), "first")["groups"][0]["keep"] == "a.maFile"
+    assert find_duplicates(folder, list_mafiles(folder), "newest")["groups"][0]["keep"] == "b.maFile"
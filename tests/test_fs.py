@@ -0,0 +1,34 @@
+from __future__ import annotations
+import os
+
+from core.fs import iter_mafiles, list_mafiles
+
+from .util import write_mafile
+
+
+def _tree(root):
+    for name in ("a.maFile", "b.MAFILE", "c.maFiles", "notes.txt", os.path.join("sub", "d.maFile"),
+                 os.path.join("sub", "deep", "e.maFile"), os.path.join("fullmafiles", "x.maFile")):
+        write_mafile(root, name, acc="x")
+    return str(root)
+
+
+def test_listing_is_flat_unless_recursive(tmp_path):
+    root = _tree(tmp_path)
+    assert list_mafiles(root) == ["a.maFile", "b.MAFILE", "c.maFiles"]
+    assert list_mafiles(root, recursive=True, exclude={"fullmafiles"}) == [
+        "a.maFile", "b.MAFILE", "c.maFiles", os.path.join("sub", "d.maFile"), os.path.join("sub", "deep", "e.maFile"),
+    ]
+
+
+def test_entries_carry_paths_and_stat(tmp_path):
+    root = _tree(tmp_path)
+    entries = {e.name: e for e in iter_mafiles(root, recursive=True)}
+    e = entries[os.path.join("sub", "d.maFile")]
+    assert e.path == os.path.join(root, "sub", "d.maFile")
+    st = os.stat(e.path)
+    assert (e.size, e.mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+
+def test_missing_folder_lists_nothing(tmp_path):
+    assert list_mafiles(str(tmp_path / "missing")) == []
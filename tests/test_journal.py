@@ -0,0 +1,101 @@
+from __future__ import annotations
+import os
+
+import pytest
+
+from core.cancel import CancelToken, Cancelled
+from core.fs import list_mafiles
+from core.journal import Journal
+from core.processor import MaFileProcessor
+from core.sinks import FolderSink
+
+from .util import write_mafile
+
+JOURNAL = ".mafile-manager.journal.jsonl"
+
+
+def _proc(logs, cancel=None):
+    return MaFileProcessor(logs, lambda *a: None, cancel=cancel or CancelToken())
+
+
+def _stop_on_error(logs, cancel: CancelToken):
+    # "Стоп" pressed right after the first failure shows up in the log: the
+    # failed file is handled, the run stops before the next one
+    def log(message, level="info"):
+        logs(message, level)
+        if level == "error":
+            cancel.cancel()
+
+    return log
+
+
+def _corpus(tmp_path, n=6):
+    src = tmp_path / "in"
+    for i in range(n):
+        write_mafile(src, f"{i}.maFile", acc=f"acc{i}")
+    return str(src)
+
+
+def _failing_writes(monkeypatch, bad: set[str]):
+    # the listed outputs fail once
+    real = FolderSink.write
+
+    def write(self, name, data):
+        if name in bad:
+            bad.discard(name)
+            raise OSError("нет места на диске")
+        return real(self, name, data)
+
+    monkeypatch.setattr(FolderSink, "write", write)
+
+
+def test_vanished_file_is_logged_not_fatal(tmp_path, logs):
+    src = _corpus(tmp_path, 3)
+    out = _proc(logs).process_modes(src, list_mafiles(src) + ["gone.maFile"], (2,))[2]
+    assert sorted(os.listdir(out)) == ["acc0.maFile", "acc1.maFile", "acc2.maFile"]
+    assert [m.split(":")[0] for m in logs.having("error")] == ["gone.maFile"]
+    assert not os.path.exists(os.path.join(src, JOURNAL))
+
+
+def test_file_failed_before_stop_is_retried(tmp_path, logs, monkeypatch):
+    src = _corpus(tmp_path)
+    cancel = CancelToken()
+    _failing_writes(monkeypatch, {"acc1.maFile"})
+    with pytest.raises(Cancelled):
+        _proc(_stop_on_error(logs, cancel), cancel).process_modes(src, list_mafiles(src), (2,))
+    journal = Journal(os.path.join(src, JOURNAL), {"folder": os.path.abspath(src), "modes": [2]})
+    assert "0.maFile" in journal and "1.maFile" not in journal
+
+    logs.lines.clear()
+    out = _proc(logs).process_modes(src, list_mafiles(src), (2,))[2]
+    assert sorted(os.listdir(out)) == [f"acc{i}.maFile" for i in range(6)]
+    assert not logs.having("error")
+
+
+def test_resume_runs_only_the_missing_modes(tmp_path, logs, monkeypatch):
+    src = _corpus(tmp_path)
+    cancel = CancelToken()
+    short = os.path.join(src, "shortmaffsmpanel")
+    calls = []
+    real = FolderSink.write
+
+    def flaky(self, name, data):
+        # file 1: mode 2 fails once, mode 3 succeeds
+        calls.append((os.path.basename(self.path), name))
+        if self.path == short and name == "acc1.maFile" and not cancel.cancelled:
+            raise OSError("нет места на диске")
+        return real(self, name, data)
+
+    monkeypatch.setattr(FolderSink, "write", flaky)
+    with pytest.raises(Cancelled):
+        _proc(_stop_on_error(logs, cancel), cancel).process_modes(src, list_mafiles(src), (2, 3))
+    journal = Journal(os.path.join(src, JOURNAL), {"folder": os.path.abspath(src), "modes": [2, 3]})
+    assert journal.get("1.maFile")["modes"] == [3]
+
+    calls.clear()
+    _proc(logs).process_modes(src, list_mafiles(src), (2, 3))
+    assert ("shortmaffsmpanel", "acc1.maFile") in calls
+    assert ("shortmafdmpanel", "acc1.maFile") not in calls
+    assert ("shortmaffsmpanel", "acc0.maFile") not in calls
+    for d in ("shortmaffsmpanel", "shortmafdmpanel"):
+        assert sorted(os.listdir(os.path.join(src, d))) == [f"acc{i}.maFile" for i in range(6)]
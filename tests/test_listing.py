@@ -0,0 +1,41 @@
+from __future__ import annotations
+import os
+
+import pytest
+
+from core import listing
+from core.cancel import CancelToken, Cancelled
+from core.listing import ListingCache
+
+from .util import write_mafile
+
+
+def test_listing_is_reused_until_a_directory_changes(tmp_path, monkeypatch):
+    write_mafile(tmp_path / "sub", "b.maFile", acc="b")
+    write_mafile(tmp_path, "a.maFile", acc="a")
+    cache = ListingCache()
+    folder = str(tmp_path)
+    names = cache.scan(folder, recursive=True)
+    assert names == ["a.maFile", os.path.join("sub", "b.maFile")]
+
+    monkeypatch.setattr(listing, "iter_mafiles", lambda *a, **kw: pytest.fail("rescanned"))
+    assert cache.scan(folder, recursive=True) == names
+    monkeypatch.undo()
+
+    write_mafile(tmp_path / "sub", "c.maFile", acc="c")
+    assert cache.get(folder, recursive=True) is None
+    assert cache.scan(folder, recursive=True) == names + [os.path.join("sub", "c.maFile")]
+    # a flat listing is cached on its own
+    assert cache.scan(folder) == ["a.maFile"]
+
+
+def test_cancelled_scan_caches_nothing(tmp_path):
+    write_mafile(tmp_path, "a.maFile", acc="a")
+    cache = ListingCache()
+    cancel = CancelToken()
+    cancel.cancel()
+    with pytest.raises(Cancelled):
+        cache.scan(str(tmp_path), cancel=cancel)
+    assert cache.get(str(tmp_path)) is None
+    with pytest.raises(FileNotFoundError):
+        cache.scan(str(tmp_path / "missing"))
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import os
+import stat
+import sys
+
+import pytest
+
+from core.fs import app_dir
+
+
+def test_app_dir_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("MAFILE_MANAGER_HOME", str(tmp_path / "home"))
+    path = app_dir("logs")
+    assert path == str(tmp_path / "home" / "logs")
+    if sys.platform != "win32":
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(tmp_path / "home").st_mode) == 0o700
+
+
+def test_rotating_log_reports_dropped_lines(tmp_path):
+    log_sink = pytest.importorskip("ui.log_sink")
+    log = log_sink.RotatingLog(str(tmp_path / "x.log"), max_bytes=100, backups=2)
+    # every line fills a part and is rotated out to x.log.1, then x.log.2
+    for i in range(2):
+        log.write([str(i) * 120])
+    assert log.dropped == 0
+    assert log.read_all().splitlines() == ["0" * 120, "1" * 120]
+    log.write(["2" * 120])
+    text = log.read_all().splitlines()
+    assert log.dropped == 121
+    assert text[0].startswith("[!] Начало лога обрезано")
+    assert text[1:] == ["1" * 120, "2" * 120]
+    log.reset()
+    assert log.dropped == 0 and log.read_all() == ""
+
+
+def test_close_keeps_the_log_and_startup_prunes_stale_runs(tmp_path):
+    log_sink = pytest.importorskip("ui.log_sink")
+    log = log_sink.RotatingLog(str(tmp_path / "processing-123.log"))
+    log.write(["line"])
+    log.close()
+    assert (tmp_path / "processing-123.log").read_text(encoding="utf-8") == "line\n"
+
+    old = 1_700_000_000
+    for name in ("asf-7.log", "asf-7.log.1", "asf-7.log.2", "perf-processing-20240101-000000.json"):
+        (tmp_path / name).write_text("x", encoding="utf-8")
+        os.utime(tmp_path / name, (old, old))
+    assert log_sink.prune_logs(str(tmp_path)) == 3
+    assert sorted(os.listdir(tmp_path)) == ["perf-processing-20240101-000000.json", "processing-123.log"]
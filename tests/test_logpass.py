@@ -0,0 +1,44 @@
+from __future__ import annotations
+import random
+import codecs
+
+import pytest
+
+from core.logpass import DELIMS, _parse_lines, parse_logpass, parse_logpass_text, split_lines
+
+
+@pytest.mark.parametrize("delim", DELIMS)
+def test_each_delimiter(delim):
+    text = f"alpha{delim}pw1\r\nbeta{delim}pw2\n\n  gamma {delim} pw3  \n"
+    assert parse_logpass_text(text) == ({"alpha": "pw1", "beta": "pw2", "gamma": "pw3"}, [])
+
+
+def test_bad_lines_are_reported_with_their_numbers():
+    logpass, rejects = parse_logpass_text("alpha:pw1\nnodelimiter\n:pw\nbeta:pw2\n")
+    assert logpass == {"alpha": "pw1", "beta": "pw2"}
+    assert rejects == [(2, "нет разделителя"), (3, "пустой логин или пароль")]
+
+
+def test_fast_paths_agree_with_the_line_by_line_parser():
+    rng = random.Random(7)
+    pieces = ["alpha", "b", "пароль", "x y", "", " "] + DELIMS
+    for _ in range(2000):
+        lines = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 6))]
+        text = rng.choice(["\n", "\r\n", "\r"]).join(lines)
+        assert parse_logpass_text(text) == _parse_lines(split_lines(text)), text
+
+
+@pytest.mark.parametrize("encode, text", [
+    (lambda s: s.encode("utf-8"), "логин:пароль\nalpha:pw\n"),
+    (lambda s: codecs.BOM_UTF8 + s.encode("utf-8"), "логин:пароль\nalpha:pw\n"),
+    (lambda s: s.encode("utf-16"), "логин:пароль\nalpha:pw\n"),
+    (lambda s: s.encode("cp1251"), "логин:пароль\nalpha:pw\n"),
+    # without a BOM, UTF-16 is told by the zero bytes of ASCII text
+    (lambda s: s.encode("utf-16-le"), "login:pw\nalpha:pw\n"),
+    (lambda s: s.encode("utf-16-be"), "login:pw\nalpha:pw\n"),
+])
+def test_encodings(tmp_path, encode, text):
+    path = tmp_path / "logpass.txt"
+    path.write_bytes(encode(text))
+    expected = dict(line.split(":") for line in text.split())
+    assert parse_logpass(str(path)) == (expected, [])
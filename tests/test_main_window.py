@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+from PySide6 import QtCore
+
+from ui.main_window import MainWindow, Worker
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_close_waits_for_a_running_job_before_closing_the_catalog(app):
+    window = MainWindow()
+    catalog = window._get_catalog()
+    assert catalog is not None
+    seen = []
+
+    def job():
+        # a job that, once stopped, still finishes its current file
+        window.cancel1.wait(10)
+        catalog.put("/x/a.maFile", (1, 2, "alpha", "", False, "incomplete", "", None))
+        catalog.flush()
+        window._append_log(window.log_box, "последний файл", "info")
+        seen.append(catalog.get("/x/a.maFile", 1, 2))
+
+    window.w1 = Worker(job)
+    window.w1.start()
+    try:
+        window.close()
+        assert not window.w1.isRunning()
+        assert seen and seen[0][2] == "alpha"
+    finally:
+        window.deleteLater()
+        app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
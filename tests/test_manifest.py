@@ -0,0 +1,67 @@
+from __future__ import annotations
+import os
+
+from core.fs import list_mafiles
+from core.manifest import Manifest
+from core.processor import MaFileProcessor
+
+from .util import touch_later, write_mafile
+
+
+def _run(folder, logs, modes=(1,)):
+    proc = MaFileProcessor(logs, lambda *a: None, incremental=True)
+    proc.process_modes(str(folder), list_mafiles(str(folder)), modes)
+
+
+def test_second_run_skips_unchanged(tmp_path, logs):
+    src = tmp_path / "in"
+    write_mafile(src, "a.maFile", acc="alpha")
+    write_mafile(src, "b.maFile", acc="beta")
+    _run(src, logs)
+    logs.lines.clear()
+    _run(src, logs)
+    assert "пропущено: 2" in logs.having("success")[0]
+
+
+def test_renamed_account_reports_old_output_as_orphan(tmp_path, logs):
+    src = tmp_path / "in"
+    path = write_mafile(src, "a.maFile", acc="wnfsgjblr1")
+    _run(src, logs, (1, 2))
+    write_mafile(src, "a.maFile", acc="renamed")
+    touch_later(path)
+    logs.lines.clear()
+    _run(src, logs, (1, 2))
+    warnings = logs.having("warning")
+    assert len(warnings) == 2
+    assert all("wnfsgjblr1.maFile" in w for w in warnings)
+    out = tmp_path / "in" / "fullmafiles"
+    assert sorted(os.listdir(out)) == ["renamed.maFile", "wnfsgjblr1.maFile"]
+
+    # reported until removed, then forgotten
+    os.remove(out / "wnfsgjblr1.maFile")
+    logs.lines.clear()
+    _run(src, logs, (1,))
+    assert not logs.having("warning")
+    assert not Manifest(str(out)).stale
+
+
+def test_stale_output_produced_again_is_not_an_orphan(tmp_path):
+    m = Manifest(str(tmp_path / "out"))
+    m.update("a.maFile", 1, 1, "x", "old.maFile")
+    m.update("a.maFile", 2, 2, "y", "new.maFile")
+    m.update("b.maFile", 3, 3, "z", "old.maFile")
+    os.makedirs(m.out_dir)
+    for name in ("old.maFile", "new.maFile"):
+        open(os.path.join(m.out_dir, name), "w").close()
+    assert m.orphans({"a.maFile", "b.maFile"}) == []
+
+
+def test_input_removed_is_an_orphan(tmp_path, logs):
+    src = tmp_path / "in"
+    write_mafile(src, "a.maFile", acc="alpha")
+    write_mafile(src, "b.maFile", acc="beta")
+    _run(src, logs)
+    os.remove(src / "b.maFile")
+    logs.lines.clear()
+    _run(src, logs)
+    assert any("beta.maFile" in w for w in logs.having("warning"))
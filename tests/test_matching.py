@@ -0,0 +1,62 @@
+from __future__ import annotations
+import random
+
+from core.matching import LoginIndex, match_variants
+
+
+def _linear(steam_id, filename: str, available: dict[str, str]):
+    # the matcher LoginIndex replaced: exact variants, then the first login
+    # (in file order) related to the SteamID or file name by containment
+    sid, fn, variants = match_variants(steam_id, filename)
+    hits = [v for v in variants if v in available]
+    if hits:
+        return hits
+    sid_l, fn_l = sid.lower(), fn.lower()
+    for login in available:
+        lc = login.strip().lower()
+        if lc in sid_l or sid_l in lc or lc in fn_l or fn_l in lc:
+            return [login]
+    return [None]
+
+
+def _word(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice("abAB1_-") for _ in range(rng.randint(1, n)))
+
+
+def test_matches_linear_scan_while_consuming_logins():
+    rng = random.Random(1)
+    for _ in range(30):
+        logpass = {_word(rng, 6): "pw" for _ in range(rng.randint(1, 40))}
+        available = dict(logpass)
+        index = LoginIndex(logpass)
+        for _ in range(60):
+            sid, fn = _word(rng, 8), _word(rng, 8) + ".maFile"
+            expected = _linear(sid, fn, available)
+            login, _ = index.match(sid, fn)
+            assert login in expected
+            if login is not None:
+                available.pop(login)
+                index.remove(login)
+        assert index.remaining() == list(available.items())
+
+
+def test_earliest_login_wins():
+    index = LoginIndex({"zzbob": "1", "bob": "2", "bobby": "3"})
+    assert index.match("", "x_bob_y.maFile")[0] == "bob"
+    assert index.match("76561198000000001", "bo.maFile")[0] == "zzbob"
+    index.remove("zzbob")
+    assert index.match("76561198000000001", "bo.maFile")[0] == "bob"
+
+
+def test_long_logins_sort_like_full_suffixes():
+    base = "q" * 40
+    logpass = {base + c: c for c in "cab"} | {base[:17] + "a": "x"}
+    index = LoginIndex(logpass)
+    index._build_suffixes()
+    suffixes = [
+        index.lower[index._owner[c]][index._offset[c]:]
+        for ch in sorted(set("".join(index.lower)))
+        for c in index._bucket(ch).sa
+    ]
+    assert suffixes == sorted(s[i:] for s in index.lower for i in range(len(s)))
+    assert index.match("sid", "q" * 30 + ".maFile")[0] == base + "c"
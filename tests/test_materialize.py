@@ -0,0 +1,52 @@
+from __future__ import annotations
+import os
+
+import pytest
+
+from core import materialize as mat
+from core.fs import list_mafiles
+from core.processor import MaFileProcessor
+
+from .util import write_mafile
+
+
+@pytest.mark.parametrize("strategy", mat.STRATEGIES)
+def test_materialize_copies_content(tmp_path, strategy):
+    src = write_mafile(tmp_path, "a.maFile", acc="alpha")
+    dst = str(tmp_path / "out.maFile")
+    used = mat.materialize(src, dst, strategy)
+    assert used in mat.STRATEGIES[mat.STRATEGIES.index(strategy):]
+    with open(src, "rb") as a, open(dst, "rb") as b:
+        assert a.read() == b.read()
+    assert [n for n in os.listdir(tmp_path) if n.endswith(".tmp")] == []
+
+
+def test_unsupported_strategy_is_remembered(tmp_path, monkeypatch):
+    calls = []
+
+    def no_links(src, dst):
+        calls.append(dst)
+        raise OSError(mat.errno.EXDEV, "cross-device")
+
+    monkeypatch.setitem(mat._IMPL, "hardlink", no_links)
+    monkeypatch.setattr(mat, "_unsupported", set())
+    src = write_mafile(tmp_path, "a.maFile")
+    for name in ("x.maFile", "y.maFile"):
+        assert mat.materialize(src, str(tmp_path / name), "hardlink") != "hardlink"
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("link", mat.STRATEGIES)
+def test_mode1_follows_full_parse(tmp_path, logs, link):
+    # documents a partial scan for "account_name" used to get wrong
+    src = tmp_path / "in"
+    write_mafile(src, "nested.maFile", '{"Session": {"account_name": "inner"}, "shared_secret": "x"}')
+    write_mafile(src, "null.maFile", '{"account_name": null, "Session": {"account_name": "inner2"}}')
+    write_mafile(src, "dup.maFile", '{"account_name": "first", "x": 1, "account_name": "last"}')
+    write_mafile(src, "cut.maFile", '{"account_name": "cut", "shared_secret": "abc')
+    write_mafile(src, "ok.maFile", acc="fine")
+    proc = MaFileProcessor(logs, lambda *a: None, link=link)
+    out = proc.process_mode1(str(src), list_mafiles(str(src)))
+    assert sorted(os.listdir(out)) == ["fine.maFile", "last.maFile"]
+    assert sorted(m.split(":")[0] for m in logs.having("warning")) == ["nested.maFile", "null.maFile"]
+    assert [m.split(":")[0] for m in logs.having("error")] == ["cut.maFile"]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+import os
+import json
+
+import pytest
+
+from core.fs import list_mafiles
+from core.metrics import Metrics
+from core.processor import MaFileProcessor
+
+from .util import write_mafile
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_run_report_counts_every_file_and_byte(tmp_path, logs, executor):
+    src = tmp_path / "in"
+    for i in range(8):
+        write_mafile(src, f"{i}.maFile", acc=f"acc{i}")
+    files = list_mafiles(str(src))
+    report = str(tmp_path / "report.json")
+    metrics = Metrics("mode2", report)
+    MaFileProcessor(logs, lambda *a: None, workers=2, executor=executor, metrics=metrics).process_modes(str(src), files, (2,))
+    with open(report, encoding="utf-8") as f:
+        doc = json.load(f)
+    assert doc["files"] == 8
+    assert doc["bytes_read"] == sum(os.path.getsize(src / n) for n in files)
+    out = src / "shortmaffsmpanel"
+    assert doc["bytes_written"] == sum(os.path.getsize(out / n) for n in os.listdir(out))
+    assert {"read", "decode", "write"} <= set(doc["stages"])
+    assert any(m.startswith("Замеры (mode2)") for m in logs.having("info"))
+
+
+def test_merge_adds_worker_counters():
+    clock = iter(range(100)).__next__
+    total, part = Metrics(clock=clock), Metrics(clock=clock)
+    with part.stage("read"):
+        pass
+    part.count_bytes(read=10, written=4)
+    part.file_done(0.003)
+    total.merge(part.raw())
+    total.merge(part.raw())
+    assert total.stages == {"read": [2, 2]}
+    assert (total.bytes_read, total.bytes_written, sum(total.histogram)) == (20, 8, 2)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import os
+import zipfile
+
+import pytest
+
+from core.fs import close_archives, list_mafiles, read_mafile
+from core.processor import TARGETS, MaFileProcessor
+
+from .util import read_tree, write_mafile
+
+
+def _corpus(folder, n=24):
+    for i in range(n):
+        if i % 7 == 3:
+            write_mafile(folder, f"{i:02d}.maFile", acc=f"acc{i}", secret="")
+        elif i % 11 == 5:
+            write_mafile(folder, f"{i:02d}.maFile", "{broken")
+        else:
+            write_mafile(folder, f"{i:02d}.maFile", acc=f"acc{i}", sid=str(76561198000000000 + i))
+    return str(folder)
+
+
+def _outputs(src) -> dict[str, bytes]:
+    return {k: v for k, v in read_tree(src).items() if k.split(os.sep, 1)[0] in {d for d, _ in TARGETS.values()}}
+
+
+@pytest.mark.parametrize("executor, workers", [("thread", 4), ("process", 2)])
+def test_parallel_runs_match_the_sequential_one(tmp_path, logs, executor, workers):
+    seq = _corpus(tmp_path / "seq")
+    par = _corpus(tmp_path / "par")
+    for mode in TARGETS:
+        MaFileProcessor(logs, lambda *a: None).process_modes(seq, list_mafiles(seq), [mode])
+        MaFileProcessor(logs, lambda *a: None, workers=workers, executor=executor).process_modes(par, list_mafiles(par), [mode])
+    expected = _outputs(seq)
+    assert expected and _outputs(par) == expected
+
+
+def test_several_modes_read_each_file_once(tmp_path, logs, monkeypatch):
+    import core.processor as processor
+
+    one = _corpus(tmp_path / "one")
+    multi = _corpus(tmp_path / "multi")
+    for mode in TARGETS:
+        MaFileProcessor(logs, lambda *a: None).process_modes(one, list_mafiles(one), [mode])
+    reads = []
+    real = processor._read_raw
+    monkeypatch.setattr(processor, "_read_raw", lambda folder, fn, archive: reads.append(fn) or real(folder, fn, archive))
+    MaFileProcessor(logs, lambda *a: None).process_modes(multi, list_mafiles(multi), list(TARGETS))
+    assert sorted(reads) == list_mafiles(multi)
+    assert _outputs(multi) == _outputs(one)
+
+
+def test_zip_source_matches_the_extracted_folder(tmp_path, logs):
+    folder = _corpus(tmp_path / "batch")
+    archive = str(tmp_path / "zipped" / "batch.zip")
+    os.makedirs(os.path.dirname(archive))
+    with zipfile.ZipFile(archive, "w") as z:
+        for name in list_mafiles(folder):
+            z.write(os.path.join(folder, name), name)
+        z.writestr("nested/skip.maFile", "{}")
+    try:
+        assert list_mafiles(archive) == list_mafiles(folder)
+        assert read_mafile(f"{archive}::03.maFile") == read_mafile(folder, "03.maFile")
+        for src in (folder, archive):
+            MaFileProcessor(logs, lambda *a: None, workers=2).process_modes(src, list_mafiles(src), list(TARGETS))
+    finally:
+        close_archives()
+    expected = _outputs(folder)
+    assert expected and _outputs(tmp_path / "zipped" / "batch") == expected
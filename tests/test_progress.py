@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from core.progress import ProgressReporter, format_eta
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_same_percent_is_coalesced_until_the_interval_passes():
+    sent, clock = [], Clock()
+    rep = ProgressReporter(lambda v, t: sent.append((v, t)), min_interval=0.1, clock=clock)
+    for i in range(1000):
+        rep.update(i, 1000, f"{i}")
+    assert [v for v, _ in sent] == list(range(100))
+    clock.t = 0.05
+    rep(99, "later")
+    assert sent[-1] == (99, "990")
+    rep.flush()
+    assert sent[-1] == (99, "later")
+    rep(100, "done")
+    rep(100, "done again")
+    assert sent[-2:] == [(100, "done"), (100, "done again")]
+
+
+def test_rate_and_eta_once_the_phase_has_run_a_while():
+    sent, clock = [], Clock()
+    rep = ProgressReporter(lambda v, t: sent.append(t), clock=clock)
+    rep.update(0, 100, "Обработка")
+    clock.t = 1.0
+    rep.update(10, 100, "Обработка")
+    assert sent[-1] == "Обработка • 11 файл/с • осталось 0:08"
+
+
+def test_format_eta():
+    assert format_eta(59.6) == "1:00"
+    assert format_eta(3725) == "1:02:05"
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from core.cancel import CancelToken, Cancelled
+from core.fs import list_mafiles
+from core.processor import MaFileProcessor
+from core.sinks import Durability, FolderSink, open_sink
+
+from .util import read_tree, write_mafile
+
+
+def _names(path: str) -> list[str]:
+    with zipfile.ZipFile(path) as z:
+        return sorted(z.namelist())
+
+
+def _members(path: str) -> dict[str, bytes]:
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as z:
+            return {n: z.read(n) for n in z.namelist()}
+    with tarfile.open(path) as t:
+        return {m.name: t.extractfile(m).read() for m in t.getmembers()}
+
+
+def test_archive_abort_keeps_previous_archive(tmp_path):
+    out = str(tmp_path / "out")
+    sink = open_sink(out, "zip")
+    sink.write("a.maFile", "{}")
+    sink.close()
+    sink = open_sink(out, "zip")
+    sink.write("b.maFile", "{}")
+    sink.abort()
+    assert _names(out + ".zip") == ["a.maFile"]
+    assert os.listdir(tmp_path) == ["out.zip"]
+
+
+def test_cancelled_run_keeps_previous_archive(tmp_path, logs):
+    src = tmp_path / "in"
+    for i in range(5):
+        write_mafile(src, f"{i}.maFile", acc=f"acc{i}")
+    files = list_mafiles(str(src))
+    MaFileProcessor(logs, lambda *a: None, archive="zip").process_modes(str(src), files[3:], (2,))
+    zip_path = str(src / "shortmaffsmpanel.zip")
+    assert _names(zip_path) == ["acc3.maFile", "acc4.maFile"]
+
+    # the third file is broken, and its error presses "Стоп"
+    write_mafile(src, "2.maFile", "{")
+    cancel = CancelToken()
+    stop = MaFileProcessor(lambda m, l: cancel.cancel() if l == "error" else None, lambda *a: None, archive="zip", cancel=cancel)
+    with pytest.raises(Cancelled):
+        stop.process_modes(str(src), files, (2,))
+    assert _names(zip_path) == ["acc3.maFile", "acc4.maFile"]
+    assert sorted(os.listdir(src)) == [f"{i}.maFile" for i in range(5)] + ["shortmaffsmpanel.zip"]
+
+
+@pytest.mark.parametrize("policy", ["none", "batch", "always"])
+def test_folder_writes_are_atomic(tmp_path, policy):
+    sink = FolderSink(str(tmp_path / "out"), Durability(policy, every=2))
+    for i in range(3):
+        sink.write(f"{i}.maFile", "{}")
+    sink.abort()
+    assert sorted(os.listdir(sink.path)) == ["0.maFile", "1.maFile", "2.maFile"]
+
+
+@pytest.mark.parametrize("fmt", ["zip", "tar.gz"])
+def test_archive_holds_what_the_folder_output_holds(tmp_path, logs, fmt):
+    src = tmp_path / "in"
+    for i in range(6):
+        write_mafile(src, f"{i}.maFile", acc=f"acc{i}")
+    files = list_mafiles(str(src))
+    MaFileProcessor(logs, lambda *a: None).process_modes(str(src), files, (1, 2, 3))
+    MaFileProcessor(logs, lambda *a: None, archive=fmt, workers=3).process_modes(str(src), files, (1, 2, 3))
+    for out in ("fullmafiles", "shortmaffsmpanel", "shortmafdmpanel"):
+        folder = read_tree(src / out)
+        assert len(folder) == 6 and _members(str(src / f"{out}.{fmt}")) == folder
@@ -0,0 +1,32 @@
+from __future__ import annotations
+import os
+import sys
+import subprocess
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys
+from PySide6.QtWidgets import QApplication
+app = QApplication([])
+from ui.main_window import MainWindow
+w = MainWindow()
+heavy = sorted(m for m in ("core.processor", "core.asf", "core.watch", "core.sinks") if m in sys.modules)
+print(",".join(heavy))
+print(sorted(w._lazy_tabs) == [w.TAB_ASF, w.TAB_DEV])
+w.tabs.setCurrentIndex(w.TAB_ASF)
+print(sorted(w._lazy_tabs) == [w.TAB_DEV])
+"""
+
+
+def test_window_builds_only_the_first_tab_and_skips_job_modules():
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen"}
+    res = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert res.returncode == 0, res.stderr
+    heavy, first_only, asf_built = res.stdout.splitlines()[-3:]
+    assert heavy == ""
+    assert first_only == "True" and asf_built == "True"
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import threading
+
+from core.cancel import CancelToken
+from core.watch import _FULL_SCAN_EVERY, FolderWatcher
+
+from .util import touch_later, write_mafile
+
+
+def _watcher(folder, cancel: CancelToken, **kw) -> FolderWatcher:
+    return FolderWatcher(str(folder), debounce=0.01, poll_interval=0.01, cancel=cancel, backend="polling", **kw)
+
+
+def test_polling_picks_up_new_and_renamed_files(tmp_path):
+    write_mafile(tmp_path, "a.maFile", acc="a")
+    cancel = CancelToken()
+    batches = _watcher(tmp_path, cancel).batches()
+    files, full = next(batches)
+    assert full and [e.name for e in files] == ["a.maFile"]
+
+    write_mafile(tmp_path, "b.maFile", acc="b")
+    files, full = next(batches)
+    assert not full and [e.name for e in files] == ["b.maFile"]
+
+    os.rename(tmp_path / "b.maFile", tmp_path / "c.maFile")
+    files, _ = next(batches)
+    assert [e.name for e in files] == ["c.maFile"]
+    cancel.cancel()
+    assert next(batches, None) is None
+
+
+def test_polling_idle_stats_directories_only(tmp_path, monkeypatch):
+    (tmp_path / "sub").mkdir()
+    write_mafile(tmp_path / "sub", "a.maFile", acc="a")
+    cancel = CancelToken()
+    watcher = _watcher(tmp_path, cancel, recursive=True)
+    batches = watcher.batches()
+    next(batches)
+    assert set(watcher._stamp) == {str(tmp_path), str(tmp_path / "sub")}
+
+    scans = []
+    scan = watcher._scan
+    monkeypatch.setattr(watcher, "_scan", lambda: scans.append(1) or scan())
+    threading.Timer(0.01 * (_FULL_SCAN_EVERY - 5), cancel.cancel).start()
+    assert next(batches, None) is None
+    assert scans == []
+
+
+def test_polling_rescans_for_in_place_rewrites(tmp_path):
+    write_mafile(tmp_path, "a.maFile", acc="a")
+    cancel = CancelToken()
+    batches = _watcher(tmp_path, cancel).batches()
+    next(batches)
+    stamp = os.stat(tmp_path).st_mtime_ns
+    with open(tmp_path / "a.maFile", "a", encoding="utf-8") as f:
+        f.write(" ")
+    touch_later(tmp_path / "a.maFile")
+    assert os.stat(tmp_path).st_mtime_ns == stamp
+    files, _ = next(batches)
+    assert [e.name for e in files] == ["a.maFile"]
+    cancel.cancel()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import os
+import json
+
+
+def mafile(acc: str = "acc", sid: str = "76561198000000000", secret: str = "c2VjcmV0", **extra) -> dict:
+    data = {"account_name": acc, "shared_secret": secret, "Session": {"SteamID": sid}}
+    data.update(extra)
+    return data
+
+
+def write_mafile(folder, name: str, data=None, **fields) -> str:
+    path = os.path.join(folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if isinstance(data, (str, bytes)):
+            f.write(data if isinstance(data, str) else data.decode("utf-8"))
+        else:
+            json.dump(data if data is not None else mafile(**fields), f)
+    return path
+
+
+def touch_later(path: str, step_ns: int = 10**9):
+    # bump mtime so size+mtime checks see a change even on coarse clocks
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + step_ns))
+
+
+def read_tree(folder) -> dict[str, bytes]:
+    # every file under `folder` by relative path, for comparing outputs
+    out = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                out[os.path.relpath(path, folder)] = f.read()
+    return out
+
+
+class Logs:
+    def __init__(self):
+        self.lines: list[tuple[str, str]] = []
+
+    def __call__(self, message: str, level: str = "info"):
+        self.lines.append((message, level))
+
+    def having(self, level: str) -> list[str]:
+        return [m for m, l in self.lines if l == level]
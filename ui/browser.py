@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from collections import deque
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, Signal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QComboBox, QPushButton,
+    QTableView, QHeaderView, QLabel, QAbstractItemView
+)
+
+from core.catalog import Catalog
+from core.metadata import STATUS_INCOMPLETE, STATUS_INVALID, STATUS_OK, MaFileMeta, read_metadata
+
+COLUMNS = ("Файл", "account_name", "SteamID", "Размер", "Статус")
+COL_NAME, COL_ACC, COL_SID, COL_SIZE, COL_STATUS = range(len(COLUMNS))
+STATUS_TEXT = {STATUS_OK: "OK", STATUS_INCOMPLETE: "неполные данные", STATUS_INVALID: "ошибка"}
+STATUS_COLOR = {STATUS_OK: QColor("#AAAAAA"), STATUS_INCOMPLETE: QColor("#FF9A3D"), STATUS_INVALID: QColor("#FF5555")}
+STATUS_RANK = {STATUS_INVALID: 0, STATUS_INCOMPLETE: 1, STATUS_OK: 2}
+PLACEHOLDER = "…"
+
+
+def _sid_key(sid: str) -> int:
+    return int(sid) if sid.isdigit() else -1
+
+
+_SORT_KEYS = {
+    COL_ACC: lambda m: m[0].casefold(),
+    COL_SID: lambda m: _sid_key(m[1]),
+    COL_SIZE: lambda m: m[2],
+    COL_STATUS: lambda m: STATUS_RANK[m[3]],
+}
+
+
+def _size_text(n: int) -> str:
+    if n < 0:
+        return "—"
+    return f"{n} Б" if n < 1024 else f"{n / 1024:.1f} КБ"
+
+
+class _MetaLoader:
+    # One background thread reading metadata. request() replaces the queue of
+    # rows the view asked for, so after a fast scroll only what is on screen
+    # now (plus the prefetch window) gets read; the backlog from "Проверить
+    # все" is worked through whenever that queue is empty. Results go to a
+    # deque that the model drains on the GUI thread, like LogSink. Files the
+    # catalog knows are answered from it; it is flushed whenever work runs out.
+    def __init__(self, folder: str, names: list[str], catalog: Catalog | None = None):
+        self.folder = folder
+        self.names = names
+        self.catalog = catalog
+        self.results: deque[tuple[int, MaFileMeta]] = deque()
+        self._want: list[int] = []
+        self._backlog: list[int] = []
+        self._done: set[int] = set()
+        self._busy = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="mafile-meta", daemon=True)
+        self._thread.start()
+
+    def request(self, indices: list[int]):
+        with self._cond:
+            # popped from the end: first requested, first read
+            self._want = [i for i in reversed(indices) if i not in self._done]
+            self._cond.notify()
+
+    def request_all(self):
+        with self._cond:
+            self._backlog = [i for i in range(len(self.names) - 1, -1, -1) if i not in self._done]
+            self._cond.notify()
+
+    def busy(self) -> bool:
+        with self._cond:
+            return self._busy or bool(self._want) or bool(self._backlog)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                idle = not (self._want or self._backlog or self._stopped)
+            if idle and self.catalog is not None:
+                self.catalog.flush()
+            with self._cond:
+                while not (self._want or self._backlog or self._stopped):
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                i = (self._want or self._backlog).pop()
+                if i in self._done:
+                    continue
+                self._done.add(i)
+                self._busy = True
+            meta = read_metadata(self.folder, self.names[i], catalog=self.catalog)
+            self.results.append((i, meta))
+            with self._cond:
+                self._busy = False
+
+
+class MaFileTableModel(QAbstractTableModel):
+    # Every maFile of a folder with metadata read lazily: data() notes the rows
+    # the view paints, a timer turns them into one loader request plus a
+    # prefetch window, and finished rows are drained in batches. Memory is the
+    # names, two int arrays for the current sort/filter and the metadata of
+    # rows inspected so far. Sorting by a metadata column orders the rows
+    # already inspected and keeps the rest after them in name order. With a
+    # catalog, the filter also finds files by exact SteamID or account_name
+    # before they are inspected.
+    inspected = Signal(int, int)  # rows with metadata, rows total
+
+    def __init__(self, parent=None, prefetch: int = 200, interval_ms: int = 30, catalog: Catalog | None = None):
+        super().__init__(parent)
+        self.prefetch = prefetch
+        self.catalog = catalog
+        self._folder = ""
+        self._names: list[str] = []
+        self._rows = array("i")  # view row -> file index
+        self._pos = array("i")  # file index -> view row, -1 when filtered out
+        self._meta: dict[int, MaFileMeta] = {}
+        self._asked: set[int] = set()
+        self._loader: _MetaLoader | None = None
+        self._sort_col = COL_NAME
+        self._sort_order = Qt.AscendingOrder
+        self._text = ""
+        self._found: set[str] = set()
+        self._status: str | None = None
+        self._full_pass = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+
+    # ----- contents -----
+    def set_folder(self, folder: str, names: list[str]):
+        self.clear()
+        self.beginResetModel()
+        self._folder = folder
+        self._names = names
+        self._loader = _MetaLoader(folder, names, self.catalog)
+        self._apply()
+        self.endResetModel()
+        self.inspected.emit(0, len(names))
+
+    def clear(self):
+        if self._loader is not None:
+            self._loader.stop()
+            self._loader = None
+        self._timer.stop()
+        self.beginResetModel()
+        self._folder = ""
+        self._names = []
+        self._rows = array("i")
+        self._pos = array("i")
+        self._meta = {}
+        self._asked.clear()
+        self._full_pass = False
+        self.endResetModel()
+
+    def inspect_all(self):
+        if self._loader is not None:
+            self._full_pass = True
+            self._loader.request_all()
+            self._timer.start()
+
+    def set_filter(self, text: str, status: str | None):
+        self._text = text.strip().casefold()
+        self._status = status
+        self._found = set()
+        if self.catalog is not None and self._text and self._folder:
+            self._found = {name for name, _ in self.catalog.find(text.strip(), self._folder)}
+        self.beginResetModel()
+        self._apply()
+        self.endResetModel()
+        # the shown row count changed
+        self.inspected.emit(len(self._meta), len(self._names))
+
+    def _apply(self):
+        # rebuild the row order from the sort column and the filter
+        n = len(self._names)
+        meta = self._meta
+        idx: list[int] | range = range(n)
+        if self._text:
+            t, found = self._text, self._found
+            idx = [
+                i for i in idx
+                if t in self._names[i].casefold()
+                or self._names[i] in found
+                or ((m := meta.get(i)) is not None and (t in m[0].casefold() or t in m[1]))
+            ]
+        if self._status is not None:
+            idx = [i for i in idx if (m := meta.get(i)) is not None and m[3] == self._status]
+        desc = self._sort_order == Qt.DescendingOrder
+        if self._sort_col == COL_NAME:
+            # names come sorted from the listing
+            rows = list(reversed(idx)) if desc else list(idx)
+        else:
+            key = _SORT_KEYS[self._sort_col]
+            known = sorted((i for i in idx if i in meta), key=lambda i: key(meta[i]), reverse=desc)
+            rows = known + [i for i in idx if i not in meta]
+        self._rows = array("i", rows)
+        pos = array("i", [-1]) * n
+        for r, i in enumerate(rows):
+            pos[i] = r
+        self._pos = pos
+
+    # ----- Qt model -----
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        i = self._rows[row]
+        if role == Qt.DisplayRole:
+            if col == COL_NAME:
+                return self._names[i]
+            m = self._meta.get(i)
+            if m is None:
+                self._asked.add(row)
+                if not self._timer.isActive():
+                    self._timer.start()
+                return PLACEHOLDER
+            if col == COL_ACC:
+                return m[0]
+            if col == COL_SID:
+                return m[1]
+            if col == COL_SIZE:
+                return _size_text(m[2])
+            return STATUS_TEXT[m[3]]
+        if role == Qt.ForegroundRole and col == COL_STATUS:
+            m = self._meta.get(i)
+            return STATUS_COLOR[m[3]] if m else None
+        if role == Qt.ToolTipRole:
+            m = self._meta.get(i)
+            return m[4] if m and m[4] else None
+        if role == Qt.TextAlignmentRole and col == COL_SIZE:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        self._sort_col = column
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        self._apply()
+        self.layoutChanged.emit()
+
+    # ----- background results -----
+    def _tick(self):
+        loader = self._loader
+        if loader is None:
+            self._timer.stop()
+            return
+        if self._asked:
+            lo, hi = min(self._asked), max(self._asked)
+            rows = sorted(self._asked)
+            rows += range(hi + 1, min(len(self._rows), hi + 1 + self.prefetch))
+            rows += range(max(0, lo - self.prefetch // 2), lo)
+            self._asked.clear()
+            loader.request([self._rows[r] for r in rows if self._rows[r] not in self._meta])
+        self._drain(loader)
+        if not self._asked and not loader.results and not loader.busy():
+            self._timer.stop()
+            if self._full_pass:
+                # everything is known now: let sort and filter see it
+                self._full_pass = False
+                if self._text or self._status is not None or self._sort_col != COL_NAME:
+                    self.set_filter(self._text, self._status)
+
+    def _drain(self, loader: _MetaLoader):
+        q = loader.results
+        if not q:
+            return
+        lo = hi = -1
+        for _ in range(len(q)):
+            i, meta = q.popleft()
+            self._meta[i] = meta
+            r = self._pos[i]
+            if r >= 0:
+                lo = r if lo < 0 else min(lo, r)
+                hi = max(hi, r)
+        if lo >= 0:
+            self.dataChanged.emit(self.index(lo, COL_ACC), self.index(hi, COL_STATUS))
+        self.inspected.emit(len(self._meta), len(self._names))
+
+
+class MaFileBrowser(QWidget):
+    # filter row + virtualized table + "inspected N of M" line
+    STATUS_FILTERS = (("Все", None), ("OK", STATUS_OK), ("Неполные", STATUS_INCOMPLETE), ("Ошибки", STATUS_INVALID))
+
+    def __init__(self, parent=None, catalog: Catalog | None = None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        row = QHBoxLayout()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Фильтр: имя файла, account_name или SteamID")
+        row.addWidget(self.filter_edit, 1)
+        self.status_combo = QComboBox()
+        for text, status in self.STATUS_FILTERS:
+            self.status_combo.addItem(text, status)
+        self.status_combo.setFocusPolicy(Qt.NoFocus)
+        row.addWidget(self.status_combo)
+        self.btn_all = QPushButton("Проверить все")
+        self.btn_all.setObjectName("secondary")
+        self.btn_all.setFocusPolicy(Qt.NoFocus)
+        row.addWidget(self.btn_all)
+        layout.addLayout(row)
+
+        self.model = MaFileTableModel(self, catalog=catalog)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(COL_NAME, Qt.AscendingOrder)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setWordWrap(False)
+        # fixed row heights and no resize-to-contents: the view never has to
+        # measure rows it does not paint
+        vh = self.table.verticalHeader()
+        vh.setVisible(False)
+        vh.setSectionResizeMode(QHeaderView.Fixed)
+        vh.setDefaultSectionSize(22)
+        hh = self.table.horizontalHeader()
+        hh.setSectionResizeMode(QHeaderView.Interactive)
+        hh.setStretchLastSection(True)
+        for col, width in ((COL_NAME, 180), (COL_ACC, 120), (COL_SID, 140), (COL_SIZE, 70)):
+            self.table.setColumnWidth(col, width)
+        self.table.setMinimumHeight(260)
+        layout.addWidget(self.table)
+
+        self.info = QLabel("")
+        self.info.setStyleSheet("color:#AAAAAA;")
+        layout.addWidget(self.info)
+
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(200)
+        self._filter_timer.timeout.connect(self._apply_filter)
+        self.filter_edit.textChanged.connect(lambda _: self._filter_timer.start())
+        self.status_combo.currentIndexChanged.connect(lambda _: self._apply_filter())
+        self.btn_all.clicked.connect(self.model.inspect_all)
+        self.model.inspected.connect(self._show_inspected)
+
+    def set_folder(self, folder: str, names: list[str]):
+        self.model.set_folder(folder, names)
+
+    def clear(self):
+        self.model.clear()
+        self.info.setText("")
+
+    def _apply_filter(self):
+        self.model.set_filter(self.filter_edit.text(), self.status_combo.currentData())
+
+    def _show_inspected(self, done: int, total: int):
+        shown = self.model.rowCount()
+        text = f"Файлов: {total} • проверено: {done}"
+        if shown != total:
+            text += f" • показано: {shown}"
+        self.info.setText(text)
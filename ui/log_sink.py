@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtWidgets import QPlainTextEdit
+
+from core.fs import app_dir
+
+PREFIX = {"success": "✓", "error": "✗", "warning": "!", "info": "i"}
+# logs of past runs are kept this long after their last write
+LOG_MAX_AGE = 7 * 24 * 3600
+# <sink>-<pid>.log and its rotated parts <sink>-<pid>.log.N
+_LOG_NAME = re.compile(r"[\w-]+-\d+\.log(\.\d+)?")
+
+
+def log_dir() -> str:
+    return app_dir("logs")
+
+
+def prune_logs(folder: str | None = None, max_age: float = LOG_MAX_AGE) -> int:
+    # Called at startup: a run's logs stay on disk after it exits (or crashes),
+    # so parts nobody has written to for max_age seconds are removed. A running
+    # instance keeps writing its own and never loses them. Returns the count.
+    folder = folder or log_dir()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        it = os.scandir(folder)
+    except OSError:
+        return 0
+    with it:
+        for entry in it:
+            if not _LOG_NAME.fullmatch(entry.name):
+                continue
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+    return removed
+
+
+class RotatingLog:
+    # Keeps at most max_bytes * (backups + 1) on disk: once the oldest part is
+    # rotated out, read_all() starts with a note saying how much was dropped.
+    def __init__(self, path: str, max_bytes: int = 8 * 1024 * 1024, backups: int = 16):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._f = None
+        self._size = 0
+        # bytes of the oldest lines that no longer fit
+        self.dropped = 0
+
+    def _files(self) -> list[str]:
+        # oldest first
+        olds = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)]
+        return [p for p in olds + [self.path] if os.path.exists(p)]
+
+    def _rotate(self):
+        self._f.close()
+        self._f = None
+        oldest = f"{self.path}.{self.backups}"
+        if os.path.exists(oldest):
+            self.dropped += os.path.getsize(oldest)
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, lines: list[str]):
+        if self._f is None:
+            self._f = open(self.path, "a", encoding="utf-8")
+            self._size = self._f.tell()
+        chunk = "\n".join(lines) + "\n"
+        self._f.write(chunk)
+        self._f.flush()
+        self._size += len(chunk.encode("utf-8"))
+        if self._size >= self.max_bytes:
+            self._rotate()
+
+    def read_all(self) -> str:
+        if self._f is not None:
+            self._f.flush()
+        parts = []
+        if self.dropped:
+            mb = self.max_bytes * (self.backups + 1) // (1024 * 1024)
+            parts.append(f"[!] Начало лога обрезано: удалено {self.dropped // 1024} КБ самых старых строк (лимит {mb} МБ)\n")
+        for p in self._files():
+            with open(p, "r", encoding="utf-8") as f:
+                parts.append(f.read())
+        return "".join(parts).rstrip("\n")
+
+    def reset(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        self.dropped = 0
+        for p in self._files():
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def close(self):
+        # the file stays for prune_logs() to age out
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class LogSink(QObject):
+    # push() may be called from any thread; the GUI thread drains the queue on a
+    # timer and appends one batch per tick instead of one repaint per line.
+    def __init__(self, box: QPlainTextEdit, name: str, max_lines: int = 5000, interval_ms: int = 100, parent=None):
+        super().__init__(parent)
+        self.box = box
+        self.max_lines = max_lines
+        self.box.setMaximumBlockCount(max_lines)
+        self._queue: deque[str] = deque()
+        self.file = RotatingLog(os.path.join(log_dir(), f"{name}-{os.getpid()}.log"))
+        # leftovers of an earlier run that had the same pid
+        self.file.reset()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def push(self, msg: str, level: str = "info"):
+        self._queue.append(f"[{PREFIX.get(level, 'i')}] {msg}")
+
+    def flush(self):
+        q = self._queue
+        if not q:
+            return
+        lines = [q.popleft() for _ in range(len(q))]
+        self.file.write(lines)
+        self.box.appendPlainText("\n".join(lines[-self.max_lines:]))
+        sb = self.box.verticalScrollBar()
+        sb.setValue(sb.maximum())
+
+    def full_text(self) -> str:
+        self.flush()
+        return self.file.read_all()
+
+    @property
+    def truncated(self) -> bool:
+        return self.file.dropped > 0
+
+    def clear(self):
+        self._queue.clear()
+        self.file.reset()
+        self.box.setPlainText("")
+
+    def close(self):
+        self._timer.stop()
+        self.file.close()
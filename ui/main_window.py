@@ -1,28 +1,36 @@
 from __future__ import annotations
 
 import os
+import time
 import webbrowser
+from typing import Callable
 
-from PySide6.QtCore import Qt, QThread, Signal, QPoint
-from PySide6.QtGui import QFont, QIcon, QCursor
+from PySide6.QtCore import Qt, QThread, Signal, QPoint, QTimer
+from PySide6.QtGui import QFont, QIcon, QCursor, QGuiApplication
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QTabWidget, QLabel,
     QGroupBox, QHBoxLayout, QLineEdit, QPushButton, QFileDialog,
     QRadioButton, QButtonGroup, QMessageBox, QProgressBar, QPlainTextEdit,
-    QScrollArea, QToolButton, QSizePolicy, QGraphicsDropShadowEffect
+    QScrollArea, QToolButton, QSizePolicy, QGraphicsDropShadowEffect,
+    QSpinBox, QComboBox, QCheckBox
 )
 
 from ui.styles import qss
-from core.fs import list_mafiles
-from core.processor import MaFileProcessor
-from core.asf import AsfConverter
+from ui.log_sink import LogSink, log_dir, prune_logs
+from core.fs import is_archive, iter_mafiles
+from core.parallel import default_workers
+from core.metrics import NULL_METRICS, Metrics, NullMetrics
+from core.cancel import CancelToken, Cancelled
+from core.listing import ListingCache
+# core.processor / core.asf / core.watch / core.sinks / core.catalog are
+# imported where they are first used, so the window paints before they load
 
 
 class Worker(QThread):
     progress = Signal(int, str)
-    log = Signal(str, str)
     done = Signal(object)
     failed = Signal(str)
+    cancelled = Signal(str)
 
     def __init__(self, fn, *args, **kwargs):
         super().__init__()
@@ -34,12 +42,20 @@ class Worker(QThread):
         try:
             res = self.fn(*self.args, **self.kwargs)
             self.done.emit(res)
+        except Cancelled as e:
+            self.cancelled.emit(str(e))
         except Exception as e:
             self.failed.emit(str(e))
 
 
+class WatchWorker(Worker):
+    batch = Signal(int, int)
+
+
 class MainWindow(QMainWindow):
     RESIZE_MARGIN = 14  # px
+    TAB_ASF = 1
+    TAB_DEV = 2
 
     def __init__(self, version: str = "1.3.0"):
         super().__init__()
@@ -65,6 +81,10 @@ class MainWindow(QMainWindow):
         self._resize_dir = ""
         self._press_global: QPoint | None = None
         self._start_geom = None
+        self._sinks: dict[QPlainTextEdit, LogSink] = {}
+        prune_logs()
+        self._lazy_tabs: dict[int, Callable[[], QWidget]] = {}
+        self._startup_s: float | None = None
 
         # Outer layout (space for shadow / rounded corners)
         central = QWidget()
@@ -135,13 +155,35 @@ class MainWindow(QMainWindow):
         self.tabs = QTabWidget()
         root.addWidget(self.tabs, 1)
 
+        # only the first tab is built up front; the others on first open
         self.tabs.addTab(self._tab_processing(), "Обработка")
-        self.tabs.addTab(self._tab_asf(), "ASF")
-        self.tabs.addTab(self._tab_dev(), "Dev")
+        self._add_lazy_tab(self._tab_asf, "ASF")
+        self._add_lazy_tab(self._tab_dev, "Dev")
+        self.tabs.currentChanged.connect(self._ensure_tab)
 
         # Remove focus on tab bar to avoid dotted focus
         self.tabs.tabBar().setFocusPolicy(Qt.NoFocus)
 
+    def _add_lazy_tab(self, build: Callable[[], QWidget], title: str):
+        page = QWidget()
+        QVBoxLayout(page).setContentsMargins(0, 0, 0, 0)
+        self._lazy_tabs[self.tabs.addTab(page, title)] = build
+
+    def _ensure_tab(self, index: int):
+        build = self._lazy_tabs.pop(index, None)
+        if build is not None:
+            self.tabs.widget(index).layout().addWidget(build())
+
+    def set_startup_time(self, seconds: float):
+        self._startup_s = seconds
+        if self.TAB_DEV not in self._lazy_tabs:
+            self.startup_label.setText(self._startup_text())
+
+    def _startup_text(self) -> str:
+        if self._startup_s is None:
+            return "Запуск: —"
+        return f"Запуск: {self._startup_s * 1000:.0f} мс"
+
     # ---------- Window controls ----------
     def _toggle_max_restore(self):
         if self.isMaximized():
@@ -271,9 +313,32 @@ class MainWindow(QMainWindow):
 
     # ---------- Logs ----------
     def _append_log(self, box: QPlainTextEdit, msg: str, level: str = "info"):
-        prefix = {"success": "✓", "error": "✗", "warning": "!", "info": "i"}.get(level, "i")
-        box.appendPlainText(f"[{prefix}] {msg}")
-        box.verticalScrollBar().setValue(box.verticalScrollBar().maximum())
+        self._sinks[box].push(msg, level)
+
+    def closeEvent(self, event):
+        self._hint_cancel.cancel()
+        for w in list(self._hint_workers):
+            w.wait(2000)
+        # running jobs write into the catalog and the log sinks: stop them
+        # (after the current file) before those are closed
+        jobs = [(self.cancel1, self.w1)]
+        if self.TAB_ASF not in self._lazy_tabs:
+            jobs.append((self.cancel2, self.w2))
+        for cancel, w in jobs:
+            if w is not None and w.isRunning():
+                # no "stopped" dialogs for a window that is going away
+                w.blockSignals(True)
+                cancel.cancel()
+        for _, w in jobs:
+            if w is not None:
+                w.wait()
+        if self.browser is not None:
+            self.browser.clear()
+        if self._catalog is not None:
+            self._catalog.close()
+        for sink in self._sinks.values():
+            sink.close()
+        super().closeEvent(event)
 
     def _set_no_focus(self, *widgets):
         for w in widgets:
@@ -303,21 +368,40 @@ class MainWindow(QMainWindow):
 
         row = QHBoxLayout()
         self.folder_edit = QLineEdit()
-        self.folder_edit.setPlaceholderText("Выберите папку с .mafile/.mafiles/.maFile/.maFiles")
+        self.folder_edit.setPlaceholderText("Папка или .zip с .mafile/.mafiles/.maFile/.maFiles")
         btn_browse = QPushButton("Выбрать…")
         btn_browse.setObjectName("secondary")
         btn_browse.clicked.connect(self._pick_folder)
-        self._set_no_focus(btn_browse)
+        btn_zip = QPushButton("ZIP…")
+        btn_zip.setObjectName("secondary")
+        btn_zip.clicked.connect(self._pick_archive)
+        self._set_no_focus(btn_browse, btn_zip)
 
         row.addWidget(self.folder_edit, 1)
         row.addWidget(btn_browse)
+        row.addWidget(btn_zip)
         l1.addLayout(row)
 
+        self.recursive_cb = QCheckBox("Включая подпапки")
+        self._set_no_focus(self.recursive_cb)
+        self.recursive_cb.toggled.connect(self._update_files_hint)
+        l1.addWidget(self.recursive_cb)
+
         self.files_hint = QLabel("Выберите папку")
         self.files_hint.setStyleSheet("color:#AAAAAA;")
         l1.addWidget(self.files_hint)
         layout.addWidget(gb_folder)
 
+        # built on first open; fed by the same listing as the hint above
+        self.gb_browse = QGroupBox("Просмотр файлов")
+        self.gb_browse.setCheckable(True)
+        self.gb_browse.setChecked(False)
+        QVBoxLayout(self.gb_browse)
+        self.browser = None
+        self._catalog = None
+        self.gb_browse.toggled.connect(self._toggle_browser)
+        layout.addWidget(self.gb_browse)
+
         gb_mode = QGroupBox("Режим обработки")
         l2 = QVBoxLayout(gb_mode)
         self.mode_group = QButtonGroup(self)
@@ -325,19 +409,104 @@ class MainWindow(QMainWindow):
         self.rb1 = QRadioButton("1) Переименовать по account_name (копирует в fullmafiles)")
         self.rb2 = QRadioButton("2) Урезать для FSM (shared_secret, account_name, SteamID)")
         self.rb3 = QRadioButton("3) Урезать для DM (shared_secret, SteamID)")
+        self.rb4 = QRadioButton("4) Несколько режимов за один проход")
         self.rb1.setChecked(True)
 
-        for rb, i in [(self.rb1, 1), (self.rb2, 2), (self.rb3, 3)]:
+        for rb, i in [(self.rb1, 1), (self.rb2, 2), (self.rb3, 3), (self.rb4, 4)]:
             self.mode_group.addButton(rb, i)
             self._set_no_focus(rb)
             l2.addWidget(rb)
 
+        multi_row = QHBoxLayout()
+        multi_row.setContentsMargins(28, 0, 0, 0)
+        self.multi_checks: dict[int, QCheckBox] = {}
+        for i, text in [(1, "fullmafiles"), (2, "FSM"), (3, "DM")]:
+            cb = QCheckBox(text)
+            cb.setChecked(True)
+            cb.setEnabled(False)
+            self._set_no_focus(cb)
+            self.multi_checks[i] = cb
+            multi_row.addWidget(cb)
+        multi_row.addStretch(1)
+        l2.addLayout(multi_row)
+        self.rb4.toggled.connect(lambda on: [cb.setEnabled(on) for cb in self.multi_checks.values()])
+
+        self.incremental_cb = QCheckBox("Только новые и изменённые файлы (манифест)")
+        self._set_no_focus(self.incremental_cb)
+        l2.addWidget(self.incremental_cb)
+
+        link_row = QHBoxLayout()
+        link_row.addWidget(QLabel("Запись режима 1:"))
+        self.link_combo = QComboBox()
+        self.link_combo.addItem("Копия", "copy")
+        self.link_combo.addItem("Жёсткая ссылка (общий файл с исходником)", "hardlink")
+        self.link_combo.addItem("Reflink / copy-on-write", "reflink")
+        self._set_no_focus(self.link_combo)
+        link_row.addWidget(self.link_combo, 1)
+        l2.addLayout(link_row)
+
+        dup_row = QHBoxLayout()
+        dup_row.addWidget(QLabel("Дубликаты аккаунтов:"))
+        self.dedupe_combo = QComboBox()
+        self.dedupe_combo.addItem("Не проверять (побеждает последний файл)", None)
+        self.dedupe_combo.addItem("Оставить первый по имени", "first")
+        self.dedupe_combo.addItem("Оставить самый новый", "newest")
+        self.dedupe_combo.addItem("Оставить самый полный", "complete")
+        self.dedupe_combo.setToolTip("Копии одного аккаунта: одинаковое содержимое, account_name или SteamID.\nОтчёт — duplicates.json рядом с папками результата")
+        self._set_no_focus(self.dedupe_combo)
+        dup_row.addWidget(self.dedupe_combo, 1)
+        l2.addLayout(dup_row)
+
         layout.addWidget(gb_mode)
 
+        gb_pool = QGroupBox("Параллельность")
+        lp = QHBoxLayout(gb_pool)
+        lp.addWidget(QLabel("Потоков:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 64)
+        self.workers_spin.setValue(default_workers())
+        lp.addWidget(self.workers_spin)
+        self.executor_combo = QComboBox()
+        self.executor_combo.addItem("Потоки", "thread")
+        self.executor_combo.addItem("Процессы", "process")
+        self._set_no_focus(self.executor_combo)
+        lp.addWidget(self.executor_combo, 1)
+        lp.addWidget(QLabel("Чтение/запись:"))
+        self.io_workers_spin = QSpinBox()
+        self.io_workers_spin.setRange(1, 64)
+        self.io_workers_spin.setValue(default_workers())
+        lp.addWidget(self.io_workers_spin)
+        layout.addWidget(gb_pool)
+
+        gb_out = QGroupBox("Вывод")
+        lo = QVBoxLayout(gb_out)
+        row_out = QHBoxLayout()
+        self.out_combo, self.level_spin = self._output_controls(row_out)
+        lo.addLayout(row_out)
+        self.compact_cb = QCheckBox("Компактный JSON (без отступов)")
+        self._set_no_focus(self.compact_cb)
+        lo.addWidget(self.compact_cb)
+        layout.addWidget(gb_out)
+
+        row_start = QHBoxLayout()
         self.btn_start = QPushButton("НАЧАТЬ ОБРАБОТКУ")
         self.btn_start.clicked.connect(self._start_processing)
         self._set_no_focus(self.btn_start)
-        layout.addWidget(self.btn_start)
+        row_start.addWidget(self.btn_start, 1)
+        self.cancel1 = CancelToken()
+        self.w1: Worker | None = None
+        self.btn_stop = QPushButton("Стоп")
+        self.btn_stop.setEnabled(False)
+        self.btn_stop.clicked.connect(lambda: self._stop_job(self.cancel1, self.btn_stop, self.progress_label))
+        self._set_no_focus(self.btn_stop)
+        row_start.addWidget(self.btn_stop)
+        layout.addLayout(row_start)
+
+        self.btn_watch = QPushButton("СЛЕДИТЬ ЗА ПАПКОЙ")
+        self.btn_watch.setToolTip("Обрабатывать новые и изменённые файлы по мере появления; остановка — «Стоп»")
+        self.btn_watch.clicked.connect(self._start_watch)
+        self._set_no_focus(self.btn_watch)
+        layout.addWidget(self.btn_watch)
 
         self.progress_label = QLabel("Готов к работе")
         self.progress_label.setStyleSheet("color:#AAAAAA;")
@@ -353,7 +522,7 @@ class MainWindow(QMainWindow):
         row2 = QHBoxLayout()
         btn_clear = QPushButton("Очистить")
         btn_clear.setObjectName("secondary")
-        btn_clear.clicked.connect(lambda: self.log_box.setPlainText(""))
+        btn_clear.clicked.connect(lambda: self.proc_sink.clear())
         btn_copy = QPushButton("Копировать")
         btn_copy.setObjectName("secondary")
         btn_copy.clicked.connect(self._copy_processing_log)
@@ -366,32 +535,156 @@ class MainWindow(QMainWindow):
 
         self.log_box = QPlainTextEdit()
         self.log_box.setReadOnly(True)
+        self.proc_sink = LogSink(self.log_box, "processing", parent=self)
+        self._sinks[self.log_box] = self.proc_sink
         l3.addWidget(self.log_box)
         layout.addWidget(gb_log)
 
+        # the hint is counted off the GUI thread once typing pauses; the
+        # listing is cached per folder and reused by "НАЧАТЬ ОБРАБОТКУ"
+        self.listings = ListingCache()
+        self._hint_gen = 0
+        self._hint_cancel = CancelToken()
+        self._hint_workers: set[Worker] = set()
+        self._hint_timer = QTimer(self)
+        self._hint_timer.setSingleShot(True)
+        self._hint_timer.setInterval(300)
+        self._hint_timer.timeout.connect(self._scan_files_hint)
         self.folder_edit.textChanged.connect(self._update_files_hint)
         layout.addStretch(1)
         return tab
 
+    def _output_controls(self, row: QHBoxLayout) -> tuple[QComboBox, QSpinBox]:
+        combo = QComboBox()
+        combo.addItem("Папка", None)
+        combo.addItem("ZIP архив", "zip")
+        combo.addItem("TAR.GZ архив", "tar.gz")
+        self._set_no_focus(combo)
+        row.addWidget(combo, 1)
+        row.addWidget(QLabel("Сжатие:"))
+        level = QSpinBox()
+        level.setRange(0, 9)
+        level.setValue(6)
+        level.setEnabled(False)
+        combo.currentIndexChanged.connect(lambda _: level.setEnabled(combo.currentData() is not None))
+        row.addWidget(level)
+        return combo, level
+
     def _pick_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Выберите папку с maFiles")
         if folder:
             self.folder_edit.setText(folder)
 
+    def _pick_archive(self):
+        f, _ = QFileDialog.getOpenFileName(self, "Выберите архив с maFiles", filter="ZIP (*.zip)")
+        if f:
+            self.folder_edit.setText(f)
+
     def _update_files_hint(self):
-        folder = self.folder_edit.text().strip()
-        if not folder or not os.path.exists(folder):
+        # a newer edit makes any scan in flight pointless
+        self._hint_cancel.cancel()
+        self._hint_gen += 1
+        if not self.folder_edit.text().strip():
+            self._hint_timer.stop()
             self.files_hint.setText("Выберите папку")
+            if self.browser is not None:
+                self.browser.clear()
             return
-        try:
-            files = list_mafiles(folder)
-            self.files_hint.setText(f"Найдено файлов: {len(files)}")
-        except Exception:
+        self.files_hint.setText("Поиск файлов…")
+        self._hint_timer.start()
+
+    def _scan_files_hint(self):
+        folder = self.folder_edit.text().strip()
+        recursive = self.recursive_cb.isChecked()
+        gen = self._hint_gen
+        token = self._hint_cancel = CancelToken()
+
+        def run_job():
+            from core.processor import OUTPUT_DIRS
+            try:
+                return self.listings.scan(folder, recursive, OUTPUT_DIRS, token)
+            except FileNotFoundError:
+                return None
+
+        w = Worker(run_job)
+        w.done.connect(lambda names: self._show_files_hint(gen, folder, names))
+        w.failed.connect(lambda _: self._show_files_hint(gen, folder, -1))
+        w.finished.connect(lambda: self._hint_workers.discard(w))
+        self._hint_workers.add(w)
+        w.start()
+
+    def _show_files_hint(self, gen: int, folder: str, names: list[str] | int | None):
+        if gen != self._hint_gen:
+            return
+        if names is None:
+            self.files_hint.setText("Выберите папку")
+        elif names == -1:
             self.files_hint.setText("Ошибка доступа к папке")
+        else:
+            self.files_hint.setText(f"Найдено файлов: {len(names)}")
+        if self.browser is not None and self.gb_browse.isChecked():
+            if isinstance(names, list):
+                self.browser.set_folder(folder, names)
+            else:
+                self.browser.clear()
+
+    def _toggle_browser(self, on: bool):
+        if self.browser is None:
+            if not on:
+                return
+            from ui.browser import MaFileBrowser
+            self.browser = MaFileBrowser(catalog=self._get_catalog())
+            self.gb_browse.layout().addWidget(self.browser)
+        self.browser.setVisible(on)
+        if on:
+            # the listing is cached, so this is one stat per directory
+            self._update_files_hint()
+        else:
+            self.browser.clear()
 
     def _copy_processing_log(self):
-        self.clipboard().setText(self.log_box.toPlainText())
-        self._append_log(self.log_box, "Лог скопирован в буфер обмена", "success")
+        QGuiApplication.clipboard().setText(self.proc_sink.full_text())
+        if self.proc_sink.truncated:
+            self._append_log(self.log_box, "Лог скопирован без самых старых строк: они не поместились в лимит размера", "warning")
+        else:
+            self._append_log(self.log_box, "Лог скопирован в буфер обмена", "success")
+
+    def _processing_modes(self) -> list[int] | None:
+        mode = self.mode_group.checkedId()
+        if mode not in (1, 2, 3, 4):
+            mode = 1
+        modes = [i for i, cb in self.multi_checks.items() if cb.isChecked()] if mode == 4 else [mode]
+        if not modes:
+            QMessageBox.warning(self, "Внимание", "Выберите хотя бы один режим!")
+            return None
+        return modes
+
+    def _processing_opts(self, metrics: Metrics | NullMetrics, incremental: bool) -> dict | None:
+        from core.sinks import Durability
+
+        # the shared options live on the Dev tab
+        self._ensure_tab(self.TAB_DEV)
+        opts = {
+            "workers": self.workers_spin.value(),
+            "io_workers": self.io_workers_spin.value(),
+            "executor": self.executor_combo.currentData(),
+            "incremental": incremental,
+            "link": self.link_combo.currentData(),
+            "dedupe": self.dedupe_combo.currentData(),
+            "archive": self.out_combo.currentData(),
+            "compress_level": self.level_spin.value(),
+            "metrics": metrics,
+            "compact_json": self.compact_cb.isChecked(),
+            "verify_json": self.verify_json_cb.isChecked(),
+            "durability": Durability(self.durability_combo.currentData()),
+            "catalog": self._get_catalog(),
+        }
+        if opts["archive"] and opts["incremental"]:
+            QMessageBox.warning(self, "Внимание", "Инкрементальная обработка недоступна при записи в архив!")
+            return None
+        self.cancel1 = CancelToken()
+        opts["cancel"] = self.cancel1
+        return opts
 
     def _start_processing(self):
         folder = self.folder_edit.text().strip()
@@ -402,58 +695,135 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Ошибка", "Папка не существует!")
             return
 
-        files = list_mafiles(folder)
+        from core.processor import OUTPUT_DIRS
+
+        metrics = self._new_metrics("processing")
+        with metrics.stage("list"):
+            files = self.listings.scan(folder, self.recursive_cb.isChecked(), OUTPUT_DIRS)
         if not files:
             QMessageBox.information(self, "Информация", "В папке нет maFile файлов.")
             return
 
-        mode = self.mode_group.checkedId()
-        if mode not in (1, 2, 3):
-            mode = 1
+        modes = self._processing_modes()
+        if not modes:
+            return
+        opts = self._processing_opts(metrics, self.incremental_cb.isChecked())
+        if opts is None:
+            return
 
-        self.btn_start.setEnabled(False)
+        self._set_processing_running(True)
         self.progress.setValue(0)
         self.progress_label.setText("Старт…")
         self._append_log(self.log_box, f"Начата обработка: {len(files)} файлов", "info")
 
         def run_job():
-            return self._process_job(mode, folder, files)
+            return self._process_job(modes, folder, files, opts)
 
         self.w1 = Worker(run_job)
         self.w1.progress.connect(lambda v, t: (self.progress.setValue(v), self.progress_label.setText(t)))
-        self.w1.log.connect(lambda m, lvl: self._append_log(self.log_box, m, lvl))
         self.w1.done.connect(lambda _: self._finish_processing(len(files)))
         self.w1.failed.connect(self._fail_processing)
+        self.w1.cancelled.connect(self._cancel_processing)
+        self.w1.finished.connect(lambda: self._show_metrics(metrics))
         self.w1.start()
 
-    def _process_job(self, mode: int, folder: str, files: list[str]):
+    def _set_processing_running(self, running: bool):
+        self.btn_start.setEnabled(not running)
+        self.btn_watch.setEnabled(not running)
+        self.btn_stop.setEnabled(running)
+
+    def _start_watch(self):
+        folder = self.folder_edit.text().strip()
+        if not folder:
+            QMessageBox.warning(self, "Внимание", "Выберите папку с файлами!")
+            return
+        if not os.path.isdir(folder):
+            QMessageBox.critical(self, "Ошибка", "Наблюдать можно только за папкой!")
+            return
+        modes = self._processing_modes()
+        if not modes:
+            return
+        # only the delta is processed, which is what incremental mode is for
+        opts = self._processing_opts(NULL_METRICS, True)
+        if opts is None:
+            return
+        recursive = self.recursive_cb.isChecked()
+
+        self._set_processing_running(True)
+        self.progress.setValue(0)
+        self.progress_label.setText("Наблюдение…")
+
+        def run_job():
+            return self._watch_job(modes, folder, recursive, opts)
+
+        self.w1 = WatchWorker(run_job)
+        self.w1.progress.connect(lambda v, t: (self.progress.setValue(v), self.progress_label.setText(t)))
+        self.w1.batch.connect(self._watch_batch)
+        self.w1.done.connect(self._finish_watch)
+        self.w1.failed.connect(self._fail_processing)
+        self.w1.start()
+
+    def _watch_job(self, modes: list[int], folder: str, recursive: bool, opts: dict):
         def log(m: str, lvl: str = "info"):
-            self.w1.log.emit(m, lvl)
+            self.proc_sink.push(m, lvl)
 
         def prog(v: int, t: str):
             self.w1.progress.emit(v, t)
 
-        proc = MaFileProcessor(log=log, progress=prog)
-        if mode == 1:
-            return proc.process_mode1(folder, files)
-        if mode == 2:
-            return proc.process_mode2(folder, files)
-        return proc.process_mode3(folder, files)
+        from core.processor import MaFileProcessor
+        from core.watch import FolderWatcher, process_forever
+
+        proc = MaFileProcessor(log=log, progress=prog, **opts)
+        watcher = FolderWatcher(folder, recursive, cancel=opts["cancel"])
+        return process_forever(proc, watcher, modes, lambda b, n, full: self.w1.batch.emit(b, n))
+
+    def _watch_batch(self, batches: int, files: int):
+        self.progress.setValue(100)
+        self.progress_label.setText(f"Наблюдение • пакетов: {batches} • файлов: {files} • {time.strftime('%H:%M:%S')}")
+
+    def _finish_watch(self, stats: object):
+        self.progress.setValue(0)
+        self.progress_label.setText("Наблюдение остановлено")
+        self._set_processing_running(False)
+
+    def _process_job(self, modes: list[int], folder: str, files: list[str], opts: dict):
+        def log(m: str, lvl: str = "info"):
+            self.proc_sink.push(m, lvl)
+
+        def prog(v: int, t: str):
+            self.w1.progress.emit(v, t)
+
+        from core.processor import MaFileProcessor
+
+        proc = MaFileProcessor(log=log, progress=prog, **opts)
+        return proc.process_modes(folder, files, modes)
 
     def _finish_processing(self, count: int):
         self.progress.setValue(100)
         self.progress_label.setText("Завершено!")
         self._append_log(self.log_box, "Обработка завершена успешно!", "success")
-        self.btn_start.setEnabled(True)
+        self._set_processing_running(False)
         QMessageBox.information(self, "Успешно", f"Обработано файлов: {count}")
 
     def _fail_processing(self, err: str):
         self.progress.setValue(0)
         self.progress_label.setText("Ошибка")
         self._append_log(self.log_box, err, "error")
-        self.btn_start.setEnabled(True)
+        self._set_processing_running(False)
         QMessageBox.critical(self, "Ошибка", err)
 
+    def _cancel_processing(self, msg: str):
+        self.progress_label.setText("Остановлено")
+        self._append_log(self.log_box, msg, "warning")
+        self._set_processing_running(False)
+        QMessageBox.information(self, "Остановлено", "Обработка остановлена.\nПовторный запуск продолжит с места остановки.")
+
+    def _stop_job(self, token: CancelToken, btn: QPushButton, label: QLabel):
+        # the job stops after the file in flight; its signals re-enable the UI
+        token.cancel()
+        btn.setEnabled(False)
+        label.setText("Останавливаем…")
+
     # ---------- Tab 2: ASF ----------
     def _tab_asf(self) -> QWidget:
         tab = QWidget()
@@ -510,12 +880,34 @@ class MainWindow(QMainWindow):
         row3.addWidget(self.lbl_out, 1)
         l1.addLayout(row3)
 
+        self.asf_streaming_cb = QCheckBox("Экономия памяти (перечитывать maFile при записи)")
+        self._set_no_focus(self.asf_streaming_cb)
+        l1.addWidget(self.asf_streaming_cb)
+
+        row4 = QHBoxLayout()
+        row4.addWidget(QLabel("Вывод:"))
+        self.asf_out_combo, self.asf_level_spin = self._output_controls(row4)
+        l1.addLayout(row4)
+
+        self.asf_compact_cb = QCheckBox("Компактный JSON (без отступов)")
+        self._set_no_focus(self.asf_compact_cb)
+        l1.addWidget(self.asf_compact_cb)
+
         layout.addWidget(gb_sel)
 
+        row_start = QHBoxLayout()
         self.btn_asf = QPushButton("НАЧАТЬ КОНВЕРТАЦИЮ ASF")
         self.btn_asf.clicked.connect(self._start_asf)
         self._set_no_focus(self.btn_asf)
-        layout.addWidget(self.btn_asf)
+        row_start.addWidget(self.btn_asf, 1)
+        self.cancel2 = CancelToken()
+        self.w2: Worker | None = None
+        self.btn_asf_stop = QPushButton("Стоп")
+        self.btn_asf_stop.setEnabled(False)
+        self.btn_asf_stop.clicked.connect(lambda: self._stop_job(self.cancel2, self.btn_asf_stop, self.asf_progress_label))
+        self._set_no_focus(self.btn_asf_stop)
+        row_start.addWidget(self.btn_asf_stop)
+        layout.addLayout(row_start)
 
         self.asf_progress_label = QLabel("Готов к конвертации")
         self.asf_progress_label.setStyleSheet("color:#AAAAAA;")
@@ -529,6 +921,8 @@ class MainWindow(QMainWindow):
         l2 = QVBoxLayout(gb_log)
         self.asf_log = QPlainTextEdit()
         self.asf_log.setReadOnly(True)
+        self.asf_sink = LogSink(self.asf_log, "asf", parent=self)
+        self._sinks[self.asf_log] = self.asf_sink
         l2.addWidget(self.asf_log)
         layout.addWidget(gb_log)
 
@@ -538,8 +932,9 @@ class MainWindow(QMainWindow):
     def _pick_asf_mafiles(self):
         files, _ = QFileDialog.getOpenFileNames(
             self, "Выберите MaFiles",
-            filter="MaFiles (*.mafile *.mafiles *.maFile *.maFiles);;All files (*.*)"
+            filter="MaFiles (*.mafile *.mafiles *.maFile *.maFiles *.zip);;All files (*.*)"
         )
+        files = [m for f in files for m in ([e.path for e in iter_mafiles(f)] if is_archive(f) else [f])]
         if files:
             self.asf_mafiles = files
             self.lbl_ma.setText(f"Выбрано: {len(files)}")
@@ -566,33 +961,53 @@ class MainWindow(QMainWindow):
         if not self.asf_logpass:
             QMessageBox.critical(self, "Ошибка", "Выберите login:password файл!")
             return
+        from core.sinks import Durability
 
+        self._ensure_tab(self.TAB_DEV)
+        self.cancel2 = CancelToken()
         self.btn_asf.setEnabled(False)
+        self.btn_asf_stop.setEnabled(True)
         self.asf_progress.setValue(0)
         self.asf_progress_label.setText("Старт…")
 
+        opts = {
+            "streaming": self.asf_streaming_cb.isChecked(),
+            "archive": self.asf_out_combo.currentData(),
+            "compress_level": self.asf_level_spin.value(),
+            "metrics": self._new_metrics("asf"),
+            "compact_json": self.asf_compact_cb.isChecked(),
+            "verify_json": self.verify_json_cb.isChecked(),
+            "durability": Durability(self.durability_combo.currentData()),
+            "catalog": self._get_catalog(),
+            "cancel": self.cancel2,
+        }
+
         def run_job():
-            return self._asf_job(self.asf_mafiles, self.asf_logpass, self.asf_out)
+            return self._asf_job(self.asf_mafiles, self.asf_logpass, self.asf_out, opts)
 
         self.w2 = Worker(run_job)
         self.w2.progress.connect(lambda v, t: (self.asf_progress.setValue(v), self.asf_progress_label.setText(t)))
-        self.w2.log.connect(lambda m, lvl: self._append_log(self.asf_log, m, lvl))
         self.w2.done.connect(self._finish_asf)
         self.w2.failed.connect(self._fail_asf)
+        self.w2.cancelled.connect(self._cancel_asf)
+        self.w2.finished.connect(lambda: self._show_metrics(opts["metrics"]))
         self.w2.start()
 
-    def _asf_job(self, mafiles: list[str], logpass: str, out_dir: str | None):
+    def _asf_job(self, mafiles: list[str], logpass: str, out_dir: str | None, opts: dict):
         def log(m: str, lvl: str = "info"):
-            self.w2.log.emit(m, lvl)
+            self.asf_sink.push(m, lvl)
 
         def prog(v: int, t: str):
             self.w2.progress.emit(v, t)
 
-        conv = AsfConverter(log=log, progress=prog)
+        from core.asf import AsfConverter
+
+        conv = AsfConverter(log=log, progress=prog, **opts)
         return conv.convert(mafiles, logpass, out_dir)
 
     def _finish_asf(self, res: object):
         self.btn_asf.setEnabled(True)
+        self.btn_asf_stop.setEnabled(False)
         self.asf_progress.setValue(100)
         self.asf_progress_label.setText("Готово!")
         try:
@@ -607,11 +1022,49 @@ class MainWindow(QMainWindow):
 
     def _fail_asf(self, err: str):
         self.btn_asf.setEnabled(True)
+        self.btn_asf_stop.setEnabled(False)
         self.asf_progress.setValue(0)
         self.asf_progress_label.setText("Ошибка")
         self._append_log(self.asf_log, err, "error")
         QMessageBox.critical(self, "Ошибка", err)
 
+    def _cancel_asf(self, msg: str):
+        self.btn_asf.setEnabled(True)
+        self.btn_asf_stop.setEnabled(False)
+        self.asf_progress_label.setText("Остановлено")
+        self._append_log(self.asf_log, msg, "warning")
+        QMessageBox.information(self, "Остановлено", "Конвертация остановлена.\nПовторный запуск продолжит с места остановки.")
+
+    def _get_catalog(self):
+        # one catalog for the jobs and the file browser, opened on first use
+        self._ensure_tab(self.TAB_DEV)
+        if not self.catalog_cb.isChecked():
+            return None
+        if self._catalog is None:
+            from core.catalog import open_catalog
+
+            self._catalog = open_catalog(log=lambda msg, level: self._append_log(self.log_box, msg, level))
+            if self._catalog is None:
+                # stays off until the user turns it back on
+                self.catalog_cb.setChecked(False)
+        return self._catalog
+
+    # ---------- Performance ----------
+    def _new_metrics(self, name: str) -> Metrics | NullMetrics:
+        self._ensure_tab(self.TAB_DEV)
+        if not self.perf_cb.isChecked():
+            return NULL_METRICS
+        report = os.path.join(log_dir(), f"perf-{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        return Metrics(name, report)
+
+    def _show_metrics(self, metrics: Metrics | NullMetrics):
+        if not metrics.enabled:
+            return
+        lines = metrics.summary_lines()
+        if metrics.report_path:
+            lines.append(f"Отчёт: {metrics.report_path}")
+        self.perf_box.setPlainText("\n".join(lines))
+
     # ---------- Tab 3: Dev ----------
     def _tab_dev(self) -> QWidget:
         tab = QWidget()
@@ -653,7 +1106,38 @@ class MainWindow(QMainWindow):
         inf = QLabel(f"MaFile Manager\nВерсия: {self.version}\nUI: Black/Orange\nQt: PySide6")
         inf.setStyleSheet("color:#AAAAAA;")
         li.addWidget(inf)
+        self.startup_label = QLabel(self._startup_text())
+        self.startup_label.setToolTip("От запуска main.py до первой отрисовки окна")
+        self.startup_label.setStyleSheet("color:#AAAAAA;")
+        li.addWidget(self.startup_label)
         layout.addWidget(info)
 
+        perf = QGroupBox("Производительность")
+        lp = QVBoxLayout(perf)
+        self.perf_cb = QCheckBox("Собирать замеры по стадиям")
+        self._set_no_focus(self.perf_cb)
+        lp.addWidget(self.perf_cb)
+        self.verify_json_cb = QCheckBox("Проверять записанный JSON повторным чтением")
+        self._set_no_focus(self.verify_json_cb)
+        lp.addWidget(self.verify_json_cb)
+        self.catalog_cb = QCheckBox("Каталог метаданных (не разбирать неизменённые файлы заново)")
+        self.catalog_cb.setChecked(True)
+        self._set_no_focus(self.catalog_cb)
+        lp.addWidget(self.catalog_cb)
+        sync_row = QHBoxLayout()
+        sync_row.addWidget(QLabel("Сброс на диск:"))
+        self.durability_combo = QComboBox()
+        self.durability_combo.addItem("Нет (быстрее всего)", "none")
+        self.durability_combo.addItem("Группами (каждые 256 файлов / 2 с)", "batch")
+        self.durability_combo.addItem("Каждый файл (медленно)", "always")
+        self._set_no_focus(self.durability_combo)
+        sync_row.addWidget(self.durability_combo, 1)
+        lp.addLayout(sync_row)
+        self.perf_box = QPlainTextEdit()
+        self.perf_box.setReadOnly(True)
+        self.perf_box.setPlaceholderText("Здесь появятся замеры последнего запуска")
+        lp.addWidget(self.perf_box)
+        layout.addWidget(perf)
+
         layout.addStretch(1)
         return tab
@@ -8,7 +8,7 @@ def qss() -> str:
         "#titleText { color: #FFFFFF; font-size: 12px; }"
 
         "QPushButton:focus, QToolButton:focus, QRadioButton:focus, QTabBar::tab:focus { outline: none; }"
-        "QPushButton, QToolButton, QRadioButton { outline: none; }"
+        "QPushButton, QToolButton, QRadioButton, QCheckBox { outline: none; }"
 
         "QTabWidget::pane { border: 1px solid #1A1A1A; border-radius: 16px; padding: 6px; }"
         "QTabBar::tab { background: #111111; padding: 9px 12px; border-radius: 14px; margin: 4px; }"
@@ -21,6 +21,14 @@ def qss() -> str:
         "QLineEdit { background: #0D0D0D; border: 1px solid #1A1A1A; border-radius: 14px; padding: 10px; }"
         "QLineEdit:focus { border: 1px solid #FF7A00; }"
 
+        "QSpinBox, QComboBox { background: #0D0D0D; border: 1px solid #1A1A1A; border-radius: 12px; padding: 6px 10px; }"
+        "QSpinBox:focus, QComboBox:focus { border: 1px solid #FF7A00; }"
+
+        "QCheckBox { spacing: 8px; }"
+        "QCheckBox::indicator { width: 16px; height: 16px; border-radius: 5px; border: 2px solid #333333; background: #0D0D0D; }"
+        "QCheckBox::indicator:checked { border: 2px solid #FF7A00; background: #FF7A00; }"
+        "QCheckBox:disabled { color: #555555; }"
+
         "QRadioButton { spacing: 10px; }"
         "QRadioButton::indicator { width: 18px; height: 18px; border-radius: 9px; border: 2px solid #333333; background: #0D0D0D; }"
         "QRadioButton::indicator:hover { border: 2px solid #FF9A3D; }"